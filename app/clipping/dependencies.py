@@ -0,0 +1,164 @@
+"""
+Providers for the clipping adapters and use cases.
+
+Each provider builds its object on first call and caches it for the process,
+importing the adapter module only then: boto3, google-genai, firebase_admin and
+yt-dlp are not loaded by importing the routers or tasks, only by the first
+request or task that needs them.
+"""
+# pylint: disable=import-outside-toplevel
+import os
+from functools import lru_cache
+from typing import Optional
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import (
+    AsyncVideoUnderstandingService,
+    BoundaryRefiner,
+    ClipUrlRepository,
+    HighlightRepository,
+    StorageService,
+    VideoUnderstandingService,
+)
+from app.clipping.use_cases.clip_video import ClipVideoFromHighlightsUseCase
+
+load_dotenv()
+
+STREAM_CLIP_UPLOADS = os.getenv("STREAM_CLIP_UPLOADS", "false").lower() == "true"
+SECTION_DOWNLOAD = os.getenv("SECTION_DOWNLOAD", "false").lower() == "true"
+STREAM_HIGHLIGHTS = os.getenv("STREAM_HIGHLIGHTS", "false").lower() == "true"
+TRANSCRIPT_FIRST = os.getenv("TRANSCRIPT_FIRST", "false").lower() == "true"
+SNAP_HIGHLIGHT_BOUNDARIES = os.getenv("SNAP_HIGHLIGHT_BOUNDARIES", "true").lower() == "true"
+# Clips a job uploads at once; R2's connection pool is sized to match
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+
+
+@lru_cache(maxsize=1)
+def get_video_understanding_service() -> VideoUnderstandingService:
+    from app.clipping.infrastructure.async_gemini_video_understanding import (
+        AsyncGeminiVideoUnderstandingService,
+        SyncVideoUnderstandingAdapter,
+    )
+    from app.clipping.infrastructure.cached_video_understanding import (
+        CachedVideoUnderstandingService,
+    )
+    from app.clipping.infrastructure.gemini_file_uploader import GeminiFileUploader
+    from app.clipping.infrastructure.gemini_rate_limiter import GeminiRateLimiter
+    from app.clipping.infrastructure.redis_client import get_redis_client
+    from app.clipping.infrastructure.transcript_video_understanding import (
+        TranscriptVideoUnderstandingService,
+    )
+    from app.clipping.infrastructure.youtube_downloader import (
+        download_youtube_video,
+        fetch_captions,
+        fetch_video_duration,
+    )
+
+    gemini = AsyncGeminiVideoUnderstandingService(
+        rate_limiter=GeminiRateLimiter(get_redis_client()),
+        duration_lookup=fetch_video_duration,
+        file_uploader=GeminiFileUploader(
+            redis_client=get_redis_client(), download_source=download_youtube_video
+        ),
+    )
+    understanding: AsyncVideoUnderstandingService = gemini
+    if TRANSCRIPT_FIRST:
+        understanding = TranscriptVideoUnderstandingService(gemini, caption_lookup=fetch_captions)
+    return CachedVideoUnderstandingService(
+        SyncVideoUnderstandingAdapter(understanding), redis_client=get_redis_client()
+    )
+
+
+@lru_cache(maxsize=1)
+def get_storage_service() -> StorageService:
+    from app.clipping.infrastructure.r2_storage import R2StorageService
+
+    return R2StorageService(upload_concurrency=UPLOAD_CONCURRENCY)
+
+
+@lru_cache(maxsize=1)
+def get_highlight_repository() -> HighlightRepository:
+    from app.clipping.infrastructure.firebase_highlight_repository import (
+        FirebaseHighlightRepository,
+    )
+
+    return FirebaseHighlightRepository()
+
+
+@lru_cache(maxsize=1)
+def get_clip_url_repository() -> ClipUrlRepository:
+    from app.clipping.infrastructure.firebase_clip_url_repository import (
+        FirebaseClipUrlRepository,
+    )
+
+    return FirebaseClipUrlRepository()
+
+
+@lru_cache(maxsize=1)
+def get_boundary_refiner() -> Optional[BoundaryRefiner]:
+    if not SNAP_HIGHLIGHT_BOUNDARIES:
+        return None
+    from app.clipping.infrastructure.audio_boundaries import AudioPauseSnapper
+
+    return AudioPauseSnapper()
+
+
+@lru_cache(maxsize=1)
+def get_api_use_case() -> ClipVideoFromHighlightsUseCase:
+    """
+    Use case behind the synchronous /clip endpoint: re-encodes every clip.
+    """
+    from app.clipping.infrastructure.checkpoint_store import get_checkpoint_store
+    from app.clipping.infrastructure.file_hashing import file_checksum
+    from app.clipping.infrastructure.firestore_job_result_repository import (
+        get_job_result_repository,
+    )
+    from app.clipping.infrastructure.ffmpeg_reencode_video_clipper import (
+        FFmpegReencodeVideoClipper,
+    )
+    from app.clipping.infrastructure.job_workspace import get_job_workspace_provider
+
+    return ClipVideoFromHighlightsUseCase(
+        video_understanding_service=get_video_understanding_service(),
+        video_clipper_service=FFmpegReencodeVideoClipper(),
+        storage_service=get_storage_service(),
+        highlight_repository=get_highlight_repository(),
+        clip_url_repository=get_clip_url_repository(),
+        upload_concurrency=UPLOAD_CONCURRENCY,
+        stream_uploads=STREAM_CLIP_UPLOADS,
+        checkpoint_store=get_checkpoint_store(),
+        job_result_repository=get_job_result_repository(),
+        stream_highlights=STREAM_HIGHLIGHTS,
+        boundary_refiner=get_boundary_refiner(),
+        workspace_provider=get_job_workspace_provider(),
+        checksum_file=file_checksum,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_worker_use_case() -> ClipVideoFromHighlightsUseCase:
+    """
+    Use case behind the Celery tasks: stream-copies clips.
+    """
+    from app.clipping.infrastructure.checkpoint_store import get_checkpoint_store
+    from app.clipping.infrastructure.file_hashing import file_checksum
+    from app.clipping.infrastructure.firestore_job_result_repository import (
+        get_job_result_repository,
+    )
+    from app.clipping.infrastructure.ffmpeg_video_clipper import FFmpegVideoClipper
+    from app.clipping.infrastructure.job_workspace import get_job_workspace_provider
+
+    return ClipVideoFromHighlightsUseCase(
+        video_understanding_service=get_video_understanding_service(),
+        video_clipper_service=FFmpegVideoClipper(),
+        storage_service=get_storage_service(),
+        highlight_repository=get_highlight_repository(),
+        clip_url_repository=get_clip_url_repository(),
+        section_download=SECTION_DOWNLOAD,
+        upload_concurrency=UPLOAD_CONCURRENCY,
+        stream_uploads=STREAM_CLIP_UPLOADS,
+        checkpoint_store=get_checkpoint_store(),
+        job_result_repository=get_job_result_repository(),
+        boundary_refiner=get_boundary_refiner(),
+        workspace_provider=get_job_workspace_provider(),
+        checksum_file=file_checksum,
+    )
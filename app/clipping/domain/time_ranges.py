@@ -0,0 +1,221 @@
+from typing import List, Optional
+from pydantic import BaseModel
+# TimeRange and the timestamp helpers live with Highlight; they are imported
+# from here by callers working with time ranges
+from app.clipping.domain.video_understanding import (
+    Highlight,
+    HighlightsResponse,
+    TimeRange,
+    format_timestamp,
+    parse_timestamp,
+)
+
+
+class SourceSection(BaseModel):
+    """
+    A partial download of the source video covering `time_range`.
+    """
+
+    path: str
+    time_range: TimeRange
+
+
+def merge_time_ranges(
+    ranges: List[TimeRange], padding: float = 0.0, merge_gap: float = 0.0
+) -> List[TimeRange]:
+    """
+    Pad each range, then merge ranges that overlap or are closer than `merge_gap`.
+    """
+    padded = sorted(
+        (TimeRange(start=max(0.0, r.start - padding), end=r.end + padding) for r in ranges),
+        key=lambda r: r.start,
+    )
+    merged: List[TimeRange] = []
+    for r in padded:
+        if merged and r.start - merged[-1].end <= merge_gap:
+            merged[-1].end = max(merged[-1].end, r.end)
+        else:
+            merged.append(r)
+    return merged
+
+
+def plan_sections(
+    highlights: HighlightsResponse, padding: float = 0.0, merge_gap: float = 0.0
+) -> List[TimeRange]:
+    """
+    Time ranges of the source that must be downloaded to cut every highlight.
+    """
+    ranges = [h.time_range for h in highlights.highlights if h.time_range is not None]
+    return merge_time_ranges(ranges, padding=padding, merge_gap=merge_gap)
+
+
+def rebase_highlights(
+    highlights: HighlightsResponse, section: TimeRange
+) -> HighlightsResponse:
+    """
+    Highlights that fall inside `section`, with timestamps relative to its start.
+    """
+    rebased: List[Highlight] = []
+    for h in highlights.highlights:
+        r = h.time_range
+        if r is None or r.start < section.start or r.end > section.end:
+            continue
+        rebased.append(
+            h.model_copy(
+                update={
+                    "time_range": TimeRange(
+                        start=r.start - section.start, end=r.end - section.start
+                    )
+                }
+            )
+        )
+    return HighlightsResponse(highlights=rebased)
+
+
+def plan_analysis_windows(duration: float, window: float, overlap: float) -> List[TimeRange]:
+    """
+    Cover [0, duration] with windows of `window` seconds, each starting
+    `window - overlap` after the previous one, so a highlight up to `overlap`
+    long is wholly inside at least one window. The last window is stretched
+    rather than leaving a sliver shorter than the overlap.
+    """
+    if duration <= window:
+        return [TimeRange(start=0.0, end=duration)]
+    step = window - overlap
+    if step <= 0:
+        raise ValueError("Analysis window must be longer than its overlap.")
+    windows: List[TimeRange] = []
+    start = 0.0
+    while start + window < duration:
+        windows.append(TimeRange(start=start, end=start + window))
+        start += step
+    if duration - windows[-1].end <= overlap:
+        windows[-1].end = duration
+    else:
+        windows.append(TimeRange(start=start, end=duration))
+    return windows
+
+
+def offset_highlights(highlights: HighlightsResponse, window: TimeRange) -> HighlightsResponse:
+    """
+    Highlights timed relative to `window`, moved to absolute source time. Ones
+    ending past the window are clamped to it and empty ones dropped.
+    """
+    shifted: List[Highlight] = []
+    for h in highlights.highlights:
+        r = h.time_range
+        if r is None:
+            continue
+        start = window.start + max(0.0, r.start)
+        end = min(window.end, window.start + r.end)
+        if end <= start:
+            continue
+        shifted.append(h.model_copy(update={"time_range": TimeRange(start=start, end=end)}))
+    return HighlightsResponse(highlights=shifted)
+
+
+def overlap_ratio(a: TimeRange, b: TimeRange) -> float:
+    """
+    Intersection over union of two time ranges.
+    """
+    intersection = min(a.end, b.end) - max(a.start, b.start)
+    if intersection <= 0:
+        return 0.0
+    return intersection / (max(a.end, b.end) - min(a.start, b.start))
+
+
+def select_top_highlights(
+    highlights: List[Highlight], top_k: Optional[int] = None, max_overlap: float = 0.5
+) -> HighlightsResponse:
+    """
+    Merge highlights found by overlapping analysis windows: best score first,
+    drop any overlapping an already kept one by more than `max_overlap`
+    (intersection over union), keep at most `top_k` and return them in time
+    order. Unscored highlights rank last.
+    """
+    timed = [(h, r) for h in highlights if (r := h.time_range) is not None]
+    ranked = sorted(timed, key=lambda pair: -(pair[0].score if pair[0].score is not None else -1.0))
+    kept: List[tuple[Highlight, TimeRange]] = []
+    for h, r in ranked:
+        if top_k is not None and len(kept) >= top_k:
+            break
+        if all(overlap_ratio(r, other) <= max_overlap for _, other in kept):
+            kept.append((h, r))
+    kept.sort(key=lambda pair: pair[1].start)
+    return HighlightsResponse(highlights=[h for h, _ in kept])
+
+
+def normalize_highlights(
+    highlights: HighlightsResponse,
+    duration: Optional[float] = None,
+    min_length: float = 1.0,
+    duplicate_overlap: float = 0.8,
+) -> HighlightsResponse:
+    """
+    Highlights ready to cut, one clip each, in their original order:
+
+    - ranges are clamped to [0, duration] when the duration is known;
+    - untimed highlights are kept as they are, but ones shorter than
+      `min_length` once clamped are dropped;
+    - a highlight nested inside another, or overlapping it by more than
+      `duplicate_overlap` (intersection over union), is folded into it: one
+      range covering both, under the better scored highlight's ID. `folded`
+      maps the ID of every highlight folded away to the ID kept.
+    """
+    untimed: List[tuple[int, Highlight]] = []
+    timed: List[tuple[int, Highlight, TimeRange]] = []
+    for i, h in enumerate(highlights.highlights):
+        r = h.time_range
+        if r is None:
+            untimed.append((i, h))
+            continue
+        clamped = TimeRange(
+            start=max(0.0, r.start),
+            end=min(r.end, duration) if duration is not None else r.end,
+        )
+        if clamped.length >= min_length:
+            timed.append((i, h, clamped))
+
+    kept: List[tuple[int, Highlight, TimeRange]] = []
+    # IDs folded into each kept highlight, by its position in `kept`
+    members: List[List[str]] = []
+    # Widest first among equal starts, so nested ranges find their container
+    for i, h, r in sorted(timed, key=lambda item: (item[2].start, -item[2].end)):
+        match = next(
+            (
+                k
+                for k, (_, _, other) in enumerate(kept)
+                if other.contains(r) or overlap_ratio(r, other) > duplicate_overlap
+            ),
+            None,
+        )
+        if match is None:
+            kept.append((i, h, r))
+            members.append([])
+            continue
+        other_i, other_h, other_r = kept[match]
+        union = TimeRange(start=min(r.start, other_r.start), end=max(r.end, other_r.end))
+        if _score(h) > _score(other_h):
+            kept[match] = (i, h, union)
+            members[match].append(other_h.id)
+        else:
+            kept[match] = (other_i, other_h, union)
+            members[match].append(h.id)
+
+    folded = {
+        folded_id: h.id for (_, h, _), ids in zip(kept, members) for folded_id in ids
+    }
+    # Highlights folded by an earlier pass follow the ones they were folded into
+    for folded_id, kept_id in highlights.folded.items():
+        folded[folded_id] = folded.get(kept_id, kept_id)
+
+    normalized = [(i, h.model_copy(update={"time_range": r})) for i, h, r in kept]
+    return HighlightsResponse(
+        highlights=[h for _, h in sorted(normalized + untimed)],
+        folded=folded,
+    )
+
+
+def _score(highlight: Highlight) -> float:
+    # Unscored highlights rank last
+    return highlight.score if highlight.score is not None else -1.0
@@ -1,6 +1,20 @@
-from typing import List, Any, Optional
+import os
+import re
+import hashlib
+import shutil
+import tempfile
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    ContextManager,
+    Iterator,
+    List,
+    Optional,
+)
 from abc import ABC, abstractmethod
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field, model_validator
 
 
 # Repository for storing clip URLs associated with highlight IDs
@@ -21,15 +35,96 @@ class ClipResult(BaseModel):
     video_id: str
 
 
+class DownloadResult(BaseModel):
+    path: str
+    duration: Optional[float] = None  # seconds
+    container: Optional[str] = None  # e.g. "mp4"
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+
+
+def parse_timestamp(ts: str) -> float:
+    """
+    Convert an "HH:MM:SS", "MM:SS" or "SS" timestamp (seconds may be fractional)
+    into seconds.
+    """
+    parts = ts.strip().split(":")
+    if not 1 <= len(parts) <= 3 or any(p == "" for p in parts):
+        raise ValueError(f"Timestamp '{ts}' is not in HH:MM:SS or MM:SS format.")
+    seconds = 0.0
+    for part in parts[:-1]:
+        seconds = seconds * 60 + int(part)
+    return seconds * 60 + float(parts[-1])
+
+
+def format_timestamp(seconds: float) -> str:
+    """
+    Format seconds as "HH:MM:SS", keeping milliseconds only when needed.
+    """
+    millis = round(seconds * 1000)
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    if millis:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+class TimeRange(BaseModel):
+    start: float  # seconds
+    end: float
+
+    @property
+    def length(self) -> float:
+        return self.end - self.start
+
+    def contains(self, other: "TimeRange") -> bool:
+        return self.start <= other.start and other.end <= self.end
+
+
 class Highlight(BaseModel):
+    """
+    A moment worth clipping. The pipeline works with `time_range`, in seconds;
+    start_time and end_time are its "HH:MM:SS" form, parsed when a highlight is
+    read and formatted when it is written out (API responses, task payloads,
+    checkpoints). A highlight without both is untimed.
+    """
+
     id: str
-    start_time: Optional[str]  # e.g. "00:15"
-    end_time: Optional[str]  # e.g. "00:45"
+    time_range: Optional[TimeRange] = Field(default=None, exclude=True)
     description: Optional[str]
+    score: Optional[float] = None  # relevance, 0-100
+
+    @model_validator(mode="before")
+    @classmethod
+    def parse_times(cls, data: Any) -> Any:
+        if isinstance(data, dict) and data.get("time_range") is None:
+            start, end = data.get("start_time"), data.get("end_time")
+            if start is not None and end is not None:
+                data = {
+                    **data,
+                    "time_range": TimeRange(
+                        start=parse_timestamp(start), end=parse_timestamp(end)
+                    ),
+                }
+        return data
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def start_time(self) -> Optional[str]:
+        return format_timestamp(self.time_range.start) if self.time_range else None
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def end_time(self) -> Optional[str]:
+        return format_timestamp(self.time_range.end) if self.time_range else None
 
 
 class HighlightsResponse(BaseModel):
     highlights: List[Highlight]
+    # ID of each highlight folded into another -> ID of the highlight kept,
+    # whose clip it shares
+    folded: dict[str, str] = {}
 
 
 class VideoUnderstandingService(ABC):
@@ -43,21 +138,118 @@ class VideoUnderstandingService(ABC):
     ) -> HighlightsResponse:
         pass
 
+    def iter_highlights(self, video_url: str, prompt: Optional[str] = None) -> Iterator[Highlight]:
+        """
+        Yield each highlight as soon as it is found. Implementations that can't
+        stream fall back to analyze_video_highlights.
+        """
+        yield from self.analyze_video_highlights(video_url, prompt).highlights
+
+
+class AsyncVideoUnderstandingService(ABC):
+    """
+    Interface for video understanding services with an async API.
+    """
+
+    @abstractmethod
+    async def analyze_video_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> HighlightsResponse:
+        pass
+
+    async def iter_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> AsyncIterator[Highlight]:
+        """
+        Async counterpart of VideoUnderstandingService.iter_highlights.
+        """
+        for highlight in (await self.analyze_video_highlights(video_url, prompt)).highlights:
+            yield highlight
+
+
+class GeneratedClip(BaseModel):
+    highlight_id: str
+    path: str
+
+
+class ClipStream(BaseModel):
+    """
+    A clip rendered while it is read. Entering `open_stream()` starts the render
+    and yields its output; reading past the end raises if the render failed.
+    """
+
+    highlight_id: str
+    filename: str
+    open_stream: Callable[[], ContextManager[BinaryIO]]
+
 
 class VideoClipperService(ABC):
+    # Whether iter_clip_streams is supported
+    streams_clips: bool = False
+
     @abstractmethod
-    def clip_video(self, video_url: str, highlights: "HighlightsResponse") -> list[str]:
+    def clip_video(
+        self, video_url: str, highlights: "HighlightsResponse", out_dir: Optional[str] = None
+    ) -> list[str]:
         """
         Clip the video based on highlights and return list of clip URLs or paths.
+        Clips are written to `out_dir`, or the system temp directory.
+        """
+
+    def iter_clips(
+        self, video_url: str, highlights: "HighlightsResponse", out_dir: Optional[str] = None
+    ) -> Iterator[GeneratedClip]:
+        """
+        Yield each clip as soon as it is written, tagged with its highlight ID.
+        Clips may arrive in any order. Implementations that can't stream fall back
+        to clip_video, which returns one path per timed highlight, in order.
+        """
+        timed = [h for h in highlights.highlights if h.time_range is not None]
+        for highlight, path in zip(timed, self.clip_video(video_url, highlights, out_dir)):
+            yield GeneratedClip(highlight_id=highlight.id, path=path)
+
+    def iter_clip_streams(
+        self, video_url: str, highlights: "HighlightsResponse"
+    ) -> Iterator[ClipStream]:
+        """
+        Yield one ClipStream per timed highlight, for clippers that can write
+        straight to a pipe instead of a file (see `streams_clips`).
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot stream clips.")
+
+
+class BoundaryRefiner(ABC):
+    @abstractmethod
+    def refine(self, source_path: str, highlights: HighlightsResponse) -> HighlightsResponse:
+        """
+        Return the highlights with their start and end moved to better cut points
+        in the source at `source_path`. IDs, order and `folded` are kept.
         """
 
 
 class StorageService(ABC):
     @abstractmethod
-    def save_video(self, clip_path: str) -> str:
+    def save_video(self, clip_path: str, key_prefix: Optional[str] = None) -> str:
         """
         Save the video clip to storage and return the storage URL.
+        `key_prefix` namespaces the stored object, e.g. by video and job.
+        """
+
+    def save_stream(
+        self, stream: BinaryIO, filename: str, key_prefix: Optional[str] = None
+    ) -> str:
+        """
+        Save a clip read from `stream` under `filename` and return the storage URL.
+        Backends that can't upload incrementally spool the stream to disk first.
         """
+        spool_dir = tempfile.mkdtemp(prefix="ezclip-spool-")
+        try:
+            path = os.path.join(spool_dir, filename)
+            with open(path, "wb") as f:
+                shutil.copyfileobj(stream, f)
+            return self.save_video(path, key_prefix)
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
 
 
 class HighlightRepository(ABC):
@@ -66,3 +258,119 @@ class HighlightRepository(ABC):
         """
         Save highlights metadata for a video.
         """
+
+
+class JobResultRepository(ABC):
+    """
+    Unit of work for a finished job: highlights and their clip URLs are saved together.
+    """
+
+    @abstractmethod
+    def save_job_result(
+        self,
+        video_id: str,
+        highlights: "HighlightsResponse",
+        highlight_to_url: dict[str, str],
+    ) -> None:
+        """
+        Save highlights metadata and the highlight ID to clip URL mapping atomically.
+        """
+
+
+class JobCheckpoint(BaseModel):
+    """
+    Progress of one clipping job, so a retry can skip the stages already done.
+    """
+
+    job_id: str
+    video_url: str
+    prompt: Optional[str] = None
+    highlights: Optional[HighlightsResponse] = None
+    boundaries_refined: bool = False
+    source: Optional[DownloadResult] = None
+    source_checksum: Optional[str] = None
+    clips: dict[str, str] = {}  # highlight ID -> local clip path
+    urls: dict[str, str] = {}  # highlight ID -> uploaded clip URL
+    result: Optional[ClipResult] = None
+
+
+class CheckpointStore(ABC):
+    @abstractmethod
+    def load(self, job_id: str) -> Optional[JobCheckpoint]:
+        """
+        Return the saved checkpoint for a job, or None.
+        """
+
+    @abstractmethod
+    def save(self, checkpoint: JobCheckpoint) -> None:
+        """
+        Save (replace) the checkpoint for `checkpoint.job_id`.
+        """
+
+
+class JobWorkspaceProvider(ABC):
+    @abstractmethod
+    def workspace(
+        self,
+        job_id: str,
+        keep_on_failure: Optional[Callable[[BaseException], bool]] = None,
+    ) -> ContextManager[str]:
+        """
+        Wait until there is room to start the job, then yield a scratch directory
+        of its own for downloads and clips. The directory is deleted when the
+        context exits, unless the job failed with an error `keep_on_failure`
+        accepts; a retry with the same `job_id` then gets it back as it was left.
+        """
+
+
+def clip_filename(source_path: str, highlight: Highlight, ext: Optional[str] = None) -> str:
+    """
+    File name for a highlight's clip. Highlight IDs are unique within a job, so
+    clips cut by separate workers or tasks never collide.
+    """
+    base, source_ext = os.path.splitext(os.path.basename(source_path))
+    slug = re.sub(r"[^\w-]", "_", highlight.id)
+    return f"{base}_clip_{slug}{ext or source_ext}"
+
+
+def get_youtube_video_id(url: str) -> str:
+    """
+    Extracts the YouTube video ID from a given URL.
+    Supports both youtube.com and youtu.be formats.
+    """
+
+    # Patterns for youtube.com and youtu.be
+    patterns = [
+        r"(?:v=|\/embed\/|\/v\/|\/shorts\/|youtu\.be\/)([\w-]{11})",
+        r"youtube\.com\/watch\?.*v=([\w-]{11})",
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    raise ValueError(f"Could not extract YouTube video ID from URL: {url}")
+
+
+def is_youtube_url(url: str) -> bool:
+    """
+    Whether `url` points at a single YouTube video, by the same rules as
+    get_youtube_video_id.
+    """
+    try:
+        get_youtube_video_id(url)
+    except ValueError:
+        return False
+    return True
+
+
+def source_video_id(url: str) -> str:
+    """
+    ID a job's results are stored under: the YouTube video ID, or for any other
+    source a short hash of its URL, or of its absolute path for local files.
+    """
+    if is_youtube_url(url):
+        return get_youtube_video_id(url)
+    source = url.strip()
+    if "://" not in source:
+        source = os.path.abspath(os.path.expanduser(source))
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
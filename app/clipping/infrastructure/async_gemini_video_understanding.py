@@ -0,0 +1,394 @@
+import os
+import random
+import asyncio
+import logging
+import threading
+import queue
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+import httpx
+from google.genai import errors
+from pydantic import ValidationError
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import (
+    AsyncVideoUnderstandingService,
+    Highlight,
+    HighlightsResponse,
+    VideoUnderstandingService,
+)
+from app.clipping.domain.time_ranges import (
+    TimeRange,
+    offset_highlights,
+    plan_analysis_windows,
+    select_top_highlights,
+)
+from app.clipping.infrastructure.gemini_file_uploader import GeminiFileRef, GeminiFileUploader
+from app.clipping.infrastructure.gemini_rate_limiter import GeminiRateLimiter
+from app.clipping.infrastructure.json_stream import JsonArrayItemParser
+from app.clipping.infrastructure.gemini_video_understanding import (
+    MODEL_NAME,
+    PROMPT_TEMPLATE_VERSION,
+    VideoUnderstandingHighlight,
+    build_contents,
+    build_generate_config,
+    get_genai_client,
+    parse_highlights_response,
+    parse_highlights_text,
+    to_highlights_response,
+)
+
+load_dotenv()
+
+# Gemini requests in flight at once per process
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "5"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "60"))
+# Tokens charged to the rate limiter before a request; settled with the
+# response's usage metadata afterwards
+GEMINI_ESTIMATED_TOKENS_PER_REQUEST = int(
+    os.getenv("GEMINI_ESTIMATED_TOKENS_PER_REQUEST", "50000")
+)
+# Videos longer than this are analyzed as overlapping windows in parallel;
+# 0 disables chunking
+GEMINI_CHUNK_THRESHOLD_SECONDS = float(os.getenv("GEMINI_CHUNK_THRESHOLD_SECONDS", "2400"))
+GEMINI_CHUNK_WINDOW_SECONDS = float(os.getenv("GEMINI_CHUNK_WINDOW_SECONDS", "1800"))
+GEMINI_CHUNK_OVERLAP_SECONDS = float(os.getenv("GEMINI_CHUNK_OVERLAP_SECONDS", "60"))
+# Highlights kept after merging the windows; 0 keeps all
+GEMINI_CHUNK_TOP_K = int(os.getenv("GEMINI_CHUNK_TOP_K", "10"))
+# Highlights from neighbouring windows overlapping more than this (intersection
+# over union) are treated as the same one
+CHUNK_DUPLICATE_OVERLAP = 0.5
+# Status codes worth retrying: throttling and server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)],
+    so throttled workers spread their retries instead of retrying in lockstep.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class AsyncGeminiVideoUnderstandingService(AsyncVideoUnderstandingService):
+    """
+    Async Gemini highlight detection over the shared client. Requests wait
+    for the rate limiter, at most `max_concurrency` run at once, and 429/5xx
+    responses and unparsable answers are retried with jittered backoff. Other
+    client errors fail straight away.
+
+    Given a `duration_lookup`, videos longer than `chunk_threshold` are sent as
+    overlapping windows (video metadata offsets on the same file URI) analyzed
+    concurrently, so latency tracks one window rather than the whole video.
+    Window results are moved back to absolute time, deduplicated where the
+    windows overlap and cut down to the `chunk_top_k` best scored.
+
+    iter_highlights streams the response and yields each highlight once its
+    JSON object is complete. Chunked analyses can only rank highlights once
+    every window is done, so they are yielded at the end.
+
+    Given a `file_uploader`, sources Gemini can't fetch itself (local files,
+    non-YouTube URLs) are sent as an uploaded low-resolution proxy.
+    """
+
+    model_name = MODEL_NAME
+    prompt_version = PROMPT_TEMPLATE_VERSION
+
+    def __init__(
+        self,
+        client: Any = None,
+        rate_limiter: Optional[GeminiRateLimiter] = None,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        max_attempts: int = GEMINI_MAX_ATTEMPTS,
+        backoff_base: float = GEMINI_BACKOFF_BASE_SECONDS,
+        backoff_max: float = GEMINI_BACKOFF_MAX_SECONDS,
+        estimated_tokens: int = GEMINI_ESTIMATED_TOKENS_PER_REQUEST,
+        duration_lookup: Optional[Callable[[str], Optional[float]]] = None,
+        chunk_threshold: float = GEMINI_CHUNK_THRESHOLD_SECONDS,
+        chunk_window: float = GEMINI_CHUNK_WINDOW_SECONDS,
+        chunk_overlap: float = GEMINI_CHUNK_OVERLAP_SECONDS,
+        chunk_top_k: int = GEMINI_CHUNK_TOP_K,
+        file_uploader: Optional[GeminiFileUploader] = None,
+    ):
+        self.client = client or get_genai_client()
+        self.rate_limiter = rate_limiter or GeminiRateLimiter()
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.estimated_tokens = estimated_tokens
+        self.duration_lookup = duration_lookup
+        self.chunk_threshold = chunk_threshold
+        self.chunk_window = chunk_window
+        self.chunk_overlap = chunk_overlap
+        self.chunk_top_k = chunk_top_k
+        self.file_uploader = file_uploader
+        # Created lazily, so it binds to the loop the service runs on
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def analyze_video_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> HighlightsResponse:
+        source = await self._resolve_source(video_url)
+        windows = await self._plan_windows(video_url)
+        if windows is None:
+            contents = build_contents(source.uri, prompt, mime_type=source.mime_type)
+            return await self.generate(contents)
+        return await self._analyze_windows(source, prompt, windows)
+
+    async def iter_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> AsyncIterator[Highlight]:
+        source = await self._resolve_source(video_url)
+        windows = await self._plan_windows(video_url)
+        if windows is not None:
+            for highlight in (await self._analyze_windows(source, prompt, windows)).highlights:
+                yield highlight
+            return
+
+        contents = build_contents(source.uri, prompt, mime_type=source.mime_type)
+        config = build_generate_config()
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            yielded = 0
+            async with self._slots():
+                await self._wait_for_quota()
+                parser = JsonArrayItemParser()
+                text = ""
+                usage = None
+                try:
+                    stream = await self.client.aio.models.generate_content_stream(
+                        model=MODEL_NAME, contents=contents, config=config
+                    )
+                    async for chunk in stream:
+                        usage = chunk.usage_metadata or usage
+                        text += chunk.text or ""
+                        for item in parser.feed(chunk.text or ""):
+                            highlight = self._parse_streamed_item(item)
+                            if highlight is not None:
+                                yielded += 1
+                                yield highlight
+                except (errors.APIError, httpx.TransportError) as e:
+                    self.rate_limiter.adjust(-self.estimated_tokens)
+                    retryable = (
+                        isinstance(e, httpx.TransportError) or e.code in RETRYABLE_STATUS_CODES
+                    )
+                    # Highlights already handed out can't be taken back by a retry
+                    if yielded or not retryable or last_attempt:
+                        raise RuntimeError(
+                            f"Error streaming highlights from video after {attempt + 1} attempts: {e}"
+                        ) from e
+                    logger.warning("Gemini stream failed, retrying: %s", e)
+                else:
+                    self._settle_usage(usage)
+                    if yielded:
+                        return
+                    try:
+                        # Nothing streamed: a valid empty answer, or a malformed one
+                        for highlight in to_highlights_response(
+                            parse_highlights_text(text).highlights
+                        ).highlights:
+                            yield highlight
+                        return
+                    except ValueError as e:
+                        if last_attempt:
+                            raise RuntimeError(
+                                f"Failed to parse JSON response after {attempt + 1} attempts: {e}"
+                            ) from e
+                        logger.warning("Unparsable Gemini response, retrying: %s", e)
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+
+        raise RuntimeError("Failed to generate highlights after all retry attempts")
+
+    async def _analyze_windows(
+        self, source: GeminiFileRef, prompt: Optional[str], windows: List[TimeRange]
+    ) -> HighlightsResponse:
+        logger.info("Analyzing %s as %d windows", source.uri, len(windows))
+        tasks = [
+            asyncio.ensure_future(
+                self.generate(build_contents(source.uri, prompt, window, source.mime_type))
+            )
+            for window in windows
+        ]
+        try:
+            results = await asyncio.gather(*tasks)
+        except Exception:
+            # One window failing fails the analysis; don't pay for the rest
+            for task in tasks:
+                task.cancel()
+            raise
+        highlights = [
+            h
+            for window, result in zip(windows, results)
+            for h in offset_highlights(result, window).highlights
+        ]
+        return select_top_highlights(
+            highlights, self.chunk_top_k or None, CHUNK_DUPLICATE_OVERLAP
+        )
+
+    async def _resolve_source(self, video_url: str) -> GeminiFileRef:
+        if self.file_uploader is None:
+            return GeminiFileRef(uri=video_url)
+        return await self.file_uploader.resolve(video_url)
+
+    async def _plan_windows(self, video_url: str) -> Optional[List[TimeRange]]:
+        if self.duration_lookup is None or self.chunk_threshold <= 0:
+            return None
+        duration = await asyncio.to_thread(self.duration_lookup, video_url)
+        if duration is None or duration <= self.chunk_threshold:
+            return None
+        return plan_analysis_windows(duration, self.chunk_window, self.chunk_overlap)
+
+    async def generate(self, contents: Any) -> HighlightsResponse:
+        """
+        Highlights for any request contents, under this service's rate limit,
+        concurrency cap and retries.
+        """
+        config = build_generate_config()
+
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            async with self._slots():
+                await self._wait_for_quota()
+                try:
+                    response = await self.client.aio.models.generate_content(
+                        model=MODEL_NAME, contents=contents, config=config
+                    )
+                except (errors.APIError, httpx.TransportError) as e:
+                    # The request was not served, so its estimated tokens weren't used
+                    self.rate_limiter.adjust(-self.estimated_tokens)
+                    retryable = (
+                        isinstance(e, httpx.TransportError) or e.code in RETRYABLE_STATUS_CODES
+                    )
+                    if not retryable or last_attempt:
+                        raise RuntimeError(
+                            f"Error generating highlights from video after {attempt + 1} attempts: {e}"
+                        ) from e
+                    logger.warning("Gemini request failed, retrying: %s", e)
+                else:
+                    self._settle_usage(getattr(response, "usage_metadata", None))
+                    try:
+                        return to_highlights_response(parse_highlights_response(response).highlights)
+                    except ValueError as e:
+                        if last_attempt:
+                            raise RuntimeError(
+                                f"Failed to parse JSON response after {attempt + 1} attempts: {e}"
+                            ) from e
+                        logger.warning("Unparsable Gemini response, retrying: %s", e)
+            # Back off outside the semaphore so other requests can use the slot
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+
+        raise RuntimeError("Failed to generate highlights after all retry attempts")
+
+    def _slots(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _wait_for_quota(self) -> None:
+        while True:
+            wait = await asyncio.to_thread(self.rate_limiter.try_acquire, self.estimated_tokens)
+            if wait <= 0:
+                return
+            logger.info("Gemini quota exhausted, waiting %.1fs", wait)
+            # A little jitter keeps waiting workers from waking together
+            await asyncio.sleep(wait + random.uniform(0, min(1.0, wait)))
+
+    def _parse_streamed_item(self, item: Any) -> Optional[Highlight]:
+        try:
+            parsed = VideoUnderstandingHighlight.model_validate(item)
+        except ValidationError as e:
+            logger.warning("Skipping invalid streamed highlight %s: %s", item, e)
+            return None
+        return to_highlights_response([parsed]).highlights[0]
+
+    def _settle_usage(self, usage: Any) -> None:
+        total = getattr(usage, "total_token_count", None)
+        if total is not None:
+            self.rate_limiter.adjust(total - self.estimated_tokens)
+
+
+class BackgroundEventLoop:
+    """
+    An event loop running forever in a daemon thread, so synchronous code can
+    run coroutines that share one client, semaphore and connection pool.
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="async-gemini-loop", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def iterate(self, iterable: AsyncIterator[T]) -> Iterator[T]:
+        """
+        Consume an async iterator on the loop and yield its items here. Items are
+        buffered, so a slow consumer never stalls the producer; closing this
+        iterator early cancels the producer.
+        """
+        items: "queue.Queue[Any]" = queue.Queue()
+        done = object()
+
+        async def pump() -> None:
+            try:
+                async for item in iterable:
+                    items.put(item)
+            finally:
+                items.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop)
+        try:
+            while (item := items.get()) is not done:
+                yield item
+            future.result()
+        finally:
+            future.cancel()
+
+
+@lru_cache(maxsize=1)
+def get_background_loop() -> BackgroundEventLoop:
+    return BackgroundEventLoop()
+
+
+class SyncVideoUnderstandingAdapter(VideoUnderstandingService):
+    """
+    Blocking VideoUnderstandingService over an async one, for the Celery tasks
+    and the sync router. Calls from any thread run on one background loop, so
+    the async service's concurrency cap applies to the whole process.
+    """
+
+    def __init__(
+        self,
+        inner: AsyncVideoUnderstandingService,
+        background_loop: Optional[BackgroundEventLoop] = None,
+    ):
+        self.inner = inner
+        self.background_loop = background_loop or get_background_loop()
+        self.model_name = getattr(inner, "model_name", type(inner).__name__)
+        self.prompt_version = getattr(inner, "prompt_version", "0")
+
+    def analyze_video_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> HighlightsResponse:
+        return self.background_loop.run(self.inner.analyze_video_highlights(video_url, prompt))
+
+    def iter_highlights(self, video_url: str, prompt: Optional[str] = None) -> Iterator[Highlight]:
+        return self.background_loop.iterate(self.inner.iter_highlights(video_url, prompt))
@@ -0,0 +1,195 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+import ffmpeg  # type: ignore
+import numpy as np
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import (
+    BoundaryRefiner,
+    HighlightsResponse,
+)
+from app.clipping.domain.time_ranges import TimeRange
+from app.clipping.infrastructure.ffmpeg_pipe import PIPE_OUTPUT, open_ffmpeg_pipe
+from app.clipping.infrastructure.ffmpeg_scheduler import (
+    FFmpegSlotScheduler,
+    get_ffmpeg_scheduler,
+)
+
+load_dotenv()
+
+# Highlight edges move to the middle of the nearest pause at most this far away
+AUDIO_SNAP_TOLERANCE_SECONDS = float(os.getenv("AUDIO_SNAP_TOLERANCE_SECONDS", "1.5"))
+# Shorter dips in energy are gaps between words, not pauses
+AUDIO_SNAP_MIN_PAUSE_SECONDS = float(os.getenv("AUDIO_SNAP_MIN_PAUSE_SECONDS", "0.15"))
+# Speech energy sits well below 4 kHz, so 8 kHz mono is plenty to find pauses
+AUDIO_SNAP_SAMPLE_RATE = int(os.getenv("AUDIO_SNAP_SAMPLE_RATE", "8000"))
+AUDIO_FRAME_SECONDS = 0.02
+# A frame is silent below this fraction of the way from the noise floor (5th
+# percentile of frame energy, in dB) to the speech level (90th percentile)
+SILENCE_FRACTION = 0.3
+# With less contrast than this between floor and speech (music, constant noise)
+# there are no pauses to find
+MIN_DYNAMIC_RANGE_DB = 10.0
+# Sources whose pause maps are kept, for clip tasks of the same job
+PAUSE_CACHE_ENTRIES = 8
+FRAMES_PER_READ = 4096
+
+logger = logging.getLogger(__name__)
+
+
+def frame_energies_db(pcm: bytes, frame_samples: int) -> np.ndarray:
+    """
+    Mean power in dB of each whole frame of 16-bit mono PCM.
+    """
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    frames = samples[: len(samples) // frame_samples * frame_samples].reshape(-1, frame_samples)
+    return 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-3)
+
+
+def find_pauses(energies_db: np.ndarray, frame_seconds: float, min_pause: float) -> np.ndarray:
+    """
+    Midpoints, in seconds, of the runs of silent frames lasting at least `min_pause`.
+    """
+    if len(energies_db) == 0:
+        return np.empty(0)
+    floor, speech = np.percentile(energies_db, [5, 90])
+    if speech - floor < MIN_DYNAMIC_RANGE_DB:
+        return np.empty(0)
+    silent = energies_db < floor + (speech - floor) * SILENCE_FRACTION
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    long_enough = (ends - starts) * frame_seconds >= min_pause
+    return (starts[long_enough] + ends[long_enough]) / 2 * frame_seconds
+
+
+def snap_to_pauses(times: np.ndarray, pauses: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Move each time to the nearest pause, unless that is more than `tolerance` away.
+    """
+    bounded = np.concatenate(([-np.inf], pauses, [np.inf]))
+    i = np.searchsorted(bounded, times)
+    before, after = bounded[i - 1], bounded[i]
+    nearest = np.where(times - before <= after - times, before, after)
+    return np.where(np.abs(nearest - times) <= tolerance, nearest, times)
+
+
+class AudioPauseSnapper(BoundaryRefiner):
+    """
+    Moves highlight edges to the nearest pause in the source's audio, so clips
+    don't start or end mid-word. The audio is decoded once per source by ffmpeg
+    to low-rate mono PCM, and the short-time energy is computed with NumPy as it
+    streams in; the resulting pause map is kept for later highlights of the
+    same source. Sources without usable audio are left as they are.
+    """
+
+    def __init__(
+        self,
+        tolerance: float = AUDIO_SNAP_TOLERANCE_SECONDS,
+        min_pause: float = AUDIO_SNAP_MIN_PAUSE_SECONDS,
+        sample_rate: int = AUDIO_SNAP_SAMPLE_RATE,
+        scheduler: Optional[FFmpegSlotScheduler] = None,
+    ):
+        self.tolerance = tolerance
+        self.min_pause = min_pause
+        self.sample_rate = sample_rate
+        self.scheduler = scheduler or get_ffmpeg_scheduler()
+        self._pauses: OrderedDict[tuple[str, int, float], np.ndarray] = OrderedDict()
+        # One decode at a time per source, so concurrent callers share the first
+        # one while other sources decode in parallel
+        self._decode_locks: dict[str, threading.Lock] = {}
+        # Guards _pauses and _decode_locks
+        self._lock = threading.Lock()
+
+    def refine(self, source_path: str, highlights: HighlightsResponse) -> HighlightsResponse:
+        ranges = {h.id: h.time_range for h in highlights.highlights}
+        timed = [h for h in highlights.highlights if ranges[h.id] is not None]
+        if not timed:
+            return highlights
+        try:
+            pauses = self.pauses(source_path)
+        except (OSError, RuntimeError) as e:
+            logger.warning(
+                "Could not read audio of %s, keeping highlight edges: %s", source_path, e
+            )
+            return highlights
+
+        edges = np.array([[ranges[h.id].start, ranges[h.id].end] for h in timed])
+        snapped = snap_to_pauses(edges.ravel(), pauses, self.tolerance).reshape(-1, 2)
+        updates = {}
+        for h, (start, end), original in zip(timed, snapped, edges):
+            # Two edges snapping into the same pause would leave nothing to clip
+            if end - start < self.min_pause:
+                start, end = original
+            updates[h.id] = {
+                "time_range": TimeRange(start=round(float(start), 2), end=round(float(end), 2))
+            }
+        logger.info(
+            "Snapped %d of %d highlight edges to audio pauses in %s",
+            np.count_nonzero(snapped != edges),
+            edges.size,
+            source_path,
+        )
+        return highlights.model_copy(
+            update={
+                "highlights": [
+                    h.model_copy(update=updates[h.id]) if h.id in updates else h
+                    for h in highlights.highlights
+                ]
+            }
+        )
+
+    def pauses(self, source_path: str) -> np.ndarray:
+        stat = os.stat(source_path)
+        key = (source_path, stat.st_size, stat.st_mtime)
+        with self._lock:
+            decode_lock = self._decode_locks.setdefault(source_path, threading.Lock())
+        with decode_lock:
+            with self._lock:
+                cached = self._pauses.get(key)
+                if cached is not None:
+                    self._pauses.move_to_end(key)
+                    return cached
+            started = time.perf_counter()
+            energies = self._frame_energies(source_path)
+            pauses = find_pauses(energies, AUDIO_FRAME_SECONDS, self.min_pause)
+            logger.info(
+                "Found %d pauses in %.0fs of audio of %s in %.2fs",
+                len(pauses),
+                len(energies) * AUDIO_FRAME_SECONDS,
+                source_path,
+                time.perf_counter() - started,
+            )
+            with self._lock:
+                self._pauses[key] = pauses
+                while len(self._pauses) > PAUSE_CACHE_ENTRIES:
+                    evicted, _, _ = self._pauses.popitem(last=False)[0]
+                    lock = self._decode_locks.get(evicted)
+                    if lock is not None and not lock.locked():
+                        del self._decode_locks[evicted]
+            return pauses
+
+    def _frame_energies(self, source_path: str) -> np.ndarray:
+        frame_samples = round(self.sample_rate * AUDIO_FRAME_SECONDS)
+        read_size = frame_samples * 2 * FRAMES_PER_READ
+
+        def build_output(threads: int):
+            return ffmpeg.input(source_path).output(
+                PIPE_OUTPUT,
+                f="s16le",
+                acodec="pcm_s16le",
+                ac=1,
+                ar=self.sample_rate,
+                vn=None,
+                threads=threads,
+            )
+
+        chunks = []
+        with open_ffmpeg_pipe(build_output, self.scheduler) as pcm:
+            # Whole frames per read, so no frame straddles two chunks
+            while chunk := pcm.read(read_size):
+                chunks.append(frame_energies_db(chunk, frame_samples))
+        return np.concatenate(chunks) if chunks else np.empty(0)
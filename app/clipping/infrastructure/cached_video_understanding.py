@@ -0,0 +1,204 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Iterator, Optional
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import (
+    VideoUnderstandingService,
+    Highlight,
+    HighlightsResponse,
+    get_youtube_video_id,
+    is_youtube_url,
+)
+
+load_dotenv()
+
+HIGHLIGHT_CACHE_TTL_SECONDS = int(os.getenv("HIGHLIGHT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+HIGHLIGHT_CACHE_MAX_ENTRIES = int(os.getenv("HIGHLIGHT_CACHE_MAX_ENTRIES", "256"))
+HIGHLIGHT_CACHE_KEY_PREFIX = "ezclip:highlights"
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: Optional[str]) -> str:
+    """
+    The prompt without surrounding whitespace. Anything else, case included, can
+    change what the model is asked, so it is part of the cache key.
+    """
+    return (prompt or "").strip()
+
+
+def source_fingerprint(video_url: str) -> str:
+    """
+    What identifies a source's content: the YouTube video ID, or for a local
+    file its resolved path, modification time and size, so a file replaced at
+    the same path isn't served the old file's highlights. Other URLs are hashed.
+    """
+    if is_youtube_url(video_url):
+        return get_youtube_video_id(video_url)
+    source = video_url.strip()
+    if "://" not in source:
+        source = os.path.realpath(os.path.expanduser(source))
+        try:
+            stat = os.stat(source)
+        except OSError:
+            pass
+        else:
+            source = f"{source}:{stat.st_mtime_ns}:{stat.st_size}"
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+class CachedVideoUnderstandingService(VideoUnderstandingService):
+    """
+    Caching decorator for any VideoUnderstandingService.
+
+    Results are looked up in an in-process LRU tier first and then in a shared Redis
+    tier, keyed by source fingerprint, prompt hash, model name and prompt template
+    version. The LRU tier evicts by entry count and TTL; the Redis tier uses the same
+    TTL and relies on the server's maxmemory policy for size-based eviction.
+    """
+
+    def __init__(
+        self,
+        inner: VideoUnderstandingService,
+        redis_client: Optional[Any] = None,
+        ttl_seconds: int = HIGHLIGHT_CACHE_TTL_SECONDS,
+        max_entries: int = HIGHLIGHT_CACHE_MAX_ENTRIES,
+        model_name: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+    ):
+        self.inner = inner
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.model_name = model_name or getattr(inner, "model_name", type(inner).__name__)
+        self.prompt_version = prompt_version or getattr(inner, "prompt_version", "0")
+        self._local: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Counter[str] = Counter()
+
+    def analyze_video_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> HighlightsResponse:
+        key = self.cache_key(video_url, prompt)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        self._count("misses")
+        highlights = self.inner.analyze_video_highlights(video_url, prompt)
+        self._store(key, highlights)
+        return highlights
+
+    def iter_highlights(self, video_url: str, prompt: Optional[str] = None) -> Iterator[Highlight]:
+        """
+        Cached highlights at once, or the inner service's stream, cached once it
+        has been read to the end.
+        """
+        key = self.cache_key(video_url, prompt)
+        cached = self._lookup(key)
+        if cached is not None:
+            yield from cached.highlights
+            return
+
+        self._count("misses")
+        found: list[Highlight] = []
+        for highlight in self.inner.iter_highlights(video_url, prompt):
+            found.append(highlight)
+            yield highlight
+        self._store(key, HighlightsResponse(highlights=found))
+
+    def cache_key(self, video_url: str, prompt: Optional[str] = None) -> str:
+        video_id = source_fingerprint(video_url)
+        prompt_hash = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+        return ":".join(
+            [
+                HIGHLIGHT_CACHE_KEY_PREFIX,
+                self.model_name,
+                f"v{self.prompt_version}",
+                video_id,
+                prompt_hash[:32],
+            ]
+        )
+
+    def stats(self) -> dict[str, int]:
+        """
+        Hit/miss counters since the service was created.
+        """
+        with self._lock:
+            return {
+                "local_hits": self._counters["local_hits"],
+                "redis_hits": self._counters["redis_hits"],
+                "misses": self._counters["misses"],
+                "redis_errors": self._counters["redis_errors"],
+                "local_entries": len(self._local),
+            }
+
+    def _lookup(self, key: str) -> Optional[HighlightsResponse]:
+        payload = self._get_local(key)
+        if payload is not None:
+            self._count("local_hits")
+            return HighlightsResponse.model_validate_json(payload)
+
+        payload = self._get_redis(key)
+        if payload is not None:
+            self._count("redis_hits")
+            self._set_local(key, payload)
+            return HighlightsResponse.model_validate_json(payload)
+        return None
+
+    def _store(self, key: str, highlights: HighlightsResponse) -> None:
+        # Empty results are usually transient model failures, don't pin them.
+        if highlights.highlights:
+            payload = highlights.model_dump_json()
+            self._set_local(key, payload)
+            self._set_redis(key, payload)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return payload
+
+    def _set_local(self, key: str, payload: str) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _get_redis(self, key: str) -> Optional[str]:
+        if self.redis_client is None:
+            return None
+        try:
+            payload = self.redis_client.get(key)
+        except RedisError as e:
+            self._count("redis_errors")
+            logger.warning("Highlight cache read failed for %s: %s", key, e)
+            return None
+        if payload is None:
+            return None
+        return payload.decode("utf-8") if isinstance(payload, bytes) else payload
+
+    def _set_redis(self, key: str, payload: str) -> None:
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.set(key, payload, ex=self.ttl_seconds)
+        except RedisError as e:
+            self._count("redis_errors")
+            logger.warning("Highlight cache write failed for %s: %s", key, e)
@@ -0,0 +1,53 @@
+import re
+import html
+from typing import List
+from pydantic import BaseModel
+from app.clipping.domain.time_ranges import format_timestamp, parse_timestamp
+
+# Inline markup in cue text: YouTube's per-word <00:00:01.520><c> timing tags,
+# voice spans, bold/italics
+CUE_TAG = re.compile(r"<[^>]*>")
+
+
+class CaptionCue(BaseModel):
+    start: float  # seconds
+    end: float
+    text: str
+
+
+def parse_webvtt(text: str) -> List[CaptionCue]:
+    """
+    Cues of a WebVTT caption file, with markup stripped. YouTube auto-captions
+    repeat the previous line at the top of every cue as the text scrolls; a line
+    equal to the last one kept is dropped, so each spoken line appears once.
+    """
+    cues: List[CaptionCue] = []
+    last_line = ""
+    for block in re.split(r"\r?\n\r?\n", text.replace("\ufeff", "")):
+        lines = block.strip().splitlines()
+        timing = next((i for i, line in enumerate(lines) if "-->" in line), None)
+        if timing is None:
+            continue
+        start, end = (part.split()[0] for part in lines[timing].split("-->"))
+        new_lines: List[str] = []
+        for line in lines[timing + 1 :]:
+            line = " ".join(html.unescape(CUE_TAG.sub("", line)).split())
+            if line and line != last_line:
+                new_lines.append(line)
+                last_line = line
+        if new_lines:
+            cues.append(
+                CaptionCue(
+                    start=parse_timestamp(start),
+                    end=parse_timestamp(end),
+                    text=" ".join(new_lines),
+                )
+            )
+    return cues
+
+
+def format_transcript(cues: List[CaptionCue]) -> str:
+    """
+    One "[HH:MM:SS] text" line per cue, the start time rounded down to the second.
+    """
+    return "\n".join(f"[{format_timestamp(int(cue.start))}] {cue.text}" for cue in cues)
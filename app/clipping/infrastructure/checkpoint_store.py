@@ -0,0 +1,112 @@
+import os
+import uuid
+import hashlib
+import logging
+import tempfile
+from functools import lru_cache
+from typing import Any, Optional
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import CheckpointStore, JobCheckpoint
+from app.clipping.infrastructure.redis_client import get_redis_client
+
+load_dotenv()
+
+# "redis", "file" or "none"
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "redis")
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR") or os.path.join(
+    tempfile.gettempdir(), "ezclip-checkpoints"
+)
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(2 * 24 * 3600)))
+
+logger = logging.getLogger(__name__)
+
+
+class RedisCheckpointStore(CheckpointStore):
+    """
+    Checkpoints as JSON strings in Redis, expiring after `ttl_seconds`. Redis
+    errors are logged and treated as a missing checkpoint: a job never fails
+    because its checkpoint couldn't be read or written.
+    """
+
+    def __init__(self, redis_client: Any, ttl_seconds: int = CHECKPOINT_TTL_SECONDS):
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    def load(self, job_id: str) -> Optional[JobCheckpoint]:
+        try:
+            raw = self.redis.get(self._key(job_id))
+        except RedisError as e:
+            logger.warning("Could not load checkpoint for job %s: %s", job_id, e)
+            return None
+        if raw is None:
+            return None
+        try:
+            return JobCheckpoint.model_validate_json(raw)
+        except ValidationError as e:
+            logger.warning("Ignoring unreadable checkpoint for job %s: %s", job_id, e)
+            return None
+
+    def save(self, checkpoint: JobCheckpoint) -> None:
+        try:
+            self.redis.set(
+                self._key(checkpoint.job_id),
+                checkpoint.model_dump_json(),
+                ex=self.ttl_seconds,
+            )
+        except RedisError as e:
+            logger.warning("Could not save checkpoint for job %s: %s", checkpoint.job_id, e)
+
+    def _key(self, job_id: str) -> str:
+        return f"ezclip:checkpoint:{job_id}"
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    Checkpoints as JSON files in a local directory, for single-node deployments.
+    Writes go to a temporary file and are renamed into place.
+    """
+
+    def __init__(self, root: str = CHECKPOINT_DIR):
+        self.root = root
+
+    def load(self, job_id: str) -> Optional[JobCheckpoint]:
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                return JobCheckpoint.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValidationError) as e:
+            logger.warning("Ignoring unreadable checkpoint for job %s: %s", job_id, e)
+            return None
+
+    def save(self, checkpoint: JobCheckpoint) -> None:
+        path = self._path(checkpoint.job_id)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(checkpoint.model_dump_json())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not save checkpoint for job %s: %s", checkpoint.job_id, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _path(self, job_id: str) -> str:
+        digest = hashlib.sha256(job_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{digest}.json")
+
+
+@lru_cache(maxsize=1)
+def get_checkpoint_store() -> Optional[CheckpointStore]:
+    if CHECKPOINT_BACKEND == "redis":
+        return RedisCheckpointStore(get_redis_client())
+    if CHECKPOINT_BACKEND == "file":
+        return FileCheckpointStore()
+    if CHECKPOINT_BACKEND == "none":
+        return None
+    raise ValueError(
+        f"Unknown checkpoint backend '{CHECKPOINT_BACKEND}', expected 'redis', 'file' or 'none'."
+    )
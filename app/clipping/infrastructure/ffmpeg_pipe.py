@@ -0,0 +1,125 @@
+import io
+import logging
+import threading
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, BinaryIO, Callable, Iterator
+import ffmpeg  # type: ignore
+from app.clipping.domain.video_understanding import (
+    ClipStream,
+    HighlightsResponse,
+    clip_filename,
+)
+from app.clipping.infrastructure.ffmpeg_scheduler import FFmpegSlotScheduler
+
+# MP4 written to a pipe can't be seeked back to for the moov atom, so emit a
+# fragmented file: an empty moov up front and one fragment per keyframe.
+FRAGMENTED_MP4_MOVFLAGS = "frag_keyframe+empty_moov+default_base_moof"
+PIPE_OUTPUT = "pipe:1"
+STDERR_TAIL_LINES = 20
+
+logger = logging.getLogger(__name__)
+
+
+class FFmpegPipeReader(io.RawIOBase):
+    """
+    Readable stdout of an ffmpeg process. At end of stream it waits for the
+    process and raises if ffmpeg failed, so a consumer never mistakes a
+    truncated clip for a complete one.
+    """
+
+    def __init__(self, process: subprocess.Popen):
+        super().__init__()
+        self.process = process
+        self._stderr: deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+        # Drain stderr so ffmpeg never blocks on a full pipe
+        self._stderr_thread = threading.Thread(target=self._drain_stderr, daemon=True)
+        self._stderr_thread.start()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        n = self.process.stdout.readinto(buffer)
+        if not n:
+            self._check_exit()
+        return n
+
+    def _check_exit(self) -> None:
+        returncode = self.process.wait()
+        self._stderr_thread.join()
+        if returncode != 0:
+            raise RuntimeError(
+                f"ffmpeg exited with code {returncode}: {''.join(self._stderr).strip()}"
+            )
+
+    def _drain_stderr(self) -> None:
+        if self.process.stderr is None:
+            return
+        for line in self.process.stderr:
+            self._stderr.append(line.decode(errors="replace"))
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        if self.process.stdout is not None:
+            self.process.stdout.close()
+        super().close()
+
+
+@contextmanager
+def open_ffmpeg_pipe(
+    build_output: Callable[[int], Any], scheduler: FFmpegSlotScheduler
+) -> Iterator[BinaryIO]:
+    """
+    Take an ffmpeg slot, start the output built by `build_output(threads)` (which
+    must write to PIPE_OUTPUT) and yield its stdout. The slot is held until the
+    consumer is done, and ffmpeg is killed if the consumer stops early.
+    """
+    with scheduler.slot() as threads:
+        process = (
+            build_output(threads)
+            .global_args("-loglevel", "error")
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        reader = FFmpegPipeReader(process)
+        try:
+            yield io.BufferedReader(reader)  # type: ignore[arg-type]
+        finally:
+            reader.close()
+
+
+def iter_ffmpeg_clip_streams(
+    video_url: str,
+    highlights: HighlightsResponse,
+    scheduler: FFmpegSlotScheduler,
+    codec_args: dict[str, Any],
+) -> Iterator[ClipStream]:
+    """
+    One ClipStream per timed highlight. Opening it starts ffmpeg writing the
+    highlight's range of `video_url` as fragmented MP4, encoded with `codec_args`.
+    """
+    for h in highlights.highlights:
+        time_range = h.time_range
+        if time_range is None:
+            continue
+
+        def build_output(
+            threads: int, start: float = time_range.start, end: float = time_range.end
+        ):
+            return ffmpeg.input(video_url, ss=start, to=end).output(
+                PIPE_OUTPUT,
+                f="mp4",
+                movflags=FRAGMENTED_MP4_MOVFLAGS,
+                threads=threads,
+                **codec_args,
+            )
+
+        yield ClipStream(
+            highlight_id=h.id,
+            filename=clip_filename(video_url, h, ".mp4"),
+            open_stream=partial(open_ffmpeg_pipe, build_output, scheduler),
+        )
@@ -0,0 +1,129 @@
+import os
+import logging
+import tempfile
+from typing import Any, Iterator, List, Optional
+import concurrent.futures
+import ffmpeg  # type: ignore
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import (
+    VideoClipperService,
+    HighlightsResponse,
+    GeneratedClip,
+    ClipStream,
+    clip_filename,
+)
+from app.clipping.infrastructure.ffmpeg_pipe import iter_ffmpeg_clip_streams
+from app.clipping.infrastructure.ffmpeg_scheduler import (
+    FFmpegSlotScheduler,
+    get_ffmpeg_scheduler,
+)
+
+load_dotenv()
+
+# Encoder settings per profile: "speed" favours render time, "size" favours
+# smaller uploads, "balanced" sits in between.
+ENCODE_PROFILES: dict[str, dict[str, Any]] = {
+    "speed": {"preset": "ultrafast", "crf": 23, "audio_bitrate": "128k"},
+    "balanced": {"preset": "veryfast", "crf": 23, "audio_bitrate": "128k"},
+    "size": {"preset": "slow", "crf": 28, "audio_bitrate": "96k"},
+}
+FFMPEG_ENCODE_PROFILE = os.getenv("FFMPEG_ENCODE_PROFILE", "balanced")
+
+logger = logging.getLogger(__name__)
+
+
+class FFmpegReencodeVideoClipper(VideoClipperService):
+    """
+    Re-encoding VideoClipperService that renders every highlight in its own ffmpeg
+    process. Encodes take slots from the node-wide FFmpegSlotScheduler, which
+    also decides how many threads each one may use.
+    """
+
+    streams_clips = True
+
+    def __init__(
+        self,
+        profile: str = FFMPEG_ENCODE_PROFILE,
+        scheduler: Optional[FFmpegSlotScheduler] = None,
+    ):
+        if profile not in ENCODE_PROFILES:
+            raise ValueError(
+                f"Unknown encode profile '{profile}', expected one of {sorted(ENCODE_PROFILES)}."
+            )
+        self.profile = profile
+        self.scheduler = scheduler or get_ffmpeg_scheduler()
+
+    def clip_video(
+        self, video_url: str, highlights: HighlightsResponse, out_dir: Optional[str] = None
+    ) -> List[str]:
+        paths = {
+            clip.highlight_id: clip.path
+            for clip in self.iter_clips(video_url, highlights, out_dir)
+        }
+        # Keep highlight order so callers can zip paths with highlights
+        return [paths[h.id] for h in highlights.highlights if h.id in paths]
+
+    def iter_clips(
+        self, video_url: str, highlights: HighlightsResponse, out_dir: Optional[str] = None
+    ) -> Iterator[GeneratedClip]:
+        settings = ENCODE_PROFILES[self.profile]
+        out_dir = out_dir or tempfile.gettempdir()
+
+        def render(out_path: str, start: float, end: float) -> str:
+            with self.scheduler.slot() as threads:
+                # Input seeking + re-encode is frame accurate
+                (
+                    ffmpeg.input(video_url, ss=start, to=end)
+                    .output(
+                        out_path,
+                        vcodec="libx264",
+                        acodec="aac",
+                        preset=settings["preset"],
+                        crf=settings["crf"],
+                        audio_bitrate=settings["audio_bitrate"],
+                        pix_fmt="yuv420p",
+                        movflags="faststart",
+                        threads=threads,
+                    )
+                    .run(overwrite_output=True, quiet=True)
+                )
+            return out_path
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.scheduler.slots) as executor:
+            futures = {}
+            for h in highlights.highlights:
+                time_range = h.time_range
+                if time_range is None:
+                    continue
+                out_path = os.path.join(out_dir, clip_filename(video_url, h))
+                future = executor.submit(render, out_path, time_range.start, time_range.end)
+                futures[future] = h.id
+            logger.info(
+                "Rendering %d clips with up to %d parallel ffmpeg processes (%s profile)",
+                len(futures),
+                self.scheduler.slots,
+                self.profile,
+            )
+            for future in concurrent.futures.as_completed(futures):
+                yield GeneratedClip(highlight_id=futures[future], path=future.result())
+
+    def iter_clip_streams(
+        self, video_url: str, highlights: HighlightsResponse
+    ) -> Iterator[ClipStream]:
+        """
+        Render each highlight as fragmented MP4 to a pipe instead of a file.
+        """
+        settings = ENCODE_PROFILES[self.profile]
+        return iter_ffmpeg_clip_streams(
+            video_url,
+            highlights,
+            self.scheduler,
+            {
+                "vcodec": "libx264",
+                "acodec": "aac",
+                "preset": settings["preset"],
+                "crf": settings["crf"],
+                "audio_bitrate": settings["audio_bitrate"],
+                "pix_fmt": "yuv420p",
+            },
+        )
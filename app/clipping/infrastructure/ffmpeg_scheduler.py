@@ -0,0 +1,96 @@
+import os
+import time
+import fcntl
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, TextIO
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# CPU cores ffmpeg may use on this node, shared by every worker process
+FFMPEG_NODE_CPU_BUDGET = int(os.getenv("FFMPEG_NODE_CPU_BUDGET") or os.cpu_count() or 1)
+FFMPEG_THREADS_PER_SLOT = int(os.getenv("FFMPEG_THREADS_PER_SLOT", "2"))
+FFMPEG_SLOT_DIR = os.getenv(
+    "FFMPEG_SLOT_DIR", os.path.join(tempfile.gettempdir(), "ezclip-ffmpeg-slots")
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FFmpegSlotScheduler:
+    """
+    Node-wide semaphore for ffmpeg work.
+
+    The CPU budget is split into `cpu_budget // threads_per_slot` slots, each
+    backed by a lock file in `slot_dir`. Any process on the node that holds the
+    flock on a slot file owns that slot, so concurrent Celery worker processes
+    never run more ffmpeg threads than the budget allows. Time spent waiting for
+    a slot and time spent encoding are tracked separately.
+    """
+
+    def __init__(
+        self,
+        cpu_budget: int = FFMPEG_NODE_CPU_BUDGET,
+        threads_per_slot: int = FFMPEG_THREADS_PER_SLOT,
+        slot_dir: str = FFMPEG_SLOT_DIR,
+        poll_interval: float = 0.05,
+    ):
+        self.threads_per_slot = max(1, min(threads_per_slot, cpu_budget))
+        self.slots = max(1, cpu_budget // self.threads_per_slot)
+        self.slot_dir = slot_dir
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "wait_seconds": 0.0, "run_seconds": 0.0}
+
+    @contextmanager
+    def slot(self) -> Iterator[int]:
+        """
+        Block until a slot is free and yield the number of threads ffmpeg may use.
+        """
+        os.makedirs(self.slot_dir, exist_ok=True)
+        waited_from = time.perf_counter()
+        slot_id, handle = self._acquire()
+        started = time.perf_counter()
+        try:
+            yield self.threads_per_slot
+        finally:
+            finished = time.perf_counter()
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+            wait, run = started - waited_from, finished - started
+            with self._lock:
+                self._stats["runs"] += 1
+                self._stats["wait_seconds"] += wait
+                self._stats["run_seconds"] += run
+            logger.info(
+                "ffmpeg slot %d/%d: queued %.2fs, encoded %.2fs", slot_id, self.slots, wait, run
+            )
+
+    def stats(self) -> dict[str, float]:
+        """
+        Totals for this process: number of runs, queue wait time and encode time.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _acquire(self) -> tuple[int, TextIO]:
+        while True:
+            for slot_id in range(self.slots):
+                handle = open(  # pylint: disable=consider-using-with
+                    os.path.join(self.slot_dir, f"slot-{slot_id}.lock"), "w", encoding="utf-8"
+                )
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return slot_id, handle
+                except BlockingIOError:
+                    handle.close()
+            time.sleep(self.poll_interval)
+
+
+@lru_cache(maxsize=1)
+def get_ffmpeg_scheduler() -> FFmpegSlotScheduler:
+    return FFmpegSlotScheduler()
@@ -1,72 +1,326 @@
 import os
-from typing import List
+import shutil
+import logging
+import tempfile
+from typing import Any, Callable, Iterator, List, Literal, Optional
 import concurrent.futures
 import ffmpeg  # type: ignore
+from pydantic import BaseModel
+from dotenv import load_dotenv
 from app.clipping.domain.video_understanding import (
     VideoClipperService,
     HighlightsResponse,
+    GeneratedClip,
+    ClipStream,
+    clip_filename,
 )
+from app.clipping.infrastructure.ffmpeg_pipe import iter_ffmpeg_clip_streams
+from app.clipping.infrastructure.keyframe_index import KeyframeIndex, load_keyframe_index
+from app.clipping.infrastructure.ffmpeg_scheduler import (
+    FFmpegSlotScheduler,
+    get_ffmpeg_scheduler,
+)
+
+load_dotenv()
+
+# "copy": stream copy starting on the keyframe at or before each highlight.
+# "smart": frame-accurate; re-encode only the partial GOPs at both ends.
+FFMPEG_CLIP_MODE = os.getenv("FFMPEG_CLIP_MODE", "copy")
+# Highlights closer than this are cut by a single ffmpeg process that reads the
+# source once; farther apart ones get their own process with input seeking.
+FFMPEG_SINGLE_PASS_MAX_GAP_SECONDS = float(
+    os.getenv("FFMPEG_SINGLE_PASS_MAX_GAP_SECONDS", "60")
+)
+FFMPEG_SINGLE_PASS_MAX_OUTPUTS = int(os.getenv("FFMPEG_SINGLE_PASS_MAX_OUTPUTS", "16"))
+
+# Encoders able to produce boundary segments that concatenate with a
+# stream-copied interior of the same codec. The joined clip's header only holds
+# the first part's parameter sets, so every part repeats its own in band.
+SMART_CUT_ENCODERS = {
+    "h264": {"vcodec": "libx264", "x264-params": "repeat-headers=1"},
+    "hevc": {"vcodec": "libx265", "x265-params": "repeat-headers=1"},
+}
+IN_BAND_HEADER_FILTERS = {"h264": "h264_mp4toannexb", "hevc": "hevc_mp4toannexb"}
+# ffprobe profile names that differ from the encoder's -profile:v names
+ENCODER_PROFILES = {
+    "constrained baseline": "baseline",
+    "high 10": "high10",
+    "high 4:2:2": "high422",
+    "high 4:4:4 predictive": "high444",
+    "main 10": "main10",
+}
+REENCODE_ARGS = {"preset": "veryfast", "crf": 18}
+# Output seeking drops packets strictly before `ss`; back off slightly so a
+# keyframe exactly on the boundary is kept.
+SEEK_EPSILON = 0.001
+
+logger = logging.getLogger(__name__)
+
+
+class ClipJob(BaseModel):
+    index: int
+    highlight_id: str
+    start: float
+    end: float
+    out_path: str
 
 
 class FFmpegVideoClipper(VideoClipperService):
     """
     Implementation of VideoClipperService using ffmpeg-python for fast and accurate video clipping.
+
+    Highlights are grouped into clusters of nearby ranges. Each cluster with more
+    than one clip is cut by a single ffmpeg invocation with one output per clip,
+    so the source is opened and demuxed once per cluster instead of once per clip.
+    Smart mode probes the source for a keyframe index (see keyframe_index) to cut
+    frame-accurately. Copy mode probes only when some cluster holds two or more
+    clips, since single-pass outputs need the index to start on the keyframe
+    before each clip; if the source can't be probed every clip gets its own
+    input-seeking run.
     """
 
-    def clip_video(self, video_url: str, highlights: HighlightsResponse) -> List[str]:
-        output_paths: List[str] = []
-        base, ext = os.path.splitext(os.path.basename(video_url))
-
-        def to_seconds(ts: str) -> float:
-            parts = ts.split(":")
-            if len(parts) != 3:
-                raise ValueError(f"Timestamp '{ts}' is not in HH:MM:SS format.")
-            return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
-
-        def process_clip(idx, h):
-            if h.start_time is None or h.end_time is None:
-                return None
-            start = to_seconds(h.start_time)
-            end = to_seconds(h.end_time)
-            out_path = f"/tmp/{base}_clip{idx}{ext}"
-            try:
-                (
-                    ffmpeg.input(video_url, ss=start, to=end + 10)
-                    .output(
-                        out_path,
-                        c="copy",
-                        # vcodec="libx264",
-                        # acodec="aac",
-                        # movflags="faststart",
-                        preset="ultrafast",
-                        threads=2,
-                    )
-                    .run(overwrite_output=True)
+    def __init__(
+        self,
+        mode: Literal["copy", "smart"] = FFMPEG_CLIP_MODE,  # type: ignore[assignment]
+        max_gap_seconds: float = FFMPEG_SINGLE_PASS_MAX_GAP_SECONDS,
+        max_outputs: int = FFMPEG_SINGLE_PASS_MAX_OUTPUTS,
+        keyframe_loader: Callable[..., Optional[KeyframeIndex]] = load_keyframe_index,
+        scheduler: Optional[FFmpegSlotScheduler] = None,
+    ):
+        if mode not in ("copy", "smart"):
+            raise ValueError(f"Unknown clip mode '{mode}', expected 'copy' or 'smart'.")
+        self.mode = mode
+        self.max_gap_seconds = max_gap_seconds
+        self.max_outputs = max_outputs
+        self.keyframe_loader = keyframe_loader
+        self.scheduler = scheduler or get_ffmpeg_scheduler()
+        # Smart cuts join intermediate files, so only copy mode can pipe clips
+        self.streams_clips = mode == "copy"
+
+    def clip_video(
+        self, video_url: str, highlights: HighlightsResponse, out_dir: Optional[str] = None
+    ) -> List[str]:
+        paths = {
+            clip.highlight_id: clip.path
+            for clip in self.iter_clips(video_url, highlights, out_dir)
+        }
+        # Keep highlight order so callers can zip paths with highlights
+        return [paths[h.id] for h in highlights.highlights if h.id in paths]
+
+    def iter_clips(
+        self, video_url: str, highlights: HighlightsResponse, out_dir: Optional[str] = None
+    ) -> Iterator[GeneratedClip]:
+        out_dir = out_dir or tempfile.gettempdir()
+        jobs: List[ClipJob] = []
+        for idx, h in enumerate(highlights.highlights):
+            time_range = h.time_range
+            if time_range is None:
+                continue
+            jobs.append(
+                ClipJob(
+                    index=idx,
+                    highlight_id=h.id,
+                    start=time_range.start,
+                    end=time_range.end,
+                    out_path=os.path.join(out_dir, clip_filename(video_url, h)),
                 )
+            )
+
+        if self.mode == "smart":
+            # Smart cuts need their own boundary encodes, so there's nothing to share
+            index = self.keyframe_loader(video_url, probe=True)
+            clusters = [[job] for job in jobs]
+        else:
+            clusters = self.plan_clusters(jobs)
+            # Only a shared run needs the index, to start each output on a keyframe
+            shared = any(len(cluster) > 1 for cluster in clusters)
+            index = self.keyframe_loader(video_url, probe=shared)
+            if index is None:
+                clusters = [[job] for job in jobs]
+        logger.info(
+            "Cutting %d clips from %s in %s mode with %d ffmpeg runs",
+            len(jobs),
+            video_url,
+            self.mode,
+            len(clusters),
+        )
+
+        # More threads than node slots would only queue on the scheduler
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.scheduler.slots) as executor:
+            futures = {
+                executor.submit(self._process_cluster, video_url, cluster, index): cluster
+                for cluster in clusters
+            }
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                for job in futures[future]:
+                    yield GeneratedClip(highlight_id=job.highlight_id, path=job.out_path)
+
+    def iter_clip_streams(
+        self, video_url: str, highlights: HighlightsResponse
+    ) -> Iterator[ClipStream]:
+        """
+        Stream-copy each highlight as fragmented MP4 to a pipe instead of a file.
+        """
+        if not self.streams_clips:
+            raise NotImplementedError(f"Clip streaming is not supported in {self.mode} mode.")
+        return iter_ffmpeg_clip_streams(video_url, highlights, self.scheduler, {"c": "copy"})
+
+    def plan_clusters(self, jobs: List[ClipJob]) -> List[List[ClipJob]]:
+        """
+        Group clips whose ranges are within `max_gap_seconds` of each other.
+        """
+        clusters: List[List[ClipJob]] = []
+        cluster_end: Optional[float] = None
+        for job in sorted(jobs, key=lambda j: j.start):
+            if (
+                clusters
+                and cluster_end is not None
+                and job.start - cluster_end <= self.max_gap_seconds
+                and len(clusters[-1]) < self.max_outputs
+            ):
+                clusters[-1].append(job)
+                cluster_end = max(cluster_end, job.end)
+            else:
+                clusters.append([job])
+                cluster_end = job.end
+        return clusters
+
+    def _process_cluster(
+        self, video_url: str, cluster: List[ClipJob], index: Optional[KeyframeIndex]
+    ) -> None:
+        with self.scheduler.slot() as threads:
+            if self.mode == "smart":
+                self._smart_cut(video_url, cluster[0], index, threads)
+                return
+            if len(cluster) == 1:
+                self._process_clip(video_url, cluster[0], threads)
+                return
+            try:
+                self._process_single_pass(video_url, cluster, index, threads)
             except ffmpeg.Error as e:
-                print(f"Error processing clip {idx}: {e}")
-                (
-                    ffmpeg.input(video_url, ss=start, to=end)
-                    .output(
-                        out_path,
-                        c="copy",
-                        # vcodec="libx264",
-                        # acodec="aac",
-                        # movflags="faststart",
-                        preset="ultrafast",
-                    )
-                    .run(overwrite_output=True)
+                logger.warning(
+                    "Single-pass cut of %d clips failed, falling back to per-clip: %s",
+                    len(cluster),
+                    e,
                 )
-            return out_path
+                for job in cluster:
+                    self._process_clip(video_url, job, threads)
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [
-                executor.submit(process_clip, idx, h)
-                for idx, h in enumerate(highlights.highlights)
+    def _process_single_pass(
+        self,
+        video_url: str,
+        cluster: List[ClipJob],
+        index: Optional[KeyframeIndex],
+        threads: int,
+    ) -> None:
+        def clip_start(job: ClipJob) -> float:
+            # Without an index the clip starts on the first keyframe after `start`
+            return index.at_or_before(job.start) if index else job.start
+
+        cluster_start = min(clip_start(job) for job in cluster)
+        cluster_end = max(job.end for job in cluster)
+        # Input seeking puts cluster_start at t=0, so output ranges are relative.
+        source = ffmpeg.input(video_url, ss=cluster_start, to=cluster_end)
+        outputs = [
+            source.output(
+                job.out_path,
+                ss=max(0.0, clip_start(job) - cluster_start - SEEK_EPSILON),
+                to=job.end - cluster_start,
+                c="copy",
+                threads=threads,
+            )
+            for job in cluster
+        ]
+        ffmpeg.merge_outputs(*outputs).run(overwrite_output=True, quiet=True)
+
+    def _process_clip(self, video_url: str, job: ClipJob, threads: int) -> None:
+        # Input seeking with stream copy starts on the keyframe at or before `start`
+        (
+            ffmpeg.input(video_url, ss=job.start, to=job.end)
+            .output(
+                job.out_path,
+                c="copy",
+                threads=threads,
+            )
+            .run(overwrite_output=True, quiet=True)
+        )
+
+    def _reencode_clip(self, video_url: str, job: ClipJob, threads: int) -> None:
+        (
+            ffmpeg.input(video_url, ss=job.start, to=job.end)
+            .output(
+                job.out_path,
+                vcodec="libx264",
+                pix_fmt="yuv420p",
+                acodec="aac",
+                threads=threads,
+                **REENCODE_ARGS,
+            )
+            .run(overwrite_output=True, quiet=True)
+        )
+
+    def _smart_cut(
+        self, video_url: str, job: ClipJob, index: Optional[KeyframeIndex], threads: int
+    ) -> None:
+        """
+        Re-encode the video of [start, first keyframe) and [last keyframe, end],
+        stream-copy the whole GOPs in between and join the parts with the concat
+        demuxer. The boundary encodes take the source's profile and pixel format,
+        and the audio is copied for the whole clip, so the parts match the
+        interior.
+        """
+        if index is None:
+            self._reencode_clip(video_url, job, threads)
+            return
+        codec = index.video_codec or ""
+        body_start = index.at_or_after(job.start)
+        body_end = index.at_or_before(job.end)
+        if codec not in SMART_CUT_ENCODERS or body_start is None or body_end <= body_start:
+            self._reencode_clip(video_url, job, threads)
+            return
+        encoder_args: dict[str, Any] = {**SMART_CUT_ENCODERS[codec], **REENCODE_ARGS}
+        if index.pix_fmt:
+            encoder_args["pix_fmt"] = index.pix_fmt
+        if index.profile:
+            profile = index.profile.lower()
+            encoder_args["profile:v"] = ENCODER_PROFILES.get(profile, profile)
+
+        # Next to the clip, so the parts count against the job's workspace
+        work_dir = tempfile.mkdtemp(prefix="ezclip-smartcut-", dir=os.path.dirname(job.out_path))
+        try:
+            parts: List[str] = []
+            segments = [
+                (job.start, body_start, True),
+                (body_start, body_end, False),
+                (body_end, job.end, True),
             ]
-            for future in concurrent.futures.as_completed(futures):
-                result = future.result()
-                if result:
-                    output_paths.append(result)
+            for n, (seg_start, seg_end, reencode) in enumerate(segments):
+                if seg_end - seg_start < SEEK_EPSILON:
+                    continue
+                part = os.path.join(work_dir, f"part{n}.mkv")
+                source = ffmpeg.input(video_url, ss=seg_start, t=seg_end - seg_start).video
+                if reencode:
+                    output = source.output(part, threads=threads, **encoder_args)
+                else:
+                    output = source.output(
+                        part, vcodec="copy", **{"bsf:v": IN_BAND_HEADER_FILTERS[codec]}
+                    )
+                output.run(overwrite_output=True, quiet=True)
+                parts.append(part)
 
-        return output_paths
+            list_path = os.path.join(work_dir, "parts.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                f.writelines(f"file '{part}'\n" for part in parts)
+            video = ffmpeg.input(list_path, f="concat", safe=0).video
+            # Optional stream, so sources without audio still cut
+            audio = ffmpeg.input(video_url, ss=job.start, t=job.end - job.start)["a?"]
+            (
+                ffmpeg.output(video, audio, job.out_path, c="copy", t=job.end - job.start)
+                .run(overwrite_output=True, quiet=True)
+            )
+        except ffmpeg.Error as e:
+            logger.warning("Smart cut of clip %d failed, re-encoding: %s", job.index, e)
+            self._reencode_clip(video_url, job, threads)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
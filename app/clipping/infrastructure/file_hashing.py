@@ -0,0 +1,33 @@
+import os
+import hashlib
+
+MB = 1024 * 1024
+# Bytes hashed from each end of a file by file_checksum
+CHECKSUM_EDGE_BYTES = MB
+
+
+def file_sha256(path: str) -> str:
+    """
+    SHA-256 of a file's contents, read in 1 MiB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(MB), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_checksum(path: str) -> str:
+    """
+    Cheap fingerprint of a large file: its size plus SHA-256 of the first and
+    last MiB. Enough to tell a complete source from a truncated or replaced one
+    without reading gigabytes.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode("utf-8"))
+    with open(path, "rb") as f:
+        digest.update(f.read(CHECKSUM_EDGE_BYTES))
+        if size > CHECKSUM_EDGE_BYTES:
+            f.seek(max(CHECKSUM_EDGE_BYTES, size - CHECKSUM_EDGE_BYTES))
+            digest.update(f.read())
+    return digest.hexdigest()
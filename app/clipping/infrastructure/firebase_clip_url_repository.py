@@ -1,6 +1,6 @@
-from firebase_admin.firestore import client
+from typing import Any
 from app.clipping.domain.video_understanding import ClipUrlRepository
-from firebase_init import firebase_app
+from app.clipping.infrastructure.firestore_client import get_firestore_client
 
 
 class FirebaseClipUrlRepository(ClipUrlRepository):
@@ -9,8 +9,8 @@ class FirebaseClipUrlRepository(ClipUrlRepository):
     Requires firebase_admin to be initialized.
     """
 
-    def __init__(self):
-        self.db = client(firebase_app)
+    def __init__(self, db: Any = None):
+        self.db = db or get_firestore_client()
 
     def save_clip_urls(self, video_id: str, highlight_to_url: dict[str, str]) -> None:
         doc_ref = self.db.collection("video_clip_urls").document(video_id)
@@ -1,9 +1,9 @@
-from firebase_admin.firestore import client
+from typing import Any
 from app.clipping.domain.video_understanding import (
     HighlightRepository,
     HighlightsResponse,
 )
-from firebase_init import firebase_app
+from app.clipping.infrastructure.firestore_client import get_firestore_client
 
 
 class FirebaseHighlightRepository(HighlightRepository):
@@ -12,8 +12,8 @@ class FirebaseHighlightRepository(HighlightRepository):
     Requires firebase_admin to be initialized.
     """
 
-    def __init__(self):
-        self.db = client(firebase_app)
+    def __init__(self, db: Any = None):
+        self.db = db or get_firestore_client()
 
     def save_highlights(self, video_id: str, highlights: HighlightsResponse) -> None:
         # Encode video_id to ensure it's a valid Firestore document ID
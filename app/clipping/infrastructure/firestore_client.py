@@ -0,0 +1,15 @@
+from functools import lru_cache
+from typing import Any
+from firebase_admin.firestore import client
+
+
+@lru_cache(maxsize=1)
+def get_firestore_client() -> Any:
+    """
+    Shared Firestore client for the process, so every repository reuses one
+    channel instead of opening its own. Honours FIRESTORE_EMULATOR_HOST.
+    """
+    # Initializing the app reads credentials, so only do it once a client is needed
+    from firebase_init import firebase_app  # pylint: disable=import-outside-toplevel
+
+    return client(firebase_app)
@@ -0,0 +1,178 @@
+import os
+import atexit
+import logging
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Any, Optional
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import (
+    HighlightsResponse,
+    JobResultRepository,
+)
+from app.clipping.infrastructure.firestore_client import get_firestore_client
+
+load_dotenv()
+
+# Coalesce results of many jobs into periodic batch commits
+FIRESTORE_BULK_WRITES = os.getenv("FIRESTORE_BULK_WRITES", "false").lower() == "true"
+FIRESTORE_BULK_FLUSH_SECONDS = float(os.getenv("FIRESTORE_BULK_FLUSH_SECONDS", "0.5"))
+# Seconds a job waits for its bulk batch to be committed
+FIRESTORE_BULK_COMMIT_TIMEOUT = float(os.getenv("FIRESTORE_BULK_COMMIT_TIMEOUT", "30"))
+HIGHLIGHTS_COLLECTION = "video_highlights"
+CLIP_URLS_COLLECTION = "video_clip_urls"
+# A WriteBatch holds at most 500 writes and each job result is two
+MAX_JOBS_PER_BATCH = 250
+
+logger = logging.getLogger(__name__)
+
+
+def add_job_result(
+    db: Any,
+    batch: Any,
+    video_id: str,
+    highlights: HighlightsResponse,
+    highlight_to_url: dict[str, str],
+) -> None:
+    """
+    Stage the two documents of a job result in `batch`, in the same layout as
+    FirebaseHighlightRepository and FirebaseClipUrlRepository.
+    """
+    batch.set(
+        db.collection(HIGHLIGHTS_COLLECTION).document(video_id),
+        {"highlights": highlights.model_dump()},
+    )
+    batch.set(
+        db.collection(CLIP_URLS_COLLECTION).document(video_id),
+        {"highlight_to_url": highlight_to_url},
+    )
+
+
+class FirestoreJobResultRepository(JobResultRepository):
+    """
+    Saves highlights and clip URLs of a job in one WriteBatch: a single round
+    trip, and readers never see highlights without their clip URLs.
+    """
+
+    def __init__(self, db: Any = None):
+        self.db = db or get_firestore_client()
+
+    def save_job_result(
+        self,
+        video_id: str,
+        highlights: HighlightsResponse,
+        highlight_to_url: dict[str, str],
+    ) -> None:
+        batch = self.db.batch()
+        add_job_result(self.db, batch, video_id, highlights, highlight_to_url)
+        batch.commit()
+
+
+class BufferedFirestoreJobResultRepository(JobResultRepository):
+    """
+    Group commit for busy workers: results of jobs finishing within
+    `flush_interval` seconds of each other are written by a background thread
+    in one WriteBatch per up to MAX_JOBS_PER_BATCH jobs. A later result for the
+    same video replaces a pending one.
+
+    With `wait_for_commit`, save_job_result blocks until its batch is committed
+    and raises the commit error, so a job is never reported done before its
+    result is stored. Without it, results still pending at exit are flushed by
+    close(), but a crash loses them.
+    """
+
+    def __init__(
+        self,
+        db: Any = None,
+        flush_interval: float = FIRESTORE_BULK_FLUSH_SECONDS,
+        wait_for_commit: bool = True,
+        commit_timeout: float = FIRESTORE_BULK_COMMIT_TIMEOUT,
+    ):
+        self.db = db or get_firestore_client()
+        self.flush_interval = flush_interval
+        self.wait_for_commit = wait_for_commit
+        self.commit_timeout = commit_timeout
+        # video_id -> (highlights, highlight_to_url, futures waiting on it)
+        self._pending: dict[str, tuple[HighlightsResponse, dict[str, str], list[Future[None]]]] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="firestore-bulk-writer", daemon=True
+        )
+        self._thread.start()
+
+    def save_job_result(
+        self,
+        video_id: str,
+        highlights: HighlightsResponse,
+        highlight_to_url: dict[str, str],
+    ) -> None:
+        future: Future[None] = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Job result repository is closed.")
+            waiters = self._pending.pop(video_id, (None, None, []))[2]
+            waiters.append(future)
+            self._pending[video_id] = (highlights, highlight_to_url, waiters)
+            if len(self._pending) >= MAX_JOBS_PER_BATCH:
+                self._condition.notify()
+        if self.wait_for_commit:
+            future.result(timeout=self.commit_timeout)
+
+    def flush(self) -> None:
+        """
+        Commit everything pending now, on the calling thread.
+        """
+        with self._condition:
+            pending, self._pending = self._pending, {}
+        self._commit(pending)
+
+    def close(self) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < MAX_JOBS_PER_BATCH:
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _commit(
+        self,
+        pending: dict[str, tuple[HighlightsResponse, dict[str, str], list[Future[None]]]],
+    ) -> None:
+        items = list(pending.items())
+        for start in range(0, len(items), MAX_JOBS_PER_BATCH):
+            chunk = items[start : start + MAX_JOBS_PER_BATCH]
+            batch = self.db.batch()
+            for video_id, (highlights, highlight_to_url, _) in chunk:
+                add_job_result(self.db, batch, video_id, highlights, highlight_to_url)
+            try:
+                batch.commit()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error("Failed to commit %d job results to Firestore: %s", len(chunk), e)
+                for _, (_, _, waiters) in chunk:
+                    for waiter in waiters:
+                        waiter.set_exception(e)
+                continue
+            logger.info("Committed %d job results to Firestore in one batch", len(chunk))
+            for _, (_, _, waiters) in chunk:
+                for waiter in waiters:
+                    waiter.set_result(None)
+
+
+@lru_cache(maxsize=1)
+def get_job_result_repository() -> JobResultRepository:
+    if FIRESTORE_BULK_WRITES:
+        repository = BufferedFirestoreJobResultRepository()
+        atexit.register(repository.close)
+        return repository
+    return FirestoreJobResultRepository()
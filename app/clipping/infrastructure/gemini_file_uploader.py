@@ -0,0 +1,243 @@
+import os
+import time
+import shutil
+import asyncio
+import logging
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+import ffmpeg  # type: ignore
+from google.genai import types
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import DownloadResult, is_youtube_url
+from app.clipping.infrastructure.ffmpeg_scheduler import (
+    FFmpegSlotScheduler,
+    get_ffmpeg_scheduler,
+)
+from app.clipping.infrastructure.file_hashing import file_sha256
+from app.clipping.infrastructure.gemini_video_understanding import get_genai_client
+
+load_dotenv()
+
+# Analysis proxy: Gemini samples video at 1 fps, so frames beyond that and
+# resolution beyond what MEDIA_RESOLUTION_LOW keeps are wasted upload bytes
+GEMINI_PROXY_FPS = float(os.getenv("GEMINI_PROXY_FPS", "1"))
+GEMINI_PROXY_HEIGHT = int(os.getenv("GEMINI_PROXY_HEIGHT", "360"))
+# Cached file handles are dropped this long before Gemini deletes the file, so
+# no request is sent with a handle that expires mid-analysis
+GEMINI_FILE_EXPIRY_MARGIN_SECONDS = int(os.getenv("GEMINI_FILE_EXPIRY_MARGIN_SECONDS", "3600"))
+GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS = int(
+    os.getenv("GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS", "600")
+)
+# How long the Files API keeps uploads when the response doesn't say
+FILES_API_RETENTION_SECONDS = 48 * 3600
+GEMINI_FILE_CACHE_KEY_PREFIX = "ezclip:gemini-files"
+PROXY_MIME_TYPE = "video/mp4"
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiFileRef(BaseModel):
+    """
+    A video Gemini can read: a YouTube URL, or an uploaded file's URI.
+    """
+
+    uri: str
+    mime_type: Optional[str] = None
+    name: Optional[str] = None  # Files API resource name, e.g. "files/abc"
+    expires_at: Optional[float] = None  # epoch seconds
+
+
+def build_analysis_proxy(
+    source_path: str, out_path: str, fps: float, height: int, threads: int = 0
+) -> str:
+    """
+    Re-encode `source_path` at `fps` frames per second, at most `height` pixels
+    tall and with mono low-bitrate audio, for analysis only.
+    """
+    (
+        ffmpeg.input(source_path)
+        .output(
+            out_path,
+            vf=f"fps={fps:g},scale=-2:'min({height},ih)'",
+            vcodec="libx264",
+            preset="veryfast",
+            crf=30,
+            pix_fmt="yuv420p",
+            acodec="aac",
+            audio_bitrate="48k",
+            ac=1,
+            movflags="faststart",
+            threads=threads,
+        )
+        .run(overwrite_output=True, quiet=True)
+    )
+    return out_path
+
+
+class GeminiFileUploader:
+    """
+    Resolves a video URL to something Gemini can read. YouTube URLs pass
+    through, since Gemini fetches them itself. Local files, and other URLs once
+    fetched with `download_source`, are re-encoded to a low fps, low resolution
+    proxy and uploaded through the Files API.
+
+    File handles are cached by the source's SHA-256 and the proxy settings, in
+    process and in Redis so every worker shares them, until shortly before the
+    Files API deletes the upload. Repeat analyses of the same file, under any
+    name or URL, skip both the proxy and the upload.
+    """
+
+    def __init__(
+        self,
+        client: Any = None,
+        redis_client: Optional[Any] = None,
+        download_source: Optional[Callable[[str], DownloadResult]] = None,
+        proxy_fps: float = GEMINI_PROXY_FPS,
+        proxy_height: int = GEMINI_PROXY_HEIGHT,
+        expiry_margin: int = GEMINI_FILE_EXPIRY_MARGIN_SECONDS,
+        processing_timeout: int = GEMINI_FILE_PROCESSING_TIMEOUT_SECONDS,
+        poll_interval: float = 2.0,
+        scheduler: Optional[FFmpegSlotScheduler] = None,
+        key_prefix: str = GEMINI_FILE_CACHE_KEY_PREFIX,
+    ):
+        self.client = client or get_genai_client()
+        self.redis_client = redis_client
+        self.download_source = download_source
+        self.proxy_fps = proxy_fps
+        self.proxy_height = proxy_height
+        self.expiry_margin = expiry_margin
+        self.processing_timeout = processing_timeout
+        self.poll_interval = poll_interval
+        self.scheduler = scheduler or get_ffmpeg_scheduler()
+        self.key_prefix = key_prefix
+        self._local: Dict[str, GeminiFileRef] = {}
+        self._lock = threading.Lock()
+        # One upload per key at a time; later callers wait and hit the cache
+        self._uploads: Dict[str, asyncio.Lock] = {}
+
+    async def resolve(self, video_url: str) -> GeminiFileRef:
+        if is_youtube_url(video_url):
+            return GeminiFileRef(uri=video_url)
+        path = _local_path(video_url)
+        if path is None:
+            if self.download_source is None:
+                return GeminiFileRef(uri=video_url)
+            path = (await asyncio.to_thread(self.download_source, video_url)).path
+
+        digest = await asyncio.to_thread(file_sha256, path)
+        key = f"{self.key_prefix}:{digest}:{self.proxy_fps:g}:{self.proxy_height}"
+        upload_lock = self._uploads.setdefault(key, asyncio.Lock())
+        try:
+            async with upload_lock:
+                cached = await asyncio.to_thread(self._lookup, key)
+                if cached is not None:
+                    logger.info("Reusing Gemini file %s for %s", cached.name, video_url)
+                    return cached
+                ref = await self._upload(path, digest)
+                await asyncio.to_thread(self._store, key, ref)
+                return ref
+        finally:
+            if not upload_lock.locked():
+                self._uploads.pop(key, None)
+
+    async def _upload(self, path: str, digest: str) -> GeminiFileRef:
+        work_dir = tempfile.mkdtemp(prefix="ezclip-proxy-")
+        try:
+            proxy_path = os.path.join(work_dir, f"{digest[:16]}.mp4")
+            started = time.monotonic()
+            await asyncio.to_thread(self._build_proxy, path, proxy_path)
+            logger.info(
+                "Built analysis proxy of %s in %.1fs: %d -> %d bytes",
+                path,
+                time.monotonic() - started,
+                os.path.getsize(path),
+                os.path.getsize(proxy_path),
+            )
+            file = await self.client.aio.files.upload(
+                file=proxy_path,
+                config=types.UploadFileConfig(
+                    mime_type=PROXY_MIME_TYPE, display_name=os.path.basename(path)
+                ),
+            )
+            file = await self._wait_until_active(file)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        expires_at = (
+            file.expiration_time.timestamp()
+            if file.expiration_time
+            else time.time() + FILES_API_RETENTION_SECONDS
+        )
+        logger.info("Uploaded analysis proxy of %s as %s", path, file.name)
+        return GeminiFileRef(
+            uri=file.uri,
+            mime_type=file.mime_type or PROXY_MIME_TYPE,
+            name=file.name,
+            expires_at=expires_at,
+        )
+
+    def _build_proxy(self, source_path: str, out_path: str) -> None:
+        with self.scheduler.slot() as threads:
+            build_analysis_proxy(
+                source_path, out_path, self.proxy_fps, self.proxy_height, threads
+            )
+
+    async def _wait_until_active(self, file: types.File) -> types.File:
+        # Videos are processed after upload and can't be referenced until active
+        deadline = time.monotonic() + self.processing_timeout
+        while file.state == types.FileState.PROCESSING:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Gemini file {file.name} is still processing")
+            await asyncio.sleep(self.poll_interval)
+            file = await self.client.aio.files.get(name=file.name)
+        if file.state == types.FileState.FAILED:
+            raise RuntimeError(f"Gemini could not process file {file.name}: {file.error}")
+        return file
+
+    def _lookup(self, key: str) -> Optional[GeminiFileRef]:
+        with self._lock:
+            ref = self._local.get(key)
+        if ref is not None and self._usable(ref):
+            return ref
+        if self.redis_client is None:
+            return None
+        try:
+            raw = self.redis_client.get(key)
+        except RedisError as e:
+            logger.warning("Gemini file cache unavailable: %s", e)
+            return None
+        if raw is None:
+            return None
+        ref = GeminiFileRef.model_validate_json(raw)
+        if not self._usable(ref):
+            return None
+        with self._lock:
+            self._local[key] = ref
+        return ref
+
+    def _store(self, key: str, ref: GeminiFileRef) -> None:
+        ttl = int((ref.expires_at or 0) - self.expiry_margin - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            for stale in [k for k, v in self._local.items() if not self._usable(v)]:
+                del self._local[stale]
+            self._local[key] = ref
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.set(key, ref.model_dump_json(), ex=ttl)
+        except RedisError as e:
+            logger.warning("Could not cache Gemini file %s: %s", ref.name, e)
+
+    def _usable(self, ref: GeminiFileRef) -> bool:
+        return (ref.expires_at or 0) - self.expiry_margin > time.time()
+
+
+def _local_path(video_url: str) -> Optional[str]:
+    if video_url.startswith("file://"):
+        return video_url[len("file://") :]
+    return video_url if os.path.isfile(video_url) else None
@@ -0,0 +1,182 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Optional
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Gemini quota shared by every worker using the same API key
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+RATE_LIMIT_KEY_PREFIX = "ezclip:ratelimit:gemini"
+
+logger = logging.getLogger(__name__)
+
+# Refills every bucket in KEYS and takes the costs from all of them, or none
+# and returns how long to wait. ARGV holds capacity, refill per second and cost
+# for each key in turn. Runs atomically, with Redis time as the shared clock.
+TAKE_TOKENS_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local wait = 0
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 3 - 2])
+    local rate = tonumber(ARGV[i * 3 - 1])
+    local cost = tonumber(ARGV[i * 3])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    levels[i] = tokens
+    if tokens < cost then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+if wait == 0 then
+    for i, key in ipairs(KEYS) do
+        local capacity = tonumber(ARGV[i * 3 - 2])
+        local rate = tonumber(ARGV[i * 3 - 1])
+        redis.call('HSET', key, 'tokens', levels[i] - tonumber(ARGV[i * 3]), 'updated', now)
+        redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+    end
+end
+return tostring(wait)
+"""
+
+# Refills the bucket in KEYS[1] like TAKE_TOKENS_SCRIPT, then adds ARGV[3]
+# tokens to it (negative to take them) without waiting. ARGV[1] and ARGV[2] are
+# its capacity and refill per second. The bucket may go into debt, so it must
+# not expire before refilling from there.
+ADJUST_TOKENS_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate + tonumber(ARGV[3]))
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1)
+return tostring(tokens)
+"""
+
+
+class TokenBucket:
+    """
+    In-process token bucket holding up to `capacity` tokens, refilled at
+    `capacity / period` tokens per second.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        period: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def level(self) -> float:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def wait_time(self, cost: float) -> float:
+        return max(0.0, (cost - self.level()) / self.rate)
+
+
+class GeminiRateLimiter:
+    """
+    Token buckets for Gemini requests and tokens per minute. With a Redis
+    client the buckets live in Redis and are shared by every worker using the
+    same key prefix; without one, or while Redis is unavailable, each process
+    falls back to local buckets holding the whole quota.
+
+    A request is admitted only when both buckets can pay for it; try_acquire
+    takes the tokens and returns 0, or takes nothing and returns the seconds
+    to wait. Token costs are estimates made before the request, so callers
+    settle the difference with the actual usage through `adjust`.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        requests_per_minute: int = GEMINI_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = GEMINI_TOKENS_PER_MINUTE,
+        key_prefix: str = RATE_LIMIT_KEY_PREFIX,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.redis = redis_client
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests_key = f"{key_prefix}:requests"
+        self.tokens_key = f"{key_prefix}:tokens"
+        self._local_requests = TokenBucket(requests_per_minute, clock=clock)
+        self._local_tokens = TokenBucket(tokens_per_minute, clock=clock)
+        self._lock = threading.Lock()
+        self._script: Optional[Any] = None
+        self._adjust_script: Optional[Any] = None
+
+    def try_acquire(self, tokens: int) -> float:
+        # A single request larger than the whole quota could never be admitted
+        tokens = min(tokens, self.tokens_per_minute)
+        if self.redis is not None:
+            try:
+                return self._try_acquire_redis(tokens)
+            except RedisError as e:
+                logger.warning("Redis rate limiter unavailable, limiting locally: %s", e)
+        return self._try_acquire_local(tokens)
+
+    def adjust(self, tokens: int) -> None:
+        """
+        Take `tokens` more (or give back, if negative) without waiting.
+        """
+        if tokens == 0:
+            return
+        if self.redis is not None:
+            try:
+                if self._adjust_script is None:
+                    self._adjust_script = self.redis.register_script(ADJUST_TOKENS_SCRIPT)
+                self._adjust_script(
+                    keys=[self.tokens_key],
+                    args=[self.tokens_per_minute, self.tokens_per_minute / 60, -tokens],
+                )
+                return
+            except RedisError as e:
+                logger.warning("Could not adjust Redis token bucket: %s", e)
+        with self._lock:
+            self._local_tokens.level()
+            self._local_tokens.tokens -= tokens
+
+    def _try_acquire_redis(self, tokens: int) -> float:
+        if self._script is None:
+            self._script = self.redis.register_script(TAKE_TOKENS_SCRIPT)
+        wait = self._script(
+            keys=[self.requests_key, self.tokens_key],
+            args=[
+                self.requests_per_minute,
+                self.requests_per_minute / 60,
+                1,
+                self.tokens_per_minute,
+                self.tokens_per_minute / 60,
+                tokens,
+            ],
+        )
+        return float(wait)
+
+    def _try_acquire_local(self, tokens: int) -> float:
+        with self._lock:
+            wait = max(self._local_requests.wait_time(1), self._local_tokens.wait_time(tokens))
+            if wait == 0:
+                self._local_requests.tokens -= 1
+                self._local_tokens.tokens -= tokens
+            return wait
@@ -1,5 +1,6 @@
 import os
 import json
+from functools import lru_cache
 from typing import Optional, List, Literal
 from uuid import uuid4 as uuid
 from google import genai
@@ -16,11 +17,16 @@ from app.clipping.domain.video_understanding import (
     HighlightsResponse,
 )
 from app.clipping.domain.video_understanding import Highlight
+from app.clipping.domain.time_ranges import TimeRange
 
 load_dotenv()
 
 GOOGLE_GENAI_API_KEY = os.getenv("GOOGLE_GENAI_API_KEY")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
 MODEL_NAME = "models/gemini-2.5-flash"
+# Bump whenever the system prompt or response schema changes so cached
+# analyses produced by the previous template are not reused.
+PROMPT_TEMPLATE_VERSION = "2"
 
 
 def parse_timestamp_fn(timestamp: str, time_format: Literal["HH:MM:SS", "MM:SS"]):
@@ -51,6 +57,9 @@ class VideoUnderstandingHighlight(BaseModel):
     time_format: Literal["HH:MM:SS", "MM:SS"] = Field(
         description="The format of the timestamp"
     )
+    score: Optional[float] = Field(
+        default=None, description="Relevance score of the highlight out of 100"
+    )
 
     @model_validator(mode="after")
     def parse_timestamp(self):
@@ -64,22 +73,13 @@ class VideoUnderstandingHighlightsResponse(BaseModel):
     highlights: List[VideoUnderstandingHighlight]
 
 
-class GeminiVideoUnderstandingService(VideoUnderstandingService):
-    def analyze_video_highlights(
-        self, video_url: str, prompt: Optional[str] = None
-    ) -> HighlightsResponse:
-
-        if not GOOGLE_GENAI_API_KEY:
-            raise RuntimeError("GOOGLE_GENAI_API_KEY is not set in environment.")
-
-        client = genai.Client(api_key=GOOGLE_GENAI_API_KEY)
-
-        # Include user prompt if provided
-        user_prompt_addition = (
-            f"\n\nUser specific requirements: {prompt}" if prompt else ""
-        )
+def build_system_prompt(prompt: Optional[str] = None) -> str:
+    # Include user prompt if provided
+    user_prompt_addition = (
+        f"\n\nUser specific requirements: {prompt}" if prompt else ""
+    )
 
-        system_prompt = f"""
+    return f"""
 You are a video editor for a YouTube channel who wants to make their content very engaging and interesting, he wants to make short content from his large video.
 
 IMPORTANT: You MUST respond with valid JSON in the exact format specified. Do not include any text outside the JSON structure.
@@ -103,26 +103,119 @@ Definition of terms:
 Response format requirements:
 - The response MUST be valid JSON
 - Use the exact schema provided
-- Each highlight must have start_time, end_time, description, and time_format fields
+- Each highlight must have start_time, end_time, description, time_format and score fields
 - time_format should be "HH:MM:SS" for videos longer than 1 hour, "MM:SS" for shorter videos
 - All timestamps must be valid and within the video duration
 - All the outcome should be in the same language as the video transcript
 {user_prompt_addition}
 """
 
-        contents = types.Content(
-            parts=[
-                types.Part(file_data=types.FileData(file_uri=video_url)),
-                types.Part(text=system_prompt),
-            ]
+
+def build_contents(
+    video_url: str,
+    prompt: Optional[str] = None,
+    window: Optional[TimeRange] = None,
+    mime_type: Optional[str] = None,
+) -> types.Content:
+    """
+    Request contents for the whole video, or only `window` of it. Timestamps
+    in a window's response are relative to the window start. Files API
+    uploads need their `mime_type`; YouTube URLs don't.
+    """
+    video = types.Part(file_data=types.FileData(file_uri=video_url, mime_type=mime_type))
+    system_prompt = build_system_prompt(prompt)
+    if window is not None:
+        video.video_metadata = types.VideoMetadata(
+            start_offset=f"{window.start:g}s", end_offset=f"{window.end:g}s"
+        )
+        system_prompt += (
+            "\nOnly a segment of the video is provided. Give every timestamp relative "
+            "to the start of this segment, which is 00:00.\n"
         )
+    return types.Content(parts=[video, types.Part(text=system_prompt)])
+
+
+def build_generate_config() -> GenerateContentConfigOrDict:
+    return {
+        "response_mime_type": "application/json",
+        "response_schema": VideoUnderstandingHighlightsResponse,
+        "media_resolution": MediaResolution.MEDIA_RESOLUTION_LOW,
+        "temperature": 0.5,
+    }
+
+
+def parse_highlights_response(
+    response: GenerateContentResponse,
+) -> VideoUnderstandingHighlightsResponse:
+    """
+    Highlights from a generate_content response, preferring the SDK-parsed
+    object and falling back to the JSON text. Raises ValueError when neither
+    holds a valid response.
+    """
+    if hasattr(response, "parsed") and response.parsed:
+        parsed = response.parsed
+        if isinstance(parsed, VideoUnderstandingHighlightsResponse):
+            return parsed
+        if isinstance(parsed, dict):
+            return VideoUnderstandingHighlightsResponse(**parsed)
+
+    if hasattr(response, "text") and response.text:
+        return parse_highlights_text(response.text)
+
+    raise ValueError("No valid response received from Google GenAI")
+
+
+def parse_highlights_text(text: str) -> VideoUnderstandingHighlightsResponse:
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.endswith("```"):
+        text = text[:-3]
+    try:
+        return VideoUnderstandingHighlightsResponse(**json.loads(text.strip()))
+    except (json.JSONDecodeError, TypeError) as e:
+        raise ValueError(f"Invalid JSON response: {e}") from e
+
+
+def to_highlights_response(
+    highlights: list[VideoUnderstandingHighlight],
+) -> HighlightsResponse:
+    return HighlightsResponse(
+        highlights=[
+            Highlight(
+                id=str(uuid()),
+                start_time=h.start_time,
+                end_time=h.end_time,
+                description=h.description,
+                score=h.score,
+            )
+            for h in highlights
+        ]
+    )
+
+
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    """
+    Shared Gemini client for the process; its connection pools are reused by
+    every request. GEMINI_BASE_URL points it at another endpoint, e.g. a fake.
+    """
+    if not GOOGLE_GENAI_API_KEY:
+        raise RuntimeError("GOOGLE_GENAI_API_KEY is not set in environment.")
+    http_options = types.HttpOptions(base_url=GEMINI_BASE_URL) if GEMINI_BASE_URL else None
+    return genai.Client(api_key=GOOGLE_GENAI_API_KEY, http_options=http_options)
 
-        config: GenerateContentConfigOrDict = {
-            "response_mime_type": "application/json",
-            "response_schema": VideoUnderstandingHighlightsResponse,
-            "media_resolution": MediaResolution.MEDIA_RESOLUTION_LOW,
-            "temperature": 0.5,
-        }
+
+class GeminiVideoUnderstandingService(VideoUnderstandingService):
+    model_name = MODEL_NAME
+    prompt_version = PROMPT_TEMPLATE_VERSION
+
+    def analyze_video_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> HighlightsResponse:
+        client = get_genai_client()
+        contents = build_contents(video_url, prompt)
+        config = build_generate_config()
 
         max_retries = 2
         for attempt in range(max_retries):
@@ -130,47 +223,9 @@ Response format requirements:
                 response: GenerateContentResponse = client.models.generate_content(
                     model=MODEL_NAME, contents=contents, config=config
                 )
-
-                if hasattr(response, "parsed") and response.parsed:
-                    parsed = response.parsed
-                    if isinstance(parsed, VideoUnderstandingHighlightsResponse):
-                        return self.transform_to_response_highlights(parsed.highlights)
-                    elif isinstance(parsed, dict):
-                        highlights_response = VideoUnderstandingHighlightsResponse(
-                            **parsed
-                        )
-                        return self.transform_to_response_highlights(
-                            highlights_response.highlights
-                        )
-
-                if hasattr(response, "text") and response.text:
-                    try:
-                        text = response.text.strip()
-                        if text.startswith("```json"):
-                            text = text[7:]
-                        if text.endswith("```"):
-                            text = text[:-3]
-                        text = text.strip()
-
-                        json_data = json.loads(text)
-                        highlights_response = VideoUnderstandingHighlightsResponse(
-                            **json_data
-                        )
-                        return self.transform_to_response_highlights(
-                            highlights_response.highlights
-                        )
-                    except (json.JSONDecodeError, ValueError, TypeError) as e:
-                        if attempt == max_retries - 1:
-                            raise RuntimeError(
-                                f"Failed to parse JSON response after {max_retries} attempts: {e}"
-                            ) from e
-                        continue
-
-                if attempt == max_retries - 1:
-                    raise RuntimeError(
-                        "No valid response received from Google GenAI after all attempts"
-                    )
-
+                return self.transform_to_response_highlights(
+                    parse_highlights_response(response).highlights
+                )
             except Exception as e:  # pylint: disable=broad-except
                 if attempt == max_retries - 1:
                     raise RuntimeError(
@@ -183,14 +238,4 @@ Response format requirements:
     def transform_to_response_highlights(
         self, highlights: list[VideoUnderstandingHighlight]
     ) -> HighlightsResponse:
-        return HighlightsResponse(
-            highlights=[
-                Highlight(
-                    id=str(uuid()),
-                    start_time=h.start_time,
-                    end_time=h.end_time,
-                    description=h.description,
-                )
-                for h in highlights
-            ]
-        )
+        return to_highlights_response(highlights)
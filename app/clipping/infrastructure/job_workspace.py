@@ -0,0 +1,151 @@
+import os
+import re
+import time
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterator, Optional
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import JobWorkspaceProvider
+
+load_dotenv()
+
+# Per-job scratch directories are created here; point it at a tmpfs to keep
+# clips off the disk
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT") or os.path.join(
+    tempfile.gettempdir(), "ezclip-jobs"
+)
+# Free space each running job is allowed to count on
+WORKSPACE_MIN_FREE_BYTES = int(os.getenv("WORKSPACE_MIN_FREE_BYTES", str(2 * 1024**3)))
+WORKSPACE_ADMISSION_TIMEOUT_SECONDS = int(
+    os.getenv("WORKSPACE_ADMISSION_TIMEOUT_SECONDS", "1800")
+)
+# Workspaces untouched for this long were left behind by a worker that died
+WORKSPACE_STALE_SECONDS = int(os.getenv("WORKSPACE_STALE_SECONDS", str(6 * 3600)))
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientDiskSpaceError(RuntimeError):
+    """There was no room to start a job before the admission timeout."""
+
+
+class LocalJobWorkspaceProvider(JobWorkspaceProvider):
+    """
+    Per-job scratch directories under `root`, named after the job ID.
+
+    A workspace is deleted when its job ends, unless the job failed and
+    `keep_on_failure` says it will be retried: then the retry, under the same
+    job ID, gets back the clips it already cut.
+
+    A job is admitted once the filesystem holding `root` has `min_free_bytes`
+    free for it and for every job this process admitted that is still running,
+    so a burst of jobs can't all pass the check against the same free space.
+    Until then it waits, rather than failing halfway through an ffmpeg write,
+    and gives up with InsufficientDiskSpaceError after `admission_timeout`.
+    Workspaces whose retry never came, or of a killed worker, are swept once
+    they have been untouched for `stale_seconds`.
+    """
+
+    def __init__(
+        self,
+        root: str = WORKSPACE_ROOT,
+        min_free_bytes: int = WORKSPACE_MIN_FREE_BYTES,
+        admission_timeout: float = WORKSPACE_ADMISSION_TIMEOUT_SECONDS,
+        stale_seconds: float = WORKSPACE_STALE_SECONDS,
+        poll_interval: float = 5.0,
+    ):
+        self.root = root
+        self.min_free_bytes = min_free_bytes
+        self.admission_timeout = admission_timeout
+        self.stale_seconds = stale_seconds
+        self.poll_interval = poll_interval
+        self._active = 0
+        # Notified when a job finishes, so waiting jobs recheck at once
+        self._finished = threading.Condition()
+
+    @contextmanager
+    def workspace(
+        self,
+        job_id: str,
+        keep_on_failure: Optional[Callable[[BaseException], bool]] = None,
+    ) -> Iterator[str]:
+        os.makedirs(self.root, exist_ok=True)
+        self.sweep()
+        self._admit(job_id)
+        path = os.path.join(self.root, re.sub(r"[^\w-]", "_", job_id))
+        keep = False
+        try:
+            os.makedirs(path, exist_ok=True)
+            # A resumed workspace is in use again, so it isn't stale
+            os.utime(path)
+            yield path
+        except BaseException as e:
+            keep = keep_on_failure is not None and keep_on_failure(e)
+            if keep:
+                logger.info("Keeping workspace %s of failed job %s for its retry", path, job_id)
+            raise
+        finally:
+            if not keep:
+                shutil.rmtree(path, ignore_errors=True)
+            with self._finished:
+                self._active -= 1
+                self._finished.notify_all()
+
+    def sweep(self) -> None:
+        """
+        Delete workspaces that haven't been modified for `stale_seconds`.
+        """
+        now = time.time()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                stale = os.path.isdir(path) and now - os.path.getmtime(path) > self.stale_seconds
+            except OSError:
+                continue
+            if stale:
+                logger.info("Removing stale job workspace %s", path)
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _admit(self, job_id: str) -> None:
+        started = time.monotonic()
+        deadline = started + self.admission_timeout
+        waited = False
+        with self._finished:
+            while True:
+                free = shutil.disk_usage(self.root).free
+                needed = self.min_free_bytes * (self._active + 1)
+                if free >= needed:
+                    self._active += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise InsufficientDiskSpaceError(
+                        f"Job {job_id} needs {needed} bytes free in {self.root}, "
+                        f"found {free}"
+                    )
+                if not waited:
+                    logger.warning(
+                        "Job %s waiting for disk space in %s: %d bytes free, %d needed",
+                        job_id,
+                        self.root,
+                        free,
+                        needed,
+                    )
+                    waited = True
+                # Space freed by other processes is only seen by polling
+                self._finished.wait(min(self.poll_interval, remaining))
+        if waited:
+            logger.info(
+                "Job %s admitted after waiting %.1fs for disk space",
+                job_id,
+                time.monotonic() - started,
+            )
+
+
+@lru_cache(maxsize=1)
+def get_job_workspace_provider() -> LocalJobWorkspaceProvider:
+    return LocalJobWorkspaceProvider()
@@ -0,0 +1,61 @@
+import json
+from typing import Any, List, Optional
+
+
+class JsonArrayItemParser:
+    """
+    Incremental parser for a JSON document arriving in chunks, e.g.
+    `{"highlights": [{...}, {...}]}` streamed by a model. feed() returns each
+    object in the first array as soon as its closing brace arrives, without
+    waiting for the rest of the document. Text before the first `{` or `[`,
+    such as a Markdown code fence, is skipped.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0
+        # Open brackets outside strings, innermost last
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        # Stack depth of the array whose elements are emitted, once found
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Any]:
+        self._buffer += text
+        items: List[Any] = []
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append(char)
+                if char == "[" and self._array_depth is None:
+                    self._array_depth = len(self._stack)
+                elif len(self._stack) == (self._array_depth or -1) + 1:
+                    self._item_start = self._pos
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._item_start is not None and len(self._stack) == self._array_depth:
+                    items.append(json.loads(self._buffer[self._item_start : self._pos + 1]))
+                    self._item_start = None
+            self._pos += 1
+        self._compact()
+        return items
+
+    def _compact(self) -> None:
+        # Drop text no pending element can need
+        keep_from = self._item_start if self._item_start is not None else self._pos
+        self._buffer = self._buffer[keep_from:]
+        self._pos -= keep_from
+        if self._item_start is not None:
+            self._item_start = 0
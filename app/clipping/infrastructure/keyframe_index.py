@@ -0,0 +1,130 @@
+import os
+import bisect
+import hashlib
+import logging
+from typing import Callable, ContextManager, List, Optional
+import ffmpeg  # type: ignore
+from pydantic import BaseModel
+from dotenv import load_dotenv
+from app.clipping.infrastructure.source_cache import SOURCE_CACHE_DIR, get_source_cache
+
+load_dotenv()
+
+# Keyframe indexes are cached here, one file per source path. Hidden inside the
+# source cache so it is never mistaken for an entry or evicted with one.
+KEYFRAME_INDEX_DIR = os.getenv("KEYFRAME_INDEX_DIR") or os.path.join(
+    SOURCE_CACHE_DIR, ".keyframes"
+)
+
+logger = logging.getLogger(__name__)
+
+
+class KeyframeIndex(BaseModel):
+    """
+    Presentation timestamps (seconds) of the video keyframes of a source file,
+    with the video stream parameters re-encoded parts must match to be joined
+    with it. `size` and `mtime` identify the file version the index was built from.
+    """
+
+    size: int
+    mtime: float
+    video_codec: Optional[str] = None
+    profile: Optional[str] = None  # as reported by ffprobe, e.g. "High"
+    pix_fmt: Optional[str] = None
+    keyframes: List[float]
+
+    def at_or_before(self, t: float) -> float:
+        i = bisect.bisect_right(self.keyframes, t + 1e-3)
+        return self.keyframes[i - 1] if i else 0.0
+
+    def at_or_after(self, t: float) -> Optional[float]:
+        i = bisect.bisect_left(self.keyframes, t - 1e-3)
+        return self.keyframes[i] if i < len(self.keyframes) else None
+
+
+def keyframe_index_path(video_path: str, cache_dir: str = KEYFRAME_INDEX_DIR) -> str:
+    digest = hashlib.sha256(os.path.abspath(video_path).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+def load_keyframe_index(
+    video_path: str,
+    probe: bool = True,
+    cache_dir: str = KEYFRAME_INDEX_DIR,
+    single_flight: Optional[Callable[[str], ContextManager[None]]] = None,
+) -> Optional[KeyframeIndex]:
+    """
+    Keyframe index for `video_path`, built with ffprobe on first use and cached
+    in `cache_dir`. With `probe=False` only a cached index is returned. Workers
+    asking for the same source at once wait on `single_flight` (by default the
+    source cache's lock) for a single probe. Returns None when the source can't
+    be probed.
+    """
+    try:
+        stat = os.stat(video_path)
+    except OSError:
+        return None
+
+    cache_path = keyframe_index_path(video_path, cache_dir)
+    cached = _read_cached_index(cache_path, stat)
+    if cached is not None or not probe:
+        return cached
+
+    single_flight = single_flight or get_source_cache().single_flight
+    with single_flight(f"keyframes:{cache_path}"):
+        # Built by another worker while this one waited
+        cached = _read_cached_index(cache_path, stat)
+        if cached is not None:
+            return cached
+        index = _probe_keyframes(video_path, stat)
+        if index is None:
+            return None
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(index.model_dump_json())
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning("Could not cache keyframe index for %s: %s", video_path, e)
+    return index
+
+
+def _read_cached_index(cache_path: str, stat: os.stat_result) -> Optional[KeyframeIndex]:
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cached = KeyframeIndex.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return None
+    # A replaced or re-downloaded source needs a new index
+    if cached.size == stat.st_size and cached.mtime == stat.st_mtime:
+        return cached
+    return None
+
+
+def _probe_keyframes(video_path: str, stat: os.stat_result) -> Optional[KeyframeIndex]:
+    try:
+        # Reading packet flags only needs demuxing, no decoding
+        probe = ffmpeg.probe(
+            video_path,
+            select_streams="v:0",
+            show_entries="packet=pts_time,flags:stream=codec_name,profile,pix_fmt",
+        )
+    except (ffmpeg.Error, OSError) as e:
+        logger.warning("Could not build keyframe index for %s: %s", video_path, e)
+        return None
+
+    keyframes = sorted(
+        float(p["pts_time"])
+        for p in probe.get("packets", [])
+        if "K" in p.get("flags", "") and p.get("pts_time") not in (None, "N/A")
+    )
+    streams = probe.get("streams") or [{}]
+    return KeyframeIndex(
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        video_codec=streams[0].get("codec_name"),
+        profile=streams[0].get("profile"),
+        pix_fmt=streams[0].get("pix_fmt"),
+        keyframes=keyframes,
+    )
@@ -1,9 +1,11 @@
 import os
-from typing import List
+import tempfile
+from typing import List, Optional
 from moviepy import VideoFileClip
 from app.clipping.domain.video_understanding import (
     VideoClipperService,
     HighlightsResponse,
+    clip_filename,
 )
 
 
@@ -12,22 +14,19 @@ class MoviePyVideoClipper(VideoClipperService):
     Implementation of VideoClipperService using moviepy 2.2.1+ to clip videos based on highlights.
     """
 
-    def clip_video(self, video_url: str, highlights: HighlightsResponse) -> List[str]:
+    def clip_video(
+        self, video_url: str, highlights: HighlightsResponse, out_dir: Optional[str] = None
+    ) -> List[str]:
+        out_dir = out_dir or tempfile.gettempdir()
         output_paths: List[str] = []
-        base, ext = os.path.splitext(os.path.basename(video_url))
         video = VideoFileClip(video_url)
 
-        def to_seconds(ts: str) -> int:
-            parts = ts.split(":")
-            return int(parts[0]) * 60 + int(parts[1])
-
-        for idx, h in enumerate(highlights.highlights):
-            if h.start_time is None or h.end_time is None:
+        for h in highlights.highlights:
+            time_range = h.time_range
+            if time_range is None:
                 continue
-            start = to_seconds(h.start_time)
-            end = to_seconds(h.end_time)
-            clip = video.subclipped(start, end)
-            out_path = f"/tmp/{base}_clip{idx}{ext}"
+            clip = video.subclipped(time_range.start, time_range.end)
+            out_path = os.path.join(out_dir, clip_filename(video_url, h))
             clip.write_videofile(out_path, codec="libx264", audio_codec="aac", logger=None)
             output_paths.append(out_path)
 
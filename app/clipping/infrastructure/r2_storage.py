@@ -1,38 +1,287 @@
 import os
-from typing import Any
+import uuid
+import hashlib
+import logging
+import threading
+from typing import Any, BinaryIO, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
 from app.clipping.domain.video_understanding import StorageService
+from app.clipping.infrastructure.file_hashing import MB, file_sha256
 
 from dotenv import load_dotenv
 load_dotenv()
 
+# Parts uploaded at once for a single multipart clip
+R2_PART_CONCURRENCY = int(os.getenv("R2_PART_CONCURRENCY", "4"))
+R2_MULTIPART_CHUNK_MB = int(os.getenv("R2_MULTIPART_CHUNK_MB", "16"))
+# Store clips under the SHA-256 of their bytes and skip uploads that already exist
+R2_CONTENT_ADDRESSED = os.getenv("R2_CONTENT_ADDRESSED", "false").lower() == "true"
+# Smallest part size S3-compatible stores accept for all but the last part
+MIN_PART_MB = 5
+CONTENT_KEY_PREFIX = "content"
+STAGING_KEY_PREFIX = "staging"
+
+logger = logging.getLogger(__name__)
+
+
+def read_chunk(stream: BinaryIO, size: int) -> bytes:
+    """
+    Read exactly `size` bytes unless the stream ends first; pipes return short reads.
+    """
+    buffer = bytearray()
+    while len(buffer) < size:
+        data = stream.read(size - len(buffer))
+        if not data:
+            break
+        buffer += data
+    return bytes(buffer)
+
+
+def content_key(digest: str, filename: str) -> str:
+    return f"{CONTENT_KEY_PREFIX}/{digest}{os.path.splitext(filename)[1]}"
+
 
 class R2StorageService(StorageService):
     """
     Cloudflare R2 implementation for storing video clips.
     Requires boto3: pip install boto3
+
+    A single client is shared by every upload thread; its connection pool is
+    sized for the `upload_concurrency` clips callers upload at once (the use
+    case's upload pool), each uploading `part_concurrency` parts.
+
+    With `content_addressed`, clips are stored as `content/<sha256><ext>` and
+    uploads are skipped when that key already exists, checked against the keys
+    this process has seen and then with a HEAD. Retried jobs and reruns then
+    cost no egress for unchanged clips. Each clip is still copied server-side to
+    its key under `key_prefix`, and that per-job key is the URL returned.
     """
 
-    def __init__(self):
-        self.bucket = os.getenv("R2_BUCKET")
-        self.endpoint_url = os.getenv("R2_ENDPOINT_URL")
+    def __init__(
+        self,
+        bucket: Optional[str] = None,
+        endpoint_url: Optional[str] = None,
+        upload_concurrency: int = 4,
+        part_concurrency: int = R2_PART_CONCURRENCY,
+        multipart_chunk_mb: int = R2_MULTIPART_CHUNK_MB,
+        content_addressed: bool = R2_CONTENT_ADDRESSED,
+    ):
+        self.bucket = bucket or os.getenv("R2_BUCKET")
+        self.endpoint_url = endpoint_url or os.getenv("R2_ENDPOINT_URL")
         self.access_key = os.getenv("R2_ACCESS_KEY_ID")
         self.secret_key = os.getenv("R2_SECRET_ACCESS_KEY")
+        self.upload_concurrency = upload_concurrency
+        self.part_concurrency = part_concurrency
+        self.part_size = max(multipart_chunk_mb, MIN_PART_MB) * MB
+        self.content_addressed = content_addressed
+        self._known_keys: set[str] = set()
+        self._known_lock = threading.Lock()
 
         self.client: Any = boto3.client(
             "s3",
             endpoint_url=self.endpoint_url,
             aws_access_key_id=self.access_key,
             aws_secret_access_key=self.secret_key,
+            config=Config(
+                max_pool_connections=upload_concurrency * part_concurrency,
+                retries={"max_attempts": 5, "mode": "adaptive"},
+            ),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.part_size,
+            multipart_chunksize=self.part_size,
+            max_concurrency=part_concurrency,
+            use_threads=True,
         )
 
-    def save_video(self, clip_path: str) -> str:
+    def save_video(self, clip_path: str, key_prefix: Optional[str] = None) -> str:
         """
         Uploads a video file to R2 and returns the public URL.
         """
         filename = os.path.basename(clip_path)
+        if self.content_addressed:
+            key = content_key(file_sha256(clip_path), filename)
+            if self._exists(key):
+                logger.info("Skipping upload of %s, already stored as %s", clip_path, key)
+                return self._job_url(key, filename, key_prefix)
+        else:
+            key = self._key(filename, key_prefix)
         try:
-            self.client.upload_file(clip_path, self.bucket, filename)
+            self.client.upload_file(
+                clip_path,
+                self.bucket,
+                key,
+                ExtraArgs={"ContentType": "video/mp4"},
+                Config=self.transfer_config,
+            )
         except Exception as e:
             raise RuntimeError(f"Failed to upload {clip_path} to R2: {e}") from e
-        return f"{self.bucket}/{filename}"
+        self._remember(key)
+        return self._job_url(key, filename, key_prefix)
+
+    def save_stream(
+        self, stream: BinaryIO, filename: str, key_prefix: Optional[str] = None
+    ) -> str:
+        """
+        Uploads a clip from a non-seekable stream as a multipart upload. At most
+        `part_concurrency` parts are in flight plus the one being read, which
+        bounds memory regardless of clip length. Clips smaller than one part are
+        sent with a single PUT.
+
+        The content hash of a stream is only known at its end, so content-addressed
+        multipart uploads are staged under a temporary key, then aborted if the
+        clip already exists or completed and copied server-side to its content key.
+        """
+        digest = hashlib.sha256()
+        first = read_chunk(stream, self.part_size)
+        digest.update(first)
+        if len(first) < self.part_size:
+            # read_chunk hit the end of the stream, so the producer is done
+            return self._put_object(first, filename, key_prefix, digest.hexdigest())
+
+        if self.content_addressed:
+            upload_key = f"{STAGING_KEY_PREFIX}/{uuid.uuid4().hex}/{filename}"
+        else:
+            upload_key = self._key(filename, key_prefix)
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=upload_key, ContentType="video/mp4"
+        )["UploadId"]
+        try:
+            parts = self._upload_parts(stream, upload_key, upload_id, first, digest)
+            key = upload_key
+            if self.content_addressed:
+                key = content_key(digest.hexdigest(), filename)
+                if self._exists(key):
+                    logger.info("Discarding staged upload of %s, already stored as %s", filename, key)
+                    self.client.abort_multipart_upload(
+                        Bucket=self.bucket, Key=upload_key, UploadId=upload_id
+                    )
+                    return self._job_url(key, filename, key_prefix)
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=upload_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception as e:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket, Key=upload_key, UploadId=upload_id
+            )
+            raise RuntimeError(f"Failed to upload {filename} to R2: {e}") from e
+
+        if key != upload_key:
+            self._publish_staged(upload_key, key)
+        self._remember(key)
+        return self._job_url(key, filename, key_prefix)
+
+    def _put_object(
+        self, body: bytes, filename: str, key_prefix: Optional[str], digest: str
+    ) -> str:
+        if self.content_addressed:
+            key = content_key(digest, filename)
+            if self._exists(key):
+                logger.info("Skipping upload of %s, already stored as %s", filename, key)
+                return self._job_url(key, filename, key_prefix)
+        else:
+            key = self._key(filename, key_prefix)
+        try:
+            self.client.put_object(
+                Bucket=self.bucket, Key=key, Body=body, ContentType="video/mp4"
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to upload {filename} to R2: {e}") from e
+        self._remember(key)
+        return self._job_url(key, filename, key_prefix)
+
+    def _upload_parts(
+        self, stream: BinaryIO, key: str, upload_id: str, first: bytes, digest: Any
+    ) -> List[dict[str, Any]]:
+        in_flight = threading.BoundedSemaphore(self.part_concurrency)
+        futures: List[Future[dict[str, Any]]] = []
+
+        def upload_part(part_number: int, body: bytes) -> dict[str, Any]:
+            try:
+                response = self.client.upload_part(
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body,
+                )
+                return {"PartNumber": part_number, "ETag": response["ETag"]}
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=self.part_concurrency) as executor:
+            chunk = first
+            while chunk:
+                in_flight.acquire()  # pylint: disable=consider-using-with
+                failed = next((f for f in futures if f.done() and f.exception()), None)
+                if failed is not None:
+                    in_flight.release()
+                    failed.result()
+                futures.append(executor.submit(upload_part, len(futures) + 1, chunk))
+                chunk = read_chunk(stream, self.part_size)
+                digest.update(chunk)
+            return [f.result() for f in futures]
+
+    def _publish_staged(self, staging_key: str, key: str) -> None:
+        try:
+            self._copy(staging_key, key)
+        finally:
+            self.client.delete_object(Bucket=self.bucket, Key=staging_key)
+
+    def _job_url(self, key: str, filename: str, key_prefix: Optional[str]) -> str:
+        """
+        URL of a stored clip under the job's `key_prefix`. Content-addressed clips
+        are copied there server-side, so per-job namespacing still holds.
+        """
+        job_key = self._key(filename, key_prefix)
+        if key == job_key or not key_prefix:
+            return self._url(key)
+        self._copy(key, job_key)
+        return self._url(job_key)
+
+    def _copy(self, source_key: str, key: str) -> None:
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=key,
+                CopySource={"Bucket": self.bucket, "Key": source_key},
+                ContentType="video/mp4",
+                MetadataDirective="REPLACE",
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to copy {source_key} to {key} in R2: {e}") from e
+
+    def _exists(self, key: str) -> bool:
+        with self._known_lock:
+            if key in self._known_keys:
+                return True
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                # Can't tell; uploading again is always safe
+                logger.warning("HEAD %s failed, uploading anyway: %s", key, e)
+            return False
+        except BotoCoreError as e:
+            # Connection and endpoint errors; the upload will surface them if they persist
+            logger.warning("HEAD %s could not reach R2, uploading anyway: %s", key, e)
+            return False
+        self._remember(key)
+        return True
+
+    def _remember(self, key: str) -> None:
+        with self._known_lock:
+            self._known_keys.add(key)
+
+    def _key(self, filename: str, key_prefix: Optional[str]) -> str:
+        return f"{key_prefix.strip('/')}/{filename}" if key_prefix else filename
+
+    def _url(self, key: str) -> str:
+        return f"{self.bucket}/{key}"
@@ -0,0 +1,18 @@
+import os
+from functools import lru_cache
+from typing import Any
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+
+@lru_cache(maxsize=1)
+def get_redis_client() -> Any:
+    """
+    Shared Redis client for the process, pointing at the same Redis used by Celery.
+    The connection pool is created lazily on the first command.
+    """
+    return redis.Redis.from_url(REDIS_URL)
@@ -0,0 +1,234 @@
+import os
+import re
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+import logging
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Optional
+from dotenv import load_dotenv
+from app.clipping.infrastructure.redis_client import get_redis_client
+
+load_dotenv()
+
+SOURCE_CACHE_DIR = os.getenv(
+    "SOURCE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ezclip-sources")
+)
+SOURCE_CACHE_MAX_BYTES = int(os.getenv("SOURCE_CACHE_MAX_BYTES", str(20 * 1024**3)))
+SOURCE_CACHE_LOCK_BACKEND = os.getenv("SOURCE_CACHE_LOCK_BACKEND", "file")
+SOURCE_CACHE_LOCK_TIMEOUT_SECONDS = int(os.getenv("SOURCE_CACHE_LOCK_TIMEOUT_SECONDS", "1800"))
+# Entries used more recently than this are never evicted, so a file is not
+# removed from under a job that is still clipping it.
+SOURCE_CACHE_MIN_IDLE_SECONDS = int(os.getenv("SOURCE_CACHE_MIN_IDLE_SECONDS", "600"))
+# Leases older than this were left by a job that never released them
+SOURCE_CACHE_LEASE_SECONDS = int(os.getenv("SOURCE_CACHE_LEASE_SECONDS", str(6 * 3600)))
+LEASES_DIRNAME = ".leases"
+
+logger = logging.getLogger(__name__)
+
+
+class SourceVideoCache:
+    """
+    Shared on-disk cache of downloaded source videos.
+
+    Entries live in `<root>/<sha256(source_key)>/` and are published with an atomic
+    directory rename, so readers never see a partial download. A per-key lock
+    (flock on the local filesystem, or a Redis lock for caches on a shared volume)
+    makes concurrent requests for the same source wait for a single download.
+    Once the cache grows past `max_bytes`, least recently used entries are evicted.
+
+    A job whose clips are cut by other tasks takes a lease on its source when it
+    gets it and releases it once its clips are saved; leased entries are never
+    evicted. Leases are files in the entry, so they hold across workers, and
+    expire after `lease_seconds` in case a job never releases its own.
+    """
+
+    def __init__(
+        self,
+        root: str = SOURCE_CACHE_DIR,
+        max_bytes: int = SOURCE_CACHE_MAX_BYTES,
+        redis_client: Optional[Any] = None,
+        lock_timeout: int = SOURCE_CACHE_LOCK_TIMEOUT_SECONDS,
+        min_idle_seconds: int = SOURCE_CACHE_MIN_IDLE_SECONDS,
+        lease_seconds: int = SOURCE_CACHE_LEASE_SECONDS,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.redis_client = redis_client
+        self.lock_timeout = lock_timeout
+        self.min_idle_seconds = min_idle_seconds
+        self.lease_seconds = lease_seconds
+
+    def get_or_download(
+        self, source_key: str, download: Callable[[str], str], lease: Optional[str] = None
+    ) -> str:
+        """
+        Return the cached file for `source_key`, calling `download(target_dir)` at
+        most once across workers when it is missing. `download` must write a single
+        file into `target_dir` and return its path. With `lease`, the entry is
+        kept until `release(path, lease)`.
+        """
+        digest = hashlib.sha256(source_key.encode("utf-8")).hexdigest()
+        entry_dir = os.path.join(self.root, digest)
+        os.makedirs(self.root, exist_ok=True)
+
+        with self._single_flight(digest):
+            cached = self._lookup(entry_dir)
+            if cached is not None:
+                logger.info("Source cache hit for %s: %s", source_key, cached)
+                if lease:
+                    self._lease(entry_dir, lease)
+                return cached
+
+            logger.info("Source cache miss for %s, downloading...", source_key)
+            partial_dir = os.path.join(self.root, f".partial-{digest}-{uuid.uuid4().hex}")
+            os.makedirs(partial_dir)
+            try:
+                downloaded = download(partial_dir)
+                os.rename(partial_dir, entry_dir)
+            except BaseException:
+                shutil.rmtree(partial_dir, ignore_errors=True)
+                raise
+            path = os.path.join(entry_dir, os.path.basename(downloaded))
+            if lease:
+                self._lease(entry_dir, lease)
+
+        self.evict(keep=digest)
+        return path
+
+    def release(self, path: str, lease: str) -> None:
+        """
+        Release `lease` on the cached file at `path`. Paths outside the cache
+        hold no leases, so releasing them does nothing.
+        """
+        entry_dir = os.path.dirname(os.path.abspath(path))
+        if os.path.dirname(entry_dir) != os.path.abspath(self.root):
+            return
+        try:
+            os.remove(os.path.join(entry_dir, LEASES_DIRNAME, _lease_filename(lease)))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def single_flight(self, key: str) -> Iterator[None]:
+        """
+        Hold the cache's cross-worker lock for `key`, so work derived from a
+        cached source (like probing it) is done once however many jobs ask.
+        """
+        with self._single_flight(hashlib.sha256(key.encode("utf-8")).hexdigest()):
+            yield
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Delete least recently used entries until the cache fits in `max_bytes`.
+        """
+        now = time.time()
+        entries: list[tuple[float, int, str]] = []
+        total = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            if name.startswith("."):
+                # Left behind by a worker that died mid-download.
+                if name.startswith(".partial-") and now - os.path.getmtime(path) > self.lock_timeout:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            size = _dir_size(path)
+            total += size
+            entries.append((os.path.getmtime(path), size, name))
+
+        for last_used, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep or now - last_used < self.min_idle_seconds:
+                continue
+            entry_dir = os.path.join(self.root, name)
+            # Under the entry's lock, so no job can lease it while it is removed
+            with self._single_flight(name):
+                if self._leased(entry_dir, now):
+                    continue
+                logger.info("Evicting source cache entry %s (%d bytes)", name, size)
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def _lookup(self, entry_dir: str) -> Optional[str]:
+        if not os.path.isdir(entry_dir):
+            return None
+        files = sorted(f for f in os.listdir(entry_dir) if not f.startswith("."))
+        if not files:
+            return None
+        # Mark the entry as recently used for LRU eviction.
+        os.utime(entry_dir)
+        return os.path.join(entry_dir, files[0])
+
+    def _lease(self, entry_dir: str, lease: str) -> None:
+        leases_dir = os.path.join(entry_dir, LEASES_DIRNAME)
+        os.makedirs(leases_dir, exist_ok=True)
+        with open(os.path.join(leases_dir, _lease_filename(lease)), "w", encoding="utf-8"):
+            pass
+
+    def _leased(self, entry_dir: str, now: float) -> bool:
+        leases_dir = os.path.join(entry_dir, LEASES_DIRNAME)
+        try:
+            names = os.listdir(leases_dir)
+        except FileNotFoundError:
+            return False
+        for name in names:
+            try:
+                if now - os.path.getmtime(os.path.join(leases_dir, name)) < self.lease_seconds:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    @contextmanager
+    def _single_flight(self, digest: str) -> Iterator[None]:
+        if self.redis_client is not None:
+            lock = self.redis_client.lock(
+                f"ezclip:source-cache:{digest}",
+                timeout=self.lock_timeout,
+                blocking_timeout=self.lock_timeout,
+            )
+            if not lock.acquire():
+                raise TimeoutError(f"Timed out waiting for source download {digest}")
+            try:
+                yield
+            finally:
+                lock.release()
+            return
+
+        lock_dir = os.path.join(self.root, ".locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, f"{digest}.lock"), "w", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=1)
+def get_source_cache() -> SourceVideoCache:
+    return SourceVideoCache(
+        redis_client=get_redis_client() if SOURCE_CACHE_LOCK_BACKEND == "redis" else None
+    )
+
+
+def _lease_filename(lease: str) -> str:
+    return re.sub(r"[^\w-]", "_", lease)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
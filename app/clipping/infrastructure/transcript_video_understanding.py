@@ -0,0 +1,90 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, List, Optional
+from google.genai import types
+from app.clipping.domain.video_understanding import (
+    AsyncVideoUnderstandingService,
+    Highlight,
+    HighlightsResponse,
+)
+from app.clipping.infrastructure.async_gemini_video_understanding import (
+    AsyncGeminiVideoUnderstandingService,
+)
+from app.clipping.infrastructure.captions import CaptionCue, format_transcript
+from app.clipping.infrastructure.gemini_video_understanding import (
+    MODEL_NAME,
+    PROMPT_TEMPLATE_VERSION,
+    build_system_prompt,
+)
+
+# Bump whenever the transcript prompt changes, like PROMPT_TEMPLATE_VERSION
+TRANSCRIPT_PROMPT_VERSION = "1"
+
+logger = logging.getLogger(__name__)
+
+
+def build_transcript_contents(
+    cues: List[CaptionCue], prompt: Optional[str] = None
+) -> types.Content:
+    """
+    Text-only request contents: the timestamped transcript instead of the video.
+    """
+    system_prompt = build_system_prompt(prompt) + (
+        "\nThe video is given as its transcript, one caption per line prefixed with "
+        "its [HH:MM:SS] start time. Base every timestamp on these start times.\n"
+    )
+    return types.Content(
+        parts=[types.Part(text=format_transcript(cues)), types.Part(text=system_prompt)]
+    )
+
+
+class TranscriptVideoUnderstandingService(AsyncVideoUnderstandingService):
+    """
+    Transcript-first highlight detection. When `caption_lookup` finds captions,
+    highlights are detected from the timestamped transcript alone, which costs
+    a fraction of the tokens and time of sending the video. Videos without
+    captions are analyzed by `video_service` as before.
+
+    Transcript requests go through `video_service` too, so they share its rate
+    limit, concurrency cap and retries.
+    """
+
+    model_name = MODEL_NAME
+    prompt_version = f"{PROMPT_TEMPLATE_VERSION}-transcript{TRANSCRIPT_PROMPT_VERSION}"
+
+    def __init__(
+        self,
+        video_service: AsyncGeminiVideoUnderstandingService,
+        caption_lookup: Callable[[str], Optional[List[CaptionCue]]],
+    ):
+        self.video_service = video_service
+        self.caption_lookup = caption_lookup
+
+    async def analyze_video_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> HighlightsResponse:
+        cues = await self._captions(video_url)
+        if cues is None:
+            return await self.video_service.analyze_video_highlights(video_url, prompt)
+        return await self.video_service.generate(build_transcript_contents(cues, prompt))
+
+    async def iter_highlights(
+        self, video_url: str, prompt: Optional[str] = None
+    ) -> AsyncIterator[Highlight]:
+        cues = await self._captions(video_url)
+        if cues is None:
+            async for highlight in self.video_service.iter_highlights(video_url, prompt):
+                yield highlight
+            return
+        # Text-only answers come back quickly, so they aren't streamed
+        result = await self.video_service.generate(build_transcript_contents(cues, prompt))
+        for highlight in result.highlights:
+            yield highlight
+
+    async def _captions(self, video_url: str) -> Optional[List[CaptionCue]]:
+        cues = await asyncio.to_thread(self.caption_lookup, video_url)
+        if not cues:
+            logger.info("No captions for %s, analyzing the video", video_url)
+            return None
+        logger.info("Analyzing %s from its transcript (%d captions)", video_url, len(cues))
+        return cues
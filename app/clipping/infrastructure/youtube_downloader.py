@@ -1,13 +1,246 @@
 import os
+import logging
 import tempfile
-from typing import Any
+import threading
+from typing import Any, Callable, List, Optional
+from pydantic import BaseModel
 from yt_dlp import YoutubeDL  # type: ignore
+from yt_dlp.utils import DownloadCancelled, download_range_func  # type: ignore
+from dotenv import load_dotenv
+from app.clipping.domain.video_understanding import DownloadResult, get_youtube_video_id
+from app.clipping.domain.time_ranges import SourceSection, TimeRange
+from app.clipping.infrastructure.captions import CaptionCue, parse_webvtt
+from app.clipping.infrastructure.source_cache import get_source_cache
 
+load_dotenv()
 
-def download_youtube_video(url: str) -> str:
-    download_dir = tempfile.gettempdir()
+# Number of DASH/HLS fragments fetched in parallel per download
+YTDL_CONCURRENT_FRAGMENTS = int(os.getenv("YTDL_CONCURRENT_FRAGMENTS", "8"))
+# Pre-muxed formats at or above this height are preferred, since they skip the
+# ffmpeg video+audio merge step.
+YTDL_MIN_PREMUXED_HEIGHT = int(os.getenv("YTDL_MIN_PREMUXED_HEIGHT", "720"))
+YTDL_MAX_HEIGHT = int(os.getenv("YTDL_MAX_HEIGHT", "1080"))
+
+METADATA_FILENAME = ".download.json"
+
+logger = logging.getLogger(__name__)
+
+source_cache = get_source_cache()
+
+
+class DownloadProgress(BaseModel):
+    status: str  # "downloading" or "finished"
+    downloaded_bytes: int
+    total_bytes: Optional[int] = None
+    speed: Optional[float] = None  # bytes per second
+    eta: Optional[float] = None  # seconds
+
+
+ProgressCallback = Callable[[DownloadProgress], None]
+
+
+def download_youtube_video(
+    url: str,
+    cancel_event: Optional[threading.Event] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+    lease: Optional[str] = None,
+) -> DownloadResult:
+    """
+    Download a YouTube video through the shared source cache. Setting `cancel_event`
+    aborts an in-flight download at the next progress update. With `lease`, the
+    cached file is kept until release_youtube_video(path, lease).
+    """
+    try:
+        source_key = f"youtube:{get_youtube_video_id(url)}"
+    except ValueError:
+        source_key = url
+    path = source_cache.get_or_download(
+        source_key,
+        lambda download_dir: _download(url, download_dir, cancel_event, progress_callback),
+        lease=lease,
+    )
+    return _read_metadata(path)
+
+
+def release_youtube_video(path: str, lease: str) -> None:
+    """
+    Let the source cache evict a video downloaded with `lease` again.
+    """
+    source_cache.release(path, lease)
+
+
+def fetch_video_duration(url: str) -> Optional[float]:
+    """
+    Duration in seconds from the video's metadata, without downloading it.
+    Returns None when it can't be determined.
+    """
+    try:
+        with YoutubeDL({"quiet": True, "no_warnings": True, "skip_download": True}) as ydl:
+            info = ydl.extract_info(url, download=False)  # type: ignore
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Could not read the duration of %s: %s", url, e)
+        return None
+    duration = (info or {}).get("duration")
+    return float(duration) if duration else None
+
+
+def fetch_captions(url: str) -> Optional[List[CaptionCue]]:
+    """
+    The video's captions in its spoken language, without downloading the video:
+    uploaded subtitles when there are any, otherwise automatic captions.
+    Returns None when there are none or they can't be fetched.
+    """
+    try:
+        with YoutubeDL({"quiet": True, "no_warnings": True, "skip_download": True}) as ydl:
+            info = ydl.extract_info(url, download=False)  # type: ignore
+            track = _pick_caption_track(info or {})
+            if track is None:
+                return None
+            text = ydl.urlopen(track["url"]).read().decode("utf-8")  # type: ignore
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Could not fetch captions of %s: %s", url, e)
+        return None
+    return parse_webvtt(text) or None
+
+
+def _pick_caption_track(info: dict[str, Any]) -> Optional[dict[str, Any]]:
+    language = info.get("language") or ""
+    subtitles = info.get("subtitles") or {}
+    # Automatic captions include machine translations into every language; only
+    # the original track ("<lang>-orig", or the spoken language) matches the audio
+    automatic = info.get("automatic_captions") or {}
+    candidates = [
+        subtitles.get(language),
+        next((v for k, v in subtitles.items() if k.split("-")[0] == language), None),
+        next((v for k, v in subtitles.items() if k != "live_chat"), None),
+        automatic.get(f"{language}-orig"),
+        automatic.get(language),
+        next((v for k, v in automatic.items() if k.endswith("-orig")), None),
+    ]
+    for formats in candidates:
+        vtt = next((f for f in formats or [] if f.get("ext") == "vtt" and f.get("url")), None)
+        if vtt is not None:
+            return vtt
+    return None
+
+
+def download_youtube_sections(
+    url: str,
+    sections: List[TimeRange],
+    cancel_event: Optional[threading.Event] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+    download_dir: Optional[str] = None,
+) -> List[SourceSection]:
+    """
+    Download only the given time ranges of a YouTube video, one file per range,
+    into `download_dir` (by default a new temporary directory). Cuts are
+    re-encoded at the boundaries so each file starts exactly at its range start
+    and timestamps inside it can be rebased by subtracting that start.
+    """
+    download_dir = download_dir or tempfile.mkdtemp(prefix="ezclip-sections-")
+    outtmpl = os.path.join(download_dir, "%(id)s.%(section_start)s-%(section_end)s.%(ext)s")
+    ydl_opts = _ydl_opts(outtmpl, _progress_hook(cancel_event, progress_callback))
+    ydl_opts.update(
+        {
+            "download_ranges": download_range_func(None, [(s.start, s.end) for s in sections]),
+            "force_keyframes_at_cuts": True,
+        }
+    )
+    with YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=True)  # type: ignore
+
+    downloaded: List[SourceSection] = []
+    for requested in info.get("requested_downloads") or []:
+        start = float(requested.get("section_start") or 0.0)
+        end = float(requested.get("section_end") or start)
+        downloaded.append(
+            SourceSection(path=requested["filepath"], time_range=TimeRange(start=start, end=end))
+        )
+    return sorted(downloaded, key=lambda s: s.time_range.start)
+
+
+def _download(
+    url: str,
+    download_dir: str,
+    cancel_event: Optional[threading.Event] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+) -> str:
+    hook = _progress_hook(cancel_event, progress_callback)
+    hook({"status": "starting"})
     outtmpl = os.path.join(download_dir, "%(id)s.%(ext)s")
-    ydl_opts: dict[str, Any] = {
+    with YoutubeDL(_ydl_opts(outtmpl, hook)) as ydl:
+        info = ydl.extract_info(url, download=True)  # type: ignore
+
+    result = _download_result(info)
+    with open(os.path.join(download_dir, METADATA_FILENAME), "w", encoding="utf-8") as f:
+        f.write(result.model_dump_json())
+    return result.path
+
+
+def _download_result(info: dict[str, Any]) -> DownloadResult:
+    # requested_downloads holds the final path after merging/remuxing
+    requested = (info.get("requested_downloads") or [info])[0]
+    path = requested.get("filepath") or requested.get("_filename")
+    if not path:
+        raise RuntimeError(f"yt-dlp did not report an output file for {info.get('id')}")
+    return DownloadResult(
+        path=path,
+        duration=info.get("duration"),
+        container=requested.get("ext") or info.get("ext"),
+        video_codec=requested.get("vcodec") or info.get("vcodec"),
+        audio_codec=requested.get("acodec") or info.get("acodec"),
+    )
+
+
+def _read_metadata(path: str) -> DownloadResult:
+    metadata_path = os.path.join(os.path.dirname(path), METADATA_FILENAME)
+    try:
+        with open(metadata_path, encoding="utf-8") as f:
+            result = DownloadResult.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return DownloadResult(path=path)
+    # The file was downloaded into a staging directory and moved into the cache
+    return result.model_copy(update={"path": path})
+
+
+def _progress_hook(
+    cancel_event: Optional[threading.Event],
+    progress_callback: Optional[ProgressCallback],
+) -> Callable[[dict[str, Any]], None]:
+    def hook(status: dict[str, Any]) -> None:
+        if cancel_event is not None and cancel_event.is_set():
+            raise DownloadCancelled("Source download cancelled")
+        if status.get("status") not in ("downloading", "finished"):
+            return
+        progress = DownloadProgress(
+            status=status["status"],
+            downloaded_bytes=status.get("downloaded_bytes") or 0,
+            total_bytes=status.get("total_bytes") or status.get("total_bytes_estimate"),
+            speed=status.get("speed"),
+            eta=status.get("eta"),
+        )
+        if progress.status == "finished":
+            elapsed = status.get("elapsed") or 0
+            logger.info(
+                "Downloaded %s: %d bytes in %.1fs (%.1f MB/s)",
+                status.get("filename"),
+                progress.downloaded_bytes,
+                elapsed,
+                progress.downloaded_bytes / elapsed / 1e6 if elapsed else 0,
+            )
+        if progress_callback is not None:
+            progress_callback(progress)
+
+    return hook
+
+
+def _ydl_opts(outtmpl: str, progress_hook: Callable[[dict[str, Any]], None]) -> dict[str, Any]:
+    premuxed = (
+        f"[height>={YTDL_MIN_PREMUXED_HEIGHT}][height<={YTDL_MAX_HEIGHT}]"
+        "[vcodec!=none][acodec!=none]"
+    )
+    capped = f"[height<={YTDL_MAX_HEIGHT}]"
+    return {
         "http_headers": {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/109.0",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -16,23 +249,24 @@ def download_youtube_video(url: str) -> str:
         },
         "geo_bypass": True,
         "verbose": False,  # Reduce verbosity to avoid format warnings
+        "noprogress": True,
         "outtmpl": outtmpl,
         "format": (
-            # Try best quality MP4 with height limit first
-            "bestvideo[ext=mp4][height<=1080]+bestaudio[ext=m4a]/bestaudio[ext=mp4]/"
+            # Pre-muxed MP4 that meets the quality bar needs no merge step
+            f"best[ext=mp4]{premuxed}/"
+            # Otherwise best quality MP4 video+audio with height limit
+            f"bestvideo[ext=mp4]{capped}+bestaudio[ext=m4a]/"
             # Fallback to any best video+audio combo with height limit
-            "bestvideo[height<=1080]+bestaudio[ext=m4a]/bestaudio/"
+            f"bestvideo{capped}+bestaudio/"
             # Final fallback to any best single file
-            "best[ext=mp4][height<=1080]/"
-            "best[height<=1080]/"
+            f"best[ext=mp4]{capped}/"
+            f"best{capped}/"
             "best"
         ),
         "merge_output_format": "mp4",
+        "concurrent_fragment_downloads": YTDL_CONCURRENT_FRAGMENTS,
         "ignoreerrors": False,
         "no_warnings": True,  # Suppress format selection warnings
         "cookiefile": "cookies.txt",
+        "progress_hooks": [progress_hook],
     }
-    with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=True)  # type: ignore
-        ydl.download(url)  # type: ignore
-        return ydl.prepare_filename(info).replace(".webm", ".mp4")  # type: ignore
@@ -1,20 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 import os
 from pydantic import BaseModel
 from app.clipping.use_cases.clip_video import ClipVideoFromHighlightsUseCase
-from app.clipping.infrastructure.r2_storage import R2StorageService
-from app.clipping.infrastructure.firebase_highlight_repository import (
-    FirebaseHighlightRepository,
-)
-from app.clipping.infrastructure.gemini_video_understanding import (
-    GeminiVideoUnderstandingService,
-)
-from app.clipping.infrastructure.moviepy_video_clipper import MoviePyVideoClipper
 from app.clipping.domain.video_understanding import ClipResult
-from app.clipping.infrastructure.firebase_clip_url_repository import (
-    FirebaseClipUrlRepository,
-)
-import boto3
+from app.clipping.dependencies import get_api_use_case
 
 router = APIRouter()
 
@@ -22,15 +11,8 @@ router = APIRouter()
 class ClipRequest(BaseModel):
     video_url: str
     prompt: str | None = None
-
-
-use_case = ClipVideoFromHighlightsUseCase(
-    video_understanding_service=GeminiVideoUnderstandingService(),
-    video_clipper_service=MoviePyVideoClipper(),
-    storage_service=R2StorageService(),
-    highlight_repository=FirebaseHighlightRepository(),
-    clip_url_repository=FirebaseClipUrlRepository(),
-)
+    # Resubmitting a failed request with the same job ID resumes it
+    job_id: str | None = None
 
 
 class VideoUrlRequest(BaseModel):
@@ -39,8 +21,12 @@ class VideoUrlRequest(BaseModel):
 
 @router.post("/video-url")
 def get_video_url(request: VideoUrlRequest):
-    filename = request.filename.split("/")[-1]
-    url = f"https://pub-384e2f668fd549bd8db6899b615291ce.r2.dev/{filename}"
+    # Stored clip URLs are "<bucket>/<key>"; keys may be namespaced by video and job
+    key = request.filename
+    bucket = os.getenv("R2_BUCKET")
+    if bucket and key.startswith(f"{bucket}/"):
+        key = key[len(bucket) + 1 :]
+    url = f"https://pub-384e2f668fd549bd8db6899b615291ce.r2.dev/{key.lstrip('/')}"
     return {"url": url}
 
 
@@ -50,9 +36,12 @@ def ping():
 
 
 @router.post("/clip", response_model=ClipResult)
-def clip_video_endpoint(request: ClipRequest):
+def clip_video_endpoint(
+    request: ClipRequest,
+    use_case: ClipVideoFromHighlightsUseCase = Depends(get_api_use_case),
+):
     try:
-        result = use_case.execute(request.video_url, request.prompt)
+        result = use_case.execute(request.video_url, request.prompt, job_id=request.job_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
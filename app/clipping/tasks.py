@@ -1,28 +1,196 @@
+import os
+import logging
+from typing import Any, Optional
+from celery import chord, group
+from celery.signals import worker_init
+from celery.utils import worker_direct
 from celery_worker import celery_app
-from app.clipping.use_cases.clip_video import ClipVideoFromHighlightsUseCase
-
-from app.clipping.infrastructure.r2_storage import R2StorageService
-from app.clipping.infrastructure.firebase_highlight_repository import (
-    FirebaseHighlightRepository,
-)
-from app.clipping.infrastructure.gemini_video_understanding import (
-    GeminiVideoUnderstandingService,
-)
-from app.clipping.infrastructure.firebase_clip_url_repository import (
-    FirebaseClipUrlRepository,
-)
-from app.clipping.infrastructure.ffmpeg_video_clipper import FFmpegVideoClipper
-
-use_case = ClipVideoFromHighlightsUseCase(
-    video_understanding_service=GeminiVideoUnderstandingService(),
-    video_clipper_service=FFmpegVideoClipper(),
-    storage_service=R2StorageService(),
-    highlight_repository=FirebaseHighlightRepository(),
-    clip_url_repository=FirebaseClipUrlRepository(),
+from app.clipping.use_cases.clip_video import NoHighlightsError
+from app.clipping.domain.video_understanding import (
+    DownloadResult,
+    Highlight,
+    HighlightsResponse,
 )
+from app.clipping.dependencies import get_worker_use_case
 
+# Set when SOURCE_CACHE_DIR is a volume shared by every worker; clip tasks can
+# then run anywhere instead of on the worker that downloaded the source.
+SHARED_SOURCE_VOLUME = os.getenv("SHARED_SOURCE_VOLUME", "false").lower() == "true"
+# Retry policy for each workflow stage
+STAGE_RETRY_OPTIONS: dict[str, Any] = {
+    "autoretry_for": (Exception,),
+    "retry_backoff": True,
+    "retry_backoff_max": 300,
+    "retry_jitter": True,
+    "max_retries": int(os.getenv("CELERY_STAGE_MAX_RETRIES", "3")),
+}
 
-@celery_app.task
-def process_clip_video_task(video_url: str, prompt: str | None = None):
-    result = use_case.execute(video_url, prompt)
+logger = logging.getLogger(__name__)
+
+# Node name of the worker running in this process. request.hostname only holds
+# it under the prefork pool, so record it when the worker starts.
+worker_nodename: Optional[str] = None
+
+
+@celery_app.task(bind=True)
+def process_clip_video_task(self, video_url: str, prompt: str | None = None):
+    """
+    Entry point for a clipping job. Replaces itself with the workflow
+
+        (analyze | download) -> plan_clips -> fan_out_clips
+            -> chord(clip_highlight...) -> persist
+
+    so the job's task ID resolves to the persisted ClipResult. The download
+    leases the cached source under the job's key prefix, so it isn't evicted
+    before persist releases it. Section downloads are files in the job's
+    workspace, so that mode keeps running in one task.
+    """
+    use_case = get_worker_use_case()
+    if use_case.section_download:
+        try:
+            result = use_case.execute(
+                video_url,
+                prompt,
+                job_id=self.request.id,
+                last_attempt=self.request.retries >= STAGE_RETRY_OPTIONS["max_retries"],
+            )
+        except NoHighlightsError:
+            raise
+        except Exception as e:
+            # Retries keep the task ID, so execute resumes from its checkpoint
+            raise self.retry(
+                exc=e,
+                countdown=min(2**self.request.retries * 10, 300),
+                max_retries=STAGE_RETRY_OPTIONS["max_retries"],
+            )
+        return result.model_dump()
+    key_prefix = use_case.key_prefix(video_url, self.request.id)
+    workflow = group(
+        analyze_highlights_task.s(video_url, prompt),
+        download_source_task.s(video_url, key_prefix),
+    ) | plan_clips_task.s(video_url, key_prefix)
+    return self.replace(workflow)
+
+
+@celery_app.task(dont_autoretry_for=(NoHighlightsError,), **STAGE_RETRY_OPTIONS)
+def analyze_highlights_task(video_url: str, prompt: str | None = None) -> dict[str, Any]:
+    return get_worker_use_case().analyze(video_url, prompt).model_dump()
+
+
+@celery_app.task(bind=True, **STAGE_RETRY_OPTIONS)
+def download_source_task(self, video_url: str, lease: str) -> dict[str, Any]:
+    use_case = get_worker_use_case()
+    # Admitted like a job, so a full disk delays the download instead of failing it
+    with use_case.workspace(self.request.id):
+        source = use_case.download(video_url, lease=lease)
+    # Clip tasks are routed back to the worker that holds the file
+    return {"source": source.model_dump(), "hostname": worker_nodename or self.request.hostname}
+
+
+@celery_app.task(bind=True)
+def plan_clips_task(self, stage_results: list[dict[str, Any]], video_url: str, key_prefix: str):
+    """
+    Merge overlapping highlights, then hand them to fan_out_clips on the worker
+    that holds the source.
+    """
+    highlights_data, download = stage_results
+    source = DownloadResult.model_validate(download["source"])
+    highlights = get_worker_use_case().normalize(
+        HighlightsResponse.model_validate(highlights_data), source
+    )
+    hostname = download["hostname"]
+    return self.replace(
+        fan_out_clips_task.si(
+            source.path, highlights.model_dump(), video_url, key_prefix, hostname
+        ).set(**clip_routing(hostname))
+    )
+
+
+@celery_app.task(bind=True, **STAGE_RETRY_OPTIONS)
+def fan_out_clips_task(
+    self,
+    source_path: str,
+    highlights_data: dict[str, Any],
+    video_url: str,
+    key_prefix: str,
+    hostname: Optional[str],
+):
+    """
+    Refine every highlight's edges against the source in one pass, then start
+    one clip task per highlight and a persist task once they all finish. Each
+    task cuts its clip alone; single-pass runs only group clips within a task.
+    """
+    highlights = get_worker_use_case().refine_boundaries(
+        source_path, HighlightsResponse.model_validate(highlights_data)
+    )
+    routing = clip_routing(hostname)
+    logger.info(
+        "Fanning out %d clip tasks for %s to %s",
+        len(highlights.highlights),
+        video_url,
+        routing.get("routing_key", "the clipping queue"),
+    )
+    clip_tasks = [
+        clip_highlight_task.s(source_path, h.model_dump(), key_prefix).set(**routing)
+        for h in highlights.highlights
+    ]
+    persist = persist_clips_task.s(
+        video_url, highlights.model_dump(), source_path, key_prefix
+    ).on_error(release_source_task.si(source_path, key_prefix))
+    return self.replace(chord(clip_tasks, persist))
+
+
+@celery_app.task(**STAGE_RETRY_OPTIONS)
+def clip_highlight_task(
+    source_path: str, highlight_data: dict[str, Any], key_prefix: str
+) -> Optional[list[Any]]:
+    """
+    Cut and upload one highlight in a workspace of its own.
+    Returns [highlight ID, clip URL].
+    """
+    use_case = get_worker_use_case()
+    highlight = Highlight.model_validate(highlight_data)
+    with use_case.workspace(f"{key_prefix}/{highlight.id}") as work_dir:
+        url = use_case.clip_highlight(source_path, highlight, key_prefix, work_dir=work_dir)
+    return [highlight.id, url] if url is not None else None
+
+
+@celery_app.task(**STAGE_RETRY_OPTIONS)
+def persist_clips_task(
+    clip_results: list[Optional[list[Any]]],
+    video_url: str,
+    highlights_data: dict[str, Any],
+    source_path: str,
+    key_prefix: str,
+) -> dict[str, Any]:
+    use_case = get_worker_use_case()
+    url_by_highlight = {result[0]: result[1] for result in clip_results if result}
+    highlights = HighlightsResponse.model_validate(highlights_data)
+    result = use_case.persist(video_url, highlights, url_by_highlight)
+    use_case.release_source(source_path, key_prefix)
     return result.model_dump()
+
+
+@celery_app.task
+def release_source_task(source_path: str, key_prefix: str) -> None:
+    """
+    Release the job's lease on its source when a clip task or persist failed.
+    """
+    get_worker_use_case().release_source(source_path, key_prefix)
+
+
+def clip_routing(hostname: Optional[str]) -> dict[str, str]:
+    """
+    Routing options that send a task to the worker-direct queue of `hostname`
+    (requires `worker_direct` in celery_worker), or none to use the clipping queue.
+    """
+    if SHARED_SOURCE_VOLUME or not hostname:
+        return {}
+    queue = worker_direct(hostname)
+    return {"exchange": queue.exchange.name, "routing_key": queue.routing_key}
+
+
+@worker_init.connect
+def remember_worker_nodename(sender: Any, **_: Any) -> None:
+    global worker_nodename  # pylint: disable=global-statement
+    worker_nodename = sender.hostname
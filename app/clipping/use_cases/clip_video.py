@@ -1,33 +1,86 @@
-import re
-from typing import Optional
+import os
+import time
+import uuid
 import logging
-from app.clipping.infrastructure.youtube_downloader import download_youtube_video
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional
 from app.clipping.domain.video_understanding import (
+    BoundaryRefiner,
+    CheckpointStore,
+    JobCheckpoint,
+    JobWorkspaceProvider,
     VideoUnderstandingService,
     VideoClipperService,
     StorageService,
     HighlightRepository,
+    JobResultRepository,
     ClipResult,
+    ClipStream,
     ClipUrlRepository,
+    DownloadResult,
+    Highlight,
+    HighlightsResponse,
+    is_youtube_url,
+    source_video_id,
 )
+from app.clipping.domain.time_ranges import (
+    TimeRange,
+    normalize_highlights,
+    overlap_ratio,
+    plan_sections,
+    rebase_highlights,
+)
+
+logger = logging.getLogger(__name__)
+
 
+class NoHighlightsError(RuntimeError):
+    """Analysis found nothing to clip; retrying won't change that."""
 
-def get_youtube_video_id(url: str) -> str:
+
+@contextmanager
+def log_stage_timing(stage: str, video_url: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(
+            "Stage '%s' for %s took %.2fs", stage, video_url, time.perf_counter() - started
+        )
+
+
+class CheckpointRecorder:
     """
-    Extracts the YouTube video ID from a given URL.
-    Supports both youtube.com and youtu.be formats.
+    Thread-safe wrapper around a job's checkpoint that saves it after every update.
+    Without a store, updates are only kept in memory.
     """
 
-    # Patterns for youtube.com and youtu.be
-    patterns = [
-        r"(?:v=|\/embed\/|\/v\/|\/shorts\/|youtu\.be\/)([\w-]{11})",
-        r"youtube\.com\/watch\?.*v=([\w-]{11})",
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    raise ValueError(f"Could not extract YouTube video ID from URL: {url}")
+    def __init__(self, checkpoint: JobCheckpoint, store: Optional[CheckpointStore]):
+        self.checkpoint = checkpoint
+        self.store = store
+        self._lock = threading.Lock()
+
+    def update(self, **fields: Any) -> None:
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self.checkpoint, name, value)
+            self._save()
+
+    def record_clip(self, highlight_id: str, path: str) -> None:
+        with self._lock:
+            self.checkpoint.clips[highlight_id] = path
+            self._save()
+
+    def record_url(self, highlight_id: str, url: str) -> None:
+        with self._lock:
+            self.checkpoint.urls[highlight_id] = url
+            self._save()
+
+    def _save(self) -> None:
+        if self.store is not None:
+            self.store.save(self.checkpoint)
 
 
 class ClipVideoFromHighlightsUseCase:
@@ -38,66 +91,576 @@ class ClipVideoFromHighlightsUseCase:
         storage_service: StorageService,
         highlight_repository: HighlightRepository,
         clip_url_repository: ClipUrlRepository,
+        download_video: Optional[Callable[..., DownloadResult]] = None,
+        download_sections: Optional[Callable[..., list]] = None,
+        section_download: bool = False,
+        section_padding_seconds: float = 2.0,
+        section_merge_gap_seconds: float = 30.0,
+        upload_concurrency: int = 4,
+        stream_uploads: bool = False,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        job_result_repository: Optional[JobResultRepository] = None,
+        stream_highlights: bool = False,
+        boundary_refiner: Optional[BoundaryRefiner] = None,
+        min_clip_seconds: float = 1.0,
+        duplicate_overlap: float = 0.8,
+        workspace_provider: Optional[JobWorkspaceProvider] = None,
+        checksum_file: Optional[Callable[[str], str]] = None,
+        release_source: Optional[Callable[[str, str], None]] = None,
     ):
         self.video_understanding_service = video_understanding_service
         self.video_clipper_service = video_clipper_service
         self.storage_service = storage_service
         self.highlight_repository = highlight_repository
         self.clip_url_repository = clip_url_repository
+        if download_video is None or download_sections is None or release_source is None:
+            # yt-dlp is slow to import; only load it for use cases that download
+            from app.clipping.infrastructure import (  # pylint: disable=import-outside-toplevel
+                youtube_downloader,
+            )
+
+            download_video = download_video or youtube_downloader.download_youtube_video
+            download_sections = download_sections or youtube_downloader.download_youtube_sections
+            release_source = release_source or youtube_downloader.release_youtube_video
+        self.download_video = download_video
+        self.download_sections = download_sections
+        # Releases a lease taken by download(lease=...) on a cached source
+        self.release_source_lease = release_source
+        if checksum_file is None:
+            from app.clipping.infrastructure import (  # pylint: disable=import-outside-toplevel
+                file_hashing,
+            )
+
+            checksum_file = file_hashing.file_checksum
+        # Fingerprints checkpointed sources, so a retry notices a changed file
+        self.checksum_file = checksum_file
+        # Fetch only the padded highlight windows after analysis instead of the
+        # whole video; pays off for long-form sources.
+        self.section_download = section_download
+        self.section_padding_seconds = section_padding_seconds
+        self.section_merge_gap_seconds = section_merge_gap_seconds
+        self.upload_concurrency = upload_concurrency
+        # Pipe clips from ffmpeg straight into storage instead of via /tmp,
+        # when the clipper supports it.
+        self.stream_uploads = stream_uploads
+        # Per-job progress, so a retry with the same job ID skips finished stages
+        self.checkpoint_store = checkpoint_store
+        # Saves highlights and clip URLs in one write instead of one per repository
+        self.job_result_repository = job_result_repository
+        # Start cutting each highlight as soon as analysis streams it, instead
+        # of after the whole response. Doesn't apply to section downloads.
+        self.stream_highlights = stream_highlights
+        # Moves highlight edges to clean cut points in the source before clipping
+        self.boundary_refiner = boundary_refiner
+        # Highlights are clamped to the source and folded into one another when
+        # nested or overlapping more than this (intersection over union)
+        self.min_clip_seconds = min_clip_seconds
+        self.duplicate_overlap = duplicate_overlap
+        # Per-job scratch directories for section downloads and clips; without
+        # one, files go to the system temp directory
+        self.workspace_provider = workspace_provider
 
-    def execute(self, video_url: str, prompt: Optional[str] = None) -> ClipResult:
-        logger = logging.getLogger(__name__)
+    def execute(
+        self,
+        video_url: str,
+        prompt: Optional[str] = None,
+        job_id: Optional[str] = None,
+        last_attempt: bool = False,
+    ) -> ClipResult:
         logger.info("Starting video clipping process for URL: %s", video_url)
+        key_prefix = self.key_prefix(video_url, job_id)
+        recorder = self._load_checkpoint(video_url, prompt, job_id)
+        checkpoint = recorder.checkpoint
+        if checkpoint.result is not None:
+            logger.info("Job %s already completed, returning its saved result.", job_id)
+            return checkpoint.result
 
-        # 1. Analyze video for highlights
-        logger.info("Analyzing video for highlights...")
-        highlights = self.video_understanding_service.analyze_video_highlights(
-            video_url, prompt
+        def will_retry(error: BaseException) -> bool:
+            # Only a checkpointed retry finds the clips of a failed attempt again
+            return (
+                recorder.store is not None
+                and not last_attempt
+                and not isinstance(error, NoHighlightsError)
+            )
+
+        with self.workspace(key_prefix, keep_on_failure=will_retry) as work_dir:
+            return self._run(video_url, prompt, key_prefix, recorder, work_dir)
+
+    def _run(
+        self,
+        video_url: str,
+        prompt: Optional[str],
+        key_prefix: str,
+        recorder: CheckpointRecorder,
+        work_dir: Optional[str],
+    ) -> ClipResult:
+        checkpoint = recorder.checkpoint
+        # 1. Analyze the video and download the source concurrently; neither
+        # depends on the other, so the job waits for the slower of the two.
+        cancel_download = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="source-download")
+        download_future: Optional[Future[DownloadResult]] = None
+        use_sections = self.section_download and is_youtube_url(video_url)
+        source = None if use_sections else self._checkpointed_source(checkpoint)
+        if use_sections:
+            logger.info("Detected YouTube URL, will download highlight sections only.")
+        elif source is not None:
+            logger.info("Reusing source downloaded by an earlier attempt: %s", source.path)
+        elif is_youtube_url(video_url):
+            logger.info("Detected YouTube URL, downloading video in background...")
+            download_future = executor.submit(self.download, video_url, cancel_download)
+        else:
+            logger.info("Non-YouTube video, using provided path.")
+
+        def wait_for_source() -> DownloadResult:
+            nonlocal source
+            if download_future is not None and source is None:
+                with log_stage_timing("download wait", video_url):
+                    source = download_future.result()
+                logger.info("Downloaded YouTube video: %s", source)
+                if recorder.store is not None:
+                    recorder.update(source=source, source_checksum=self.checksum_file(source.path))
+            return source if source is not None else DownloadResult(path=video_url)
+
+        url_by_highlight = dict(checkpoint.urls)
+        try:
+            highlights = checkpoint.highlights
+            if highlights is None and self.stream_highlights and not use_sections:
+                highlights, streamed_urls = self._analyze_and_clip(
+                    video_url, prompt, wait_for_source, key_prefix, recorder, work_dir
+                )
+                url_by_highlight.update(streamed_urls)
+            elif highlights is None:
+                highlights = self.analyze(video_url, prompt)
+                recorder.update(highlights=highlights)
+            else:
+                logger.info("Reusing highlights from an earlier attempt.")
+
+            # 2. Wait for the YouTube download if needed
+            local_source = wait_for_source()
+        except BaseException:
+            # Abort the in-flight download instead of letting it run to completion
+            cancel_download.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown(wait=False)
+
+        if not checkpoint.boundaries_refined:
+            highlights = self.normalize(highlights, None if use_sections else local_source)
+            # Section files start at their own offsets, so only whole sources are refined
+            if not use_sections:
+                highlights = self.refine_boundaries(local_source.path, highlights)
+            recorder.update(highlights=highlights, boundaries_refined=True)
+
+        # 3. Clip the video and upload each clip as soon as it is written,
+        # skipping highlights an earlier attempt already uploaded
+        pending = HighlightsResponse(
+            highlights=[h for h in highlights.highlights if h.id not in url_by_highlight]
         )
+        logger.info(
+            "Clipping %d highlights and saving clips to storage (%d already uploaded)...",
+            len(pending.highlights),
+            len(url_by_highlight),
+        )
+        if use_sections and pending.highlights:
+            url_by_highlight.update(
+                self._clip_sections(video_url, pending, key_prefix, recorder, work_dir)
+            )
+        elif pending.highlights:
+            with log_stage_timing("clip and upload", video_url):
+                url_by_highlight.update(
+                    self._clip_and_upload(
+                        local_source.path, pending, key_prefix, recorder, work_dir
+                    )
+                )
+
+        # 4. Save highlights and their clip URLs
+        result = self.persist(video_url, highlights, url_by_highlight)
+        recorder.update(result=result)
+        return result
+
+    # The stages below are also run one by one as separate Celery tasks (see tasks.py).
+
+    def key_prefix(self, video_url: str, job_id: Optional[str] = None) -> str:
+        """
+        Storage key prefix for a job's clips, so concurrent jobs never collide.
+        """
+        return f"{source_video_id(video_url)}/{job_id or uuid.uuid4().hex}"
 
+    @contextmanager
+    def workspace(
+        self,
+        job_id: str,
+        keep_on_failure: Optional[Callable[[BaseException], bool]] = None,
+    ) -> Iterator[Optional[str]]:
+        """
+        Wait for room to run a job, then yield its scratch directory, deleted
+        once the job ends unless `keep_on_failure` keeps it for a retry.
+        Yields None without a workspace provider.
+        """
+        if self.workspace_provider is None:
+            yield None
+            return
+        with self.workspace_provider.workspace(job_id, keep_on_failure) as work_dir:
+            yield work_dir
+
+    def analyze(self, video_url: str, prompt: Optional[str] = None) -> HighlightsResponse:
+        logger.info("Analyzing video for highlights...")
+        with log_stage_timing("analysis", video_url):
+            highlights = self.video_understanding_service.analyze_video_highlights(
+                video_url, prompt
+            )
         if len(highlights.highlights) == 0:
-            raise RuntimeError("No highlights found in the video.")
-        logger.info(
-            "Highlights found: %s", getattr(highlights, "highlights", highlights)
+            raise NoHighlightsError("No highlights found in the video.")
+        logger.info("Highlights found: %s", highlights.highlights)
+        return highlights
+
+    def download(
+        self,
+        video_url: str,
+        cancel_event: Optional[threading.Event] = None,
+        lease: Optional[str] = None,
+    ) -> DownloadResult:
+        """
+        Fetch the full source video. Non-YouTube URLs are used in place. With
+        `lease`, the downloaded file isn't evicted until release_source.
+        """
+        if not is_youtube_url(video_url):
+            return DownloadResult(path=video_url)
+        with log_stage_timing("download", video_url):
+            if lease is None:
+                return self.download_video(video_url, cancel_event=cancel_event)
+            return self.download_video(video_url, cancel_event=cancel_event, lease=lease)
+
+    def release_source(self, source_path: str, lease: str) -> None:
+        """
+        Release the lease taken on a source by download(lease=...).
+        """
+        self.release_source_lease(source_path, lease)
+
+    def normalize(
+        self, highlights: HighlightsResponse, source: Optional[DownloadResult] = None
+    ) -> HighlightsResponse:
+        """
+        Clamp highlights to the source's duration, drop invalid ones and fold
+        duplicate and nested ones together, so each clip is cut and uploaded once.
+        """
+        normalized = normalize_highlights(
+            highlights,
+            duration=source.duration if source else None,
+            min_length=self.min_clip_seconds,
+            duplicate_overlap=self.duplicate_overlap,
         )
+        if len(normalized.highlights) != len(highlights.highlights):
+            logger.info(
+                "Normalized %d highlights into %d clips",
+                len(highlights.highlights),
+                len(normalized.highlights),
+            )
+        if not normalized.highlights:
+            raise NoHighlightsError("No valid highlights found in the video.")
+        return normalized
 
-        # 2. Download YouTube video if needed
-        def is_youtube(url: str) -> bool:
-            return "youtube.com" in url or "youtu.be" in url
+    def refine_boundaries(
+        self, source_path: str, highlights: HighlightsResponse
+    ) -> HighlightsResponse:
+        """
+        The highlights with their edges moved to clean cut points in the source,
+        or unchanged without a boundary refiner.
+        """
+        if self.boundary_refiner is None:
+            return highlights
+        with log_stage_timing("boundary refinement", source_path):
+            return self.boundary_refiner.refine(source_path, highlights)
 
-        local_video_path = video_url
-        if is_youtube(video_url):
-            logger.info("Detected YouTube URL, downloading video...")
-            local_video_path = download_youtube_video(video_url)
-            logger.info("Downloaded YouTube video to: %s", local_video_path)
+    def clip_highlight(
+        self,
+        source_path: str,
+        highlight: Highlight,
+        key_prefix: Optional[str] = None,
+        recorder: Optional[CheckpointRecorder] = None,
+        work_dir: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Cut and upload a single highlight; returns its URL, or None if it has no range.
+        """
+        with log_stage_timing(f"clip and upload {highlight.id}", source_path):
+            urls = self._clip_and_upload(
+                source_path,
+                HighlightsResponse(highlights=[highlight]),
+                key_prefix,
+                recorder,
+                work_dir,
+            )
+        return urls.get(highlight.id)
+
+    def persist(
+        self,
+        video_url: str,
+        highlights: HighlightsResponse,
+        url_by_highlight: dict[str, str],
+    ) -> ClipResult:
+        video_id = source_video_id(video_url)
+        # Highlight order, whatever order the clips finished in
+        highlight_to_url = {
+            h.id: url_by_highlight[h.id]
+            for h in highlights.highlights
+            if h.id in url_by_highlight
+        }
+        clip_urls = list(highlight_to_url.values())
+        # Folded highlights share the clip of the highlight they were folded into
+        highlight_to_url.update(
+            {
+                folded_id: highlight_to_url[kept_id]
+                for folded_id, kept_id in highlights.folded.items()
+                if kept_id in highlight_to_url
+            }
+        )
+        logger.info("Clip URLs: %s", clip_urls)
+
+        if self.job_result_repository is not None:
+            logger.info("Saving highlights and highlight-to-URL mapping: %s", highlight_to_url)
+            with log_stage_timing("persist job result", video_url):
+                self.job_result_repository.save_job_result(
+                    video_id, highlights, highlight_to_url
+                )
         else:
-            logger.info("Non-YouTube video, using provided path.")
+            logger.info("Saving highlights metadata...")
+            with log_stage_timing("persist highlights", video_url):
+                self.highlight_repository.save_highlights(video_id, highlights)
 
-        # 3. Clip the video based on highlights
-        logger.info("Clipping video based on highlights...")
-        clip_paths = self.video_clipper_service.clip_video(local_video_path, highlights)
-        logger.info("Generated clip paths: %s", clip_paths)
+            logger.info("Saving highlight-to-URL mapping: %s", highlight_to_url)
+            with log_stage_timing("persist clip urls", video_url):
+                self.clip_url_repository.save_clip_urls(video_id, highlight_to_url)
 
-        # 4. Save each clip to storage
-        logger.info("Saving clips to storage...")
-        clip_urls = [self.storage_service.save_video(path) for path in clip_paths]
-        logger.info("Clip URLs: %s", clip_urls)
+        logger.info("Video clipping process completed.")
+        return ClipResult(clips=clip_urls, highlights=highlights.model_dump(), video_id=video_id)
+
+    def _analyze_and_clip(
+        self,
+        video_url: str,
+        prompt: Optional[str],
+        wait_for_source: Callable[[], DownloadResult],
+        key_prefix: str,
+        recorder: CheckpointRecorder,
+        work_dir: Optional[str] = None,
+    ) -> tuple[HighlightsResponse, dict[str, str]]:
+        """
+        Stream highlights from analysis and cut and upload each one as it arrives,
+        while later ones are still being generated. Highlights are checkpointed
+        only once the stream is complete, and again once their edges are refined.
+
+        Unlike normalize, streaming only deduplicates: a clip already being cut
+        can't be widened. A highlight nested in or duplicating an earlier one is
+        folded into it, sharing its clip even if it is better scored or slightly
+        wider, and invalid ones are skipped. A later highlight containing an
+        earlier one is cut as a clip of its own.
+        """
+        found: list[Highlight] = []
+        accepted: list[tuple[str, TimeRange]] = []
+        folded: dict[str, str] = {}
+        started = time.perf_counter()
 
-        video_id = get_youtube_video_id(video_url)
+        def refine_and_clip(
+            source_path: str, highlight: Highlight
+        ) -> tuple[Highlight, Optional[str]]:
+            highlight = self.refine_boundaries(
+                source_path, HighlightsResponse(highlights=[highlight])
+            ).highlights[0]
+            return highlight, self.clip_highlight(
+                source_path, highlight, key_prefix, recorder, work_dir
+            )
 
-        # 5. Save highlights info (metadata)
-        logger.info("Saving highlights metadata...")
-        self.highlight_repository.save_highlights(video_id, highlights)
+        with ThreadPoolExecutor(
+            max_workers=self.upload_concurrency, thread_name_prefix="highlight-clip"
+        ) as clips:
+            futures: list[Future[tuple[Highlight, Optional[str]]]] = []
+            with log_stage_timing("streamed analysis", video_url):
+                for highlight in self.video_understanding_service.iter_highlights(
+                    video_url, prompt
+                ):
+                    if not found:
+                        logger.info(
+                            "First highlight after %.2fs", time.perf_counter() - started
+                        )
+                    logger.info("Highlight found: %s", highlight)
+                    source = wait_for_source()
+                    normalized = normalize_highlights(
+                        HighlightsResponse(highlights=[highlight]),
+                        duration=source.duration,
+                        min_length=self.min_clip_seconds,
+                    ).highlights
+                    if not normalized:
+                        logger.info("Skipping invalid highlight %s", highlight.id)
+                        continue
+                    time_range = normalized[0].time_range
+                    duplicate_of = next(
+                        (
+                            other_id
+                            for other_id, other in accepted
+                            if time_range is not None
+                            and (
+                                other.contains(time_range)
+                                or overlap_ratio(time_range, other) > self.duplicate_overlap
+                            )
+                        ),
+                        None,
+                    )
+                    if duplicate_of is not None:
+                        logger.info(
+                            "Folding highlight %s into %s, already being cut",
+                            highlight.id,
+                            duplicate_of,
+                        )
+                        folded[highlight.id] = duplicate_of
+                        continue
+                    if time_range is not None:
+                        accepted.append((highlight.id, time_range))
+                    found.append(normalized[0])
+                    futures.append(clips.submit(refine_and_clip, source.path, normalized[0]))
+            if not found:
+                raise NoHighlightsError("No highlights found in the video.")
+            recorder.update(highlights=HighlightsResponse(highlights=found, folded=folded))
+            results = [f.result() for f in futures]
+        highlights = HighlightsResponse(
+            highlights=[highlight for highlight, _ in results], folded=folded
+        )
+        recorder.update(highlights=highlights, boundaries_refined=True)
+        return highlights, {highlight.id: url for highlight, url in results if url}
 
-        # 6. Associate highlight ids with clip urls and save
-        highlight_to_url: dict[str, str] = {}
-        if hasattr(highlights, "highlights") and len(highlights.highlights) == len(
-            clip_urls
+    def _load_checkpoint(
+        self, video_url: str, prompt: Optional[str], job_id: Optional[str]
+    ) -> CheckpointRecorder:
+        # Without a job ID nobody can retry this job, so there is nothing to save
+        store = self.checkpoint_store if job_id else None
+        checkpoint = store.load(job_id) if store and job_id else None
+        if checkpoint is not None and (
+            checkpoint.video_url != video_url or checkpoint.prompt != prompt
         ):
-            for highlight, url in zip(highlights.highlights, clip_urls):
-                highlight_to_url[highlight.id] = url
-        logger.info("Saving highlight-to-URL mapping: %s", highlight_to_url)
-        self.clip_url_repository.save_clip_urls(video_id, highlight_to_url)
+            logger.warning("Ignoring checkpoint of job %s saved for another request.", job_id)
+            checkpoint = None
+        if checkpoint is None:
+            checkpoint = JobCheckpoint(job_id=job_id or "", video_url=video_url, prompt=prompt)
+        return CheckpointRecorder(checkpoint, store)
 
-        logger.info("Video clipping process completed.")
-        return ClipResult(clips=clip_urls, highlights=highlights.model_dump(), video_id=video_id)
+    def _checkpointed_source(self, checkpoint: JobCheckpoint) -> Optional[DownloadResult]:
+        """
+        The source downloaded by an earlier attempt, if it is still on disk unchanged.
+        """
+        source = checkpoint.source
+        if source is None or not os.path.exists(source.path):
+            return None
+        if self.checksum_file(source.path) != checkpoint.source_checksum:
+            logger.warning("Checkpointed source %s changed, downloading again.", source.path)
+            return None
+        return source
+
+    def _clip_and_upload(
+        self,
+        video_path: str,
+        highlights: HighlightsResponse,
+        key_prefix: Optional[str] = None,
+        recorder: Optional[CheckpointRecorder] = None,
+        work_dir: Optional[str] = None,
+    ) -> dict[str, str]:
+        """
+        Feed clips into a bounded upload pool as the clipper yields them, so cutting
+        and uploading overlap. Returns the storage URL for each highlight ID.
+        Clips an earlier attempt cut but didn't upload are uploaded without recutting.
+        """
+        if self.stream_uploads and self.video_clipper_service.streams_clips:
+            return self._stream_and_upload(video_path, highlights, key_prefix, recorder)
+
+        cut = recorder.checkpoint.clips if recorder else {}
+        ready = {
+            h.id: cut[h.id] for h in highlights.highlights if h.id in cut and os.path.exists(cut[h.id])
+        }
+        to_cut = HighlightsResponse(
+            highlights=[h for h in highlights.highlights if h.id not in ready]
+        )
+
+        def upload(highlight_id: str, path: str) -> str:
+            url = self.storage_service.save_video(path, key_prefix)
+            if recorder:
+                recorder.record_url(highlight_id, url)
+            return url
+
+        with ThreadPoolExecutor(
+            max_workers=self.upload_concurrency, thread_name_prefix="clip-upload"
+        ) as uploads:
+            futures: dict[str, Future[str]] = {
+                highlight_id: uploads.submit(upload, highlight_id, path)
+                for highlight_id, path in ready.items()
+            }
+            if to_cut.highlights:
+                for clip in self.video_clipper_service.iter_clips(
+                    video_path, to_cut, out_dir=work_dir
+                ):
+                    logger.info("Clip ready for highlight %s: %s", clip.highlight_id, clip.path)
+                    if recorder:
+                        recorder.record_clip(clip.highlight_id, clip.path)
+                    futures[clip.highlight_id] = uploads.submit(
+                        upload, clip.highlight_id, clip.path
+                    )
+            return {highlight_id: f.result() for highlight_id, f in futures.items()}
+
+    def _stream_and_upload(
+        self,
+        video_path: str,
+        highlights: HighlightsResponse,
+        key_prefix: Optional[str],
+        recorder: Optional[CheckpointRecorder] = None,
+    ) -> dict[str, str]:
+        """
+        Each upload worker renders one clip into a pipe and uploads it as it is
+        produced, so no clip ever touches the disk.
+        """
+
+        def upload(clip: ClipStream) -> str:
+            with clip.open_stream() as stream:
+                url = self.storage_service.save_stream(stream, clip.filename, key_prefix)
+            if recorder:
+                recorder.record_url(clip.highlight_id, url)
+            return url
+
+        with ThreadPoolExecutor(
+            max_workers=self.upload_concurrency, thread_name_prefix="clip-stream"
+        ) as uploads:
+            futures = {
+                clip.highlight_id: uploads.submit(upload, clip)
+                for clip in self.video_clipper_service.iter_clip_streams(video_path, highlights)
+            }
+            return {highlight_id: f.result() for highlight_id, f in futures.items()}
+
+    def _clip_sections(
+        self,
+        video_url: str,
+        highlights: HighlightsResponse,
+        key_prefix: Optional[str] = None,
+        recorder: Optional[CheckpointRecorder] = None,
+        work_dir: Optional[str] = None,
+    ) -> dict[str, str]:
+        sections = plan_sections(
+            highlights,
+            padding=self.section_padding_seconds,
+            merge_gap=self.section_merge_gap_seconds,
+        )
+        logger.info("Downloading %d highlight sections: %s", len(sections), sections)
+        with log_stage_timing("section download", video_url):
+            downloaded = self.download_sections(video_url, sections, download_dir=work_dir)
+
+        url_by_highlight: dict[str, str] = {}
+        try:
+            with log_stage_timing("clip and upload", video_url):
+                for section in downloaded:
+                    rebased = rebase_highlights(highlights, section.time_range)
+                    url_by_highlight.update(
+                        self._clip_and_upload(
+                            section.path, rebased, key_prefix, recorder, work_dir
+                        )
+                    )
+        finally:
+            for section in downloaded:
+                if os.path.exists(section.path):
+                    os.remove(section.path)
+        return url_by_highlight
@@ -2,13 +2,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.clipping.router import router as clipping_router
 from app.clipping.async_router import router as async_clipping_router
-from firebase_init import firebase_app
 
 
 def create_app() -> FastAPI:
-    # Ensure Firebase is initialized
-    _ = firebase_app
-
+    # Firebase is initialized by the first request that uses Firestore
     python_app = FastAPI(title="ezclip API")
 
     # Allow CORS from any origin
@@ -0,0 +1,89 @@
+"""
+Measure cold-start import time and memory of the API and worker entry points.
+
+    python -m benchmarks.startup --runs 5
+
+Each entry point is imported in a fresh interpreter. Reports the median import
+time, the peak RSS of the process and which heavy SDKs the import loaded; with
+--build the providers in app.clipping.dependencies are also called, which needs
+the same credentials as a real deployment.
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+ENTRY_POINTS = {
+    "api": ["app.main.app"],
+    "worker": ["celery_worker", "app.clipping.tasks"],
+}
+PROVIDERS = {
+    "api": "get_api_use_case",
+    "worker": "get_worker_use_case",
+}
+HEAVY_MODULES = ["boto3", "google.genai", "firebase_admin", "yt_dlp", "moviepy", "numpy"]
+
+PROBE = """
+import sys, json, time, resource, importlib
+modules, provider, heavy = json.loads(sys.argv[1])
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+for name in modules:
+    importlib.import_module(name)
+import_seconds = time.perf_counter() - started
+build_seconds = None
+if provider:
+    started = time.perf_counter()
+    getattr(importlib.import_module("app.clipping.dependencies"), provider)()
+    build_seconds = time.perf_counter() - started
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "build_seconds": build_seconds,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "baseline_rss_mb": baseline_kb / 1024,
+    "loaded": [m for m in heavy if m in sys.modules],
+}))
+"""
+
+
+def probe(modules: List[str], provider: str) -> Dict[str, Any]:
+    process = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps([modules, provider, HEAVY_MODULES])],
+        check=False,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        error = process.stderr.strip().splitlines() or ["no output"]
+        raise RuntimeError(error[-1])
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--build", action="store_true", help="also build the use case")
+    args = parser.parse_args()
+
+    for name, modules in ENTRY_POINTS.items():
+        provider = PROVIDERS[name] if args.build else ""
+        try:
+            results = [probe(modules, provider) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:<7} failed: {e}")
+            continue
+        line = (
+            f"{name:<7} import {statistics.median(r['import_seconds'] for r in results) * 1000:7.1f} ms"
+            f"  rss {statistics.median(r['rss_mb'] for r in results):6.1f} MB"
+            f" (interpreter {results[0]['baseline_rss_mb']:.1f} MB)"
+        )
+        if args.build:
+            line += f"  build {statistics.median(r['build_seconds'] for r in results) * 1000:7.1f} ms"
+        print(line)
+        print(f"        heavy modules loaded: {', '.join(results[-1]['loaded']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
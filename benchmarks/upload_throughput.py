@@ -0,0 +1,79 @@
+"""
+Measure R2StorageService upload throughput against an S3-compatible endpoint.
+
+Point it at a local MinIO or `moto_server` instance, e.g.
+
+    moto_server -p 9000 &
+    R2_ACCESS_KEY_ID=test R2_SECRET_ACCESS_KEY=test \\
+        python -m benchmarks.upload_throughput --endpoint-url http://localhost:9000
+
+Reports MB/s for 1, 4 and 16 clips, comparing sequential `save_video` calls
+with the use case's upload pool of `--concurrency` threads.
+"""
+import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+from app.clipping.infrastructure.r2_storage import R2StorageService
+
+MB = 1024 * 1024
+
+
+def make_clips(directory: str, count: int, size_mb: int) -> List[str]:
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"bench_clip{i}.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size_mb * MB))
+        paths.append(path)
+    return paths
+
+
+def measure(upload: Callable[[], object], total_bytes: int) -> float:
+    started = time.perf_counter()
+    upload()
+    return total_bytes / MB / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--endpoint-url", default="http://localhost:9000")
+    parser.add_argument("--bucket", default="ezclip-bench")
+    parser.add_argument("--clip-mb", type=int, default=24)
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    # Every batch re-uploads the same bytes, which dedup would skip
+    storage = R2StorageService(
+        bucket=args.bucket,
+        endpoint_url=args.endpoint_url,
+        upload_concurrency=args.concurrency,
+        content_addressed=False,
+    )
+    existing = [b["Name"] for b in storage.client.list_buckets().get("Buckets", [])]
+    if args.bucket not in existing:
+        storage.client.create_bucket(Bucket=args.bucket)
+
+    def upload_pooled(paths: List[str]) -> None:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as uploads:
+            list(uploads.map(lambda p: storage.save_video(p, key_prefix="bench/pool"), paths))
+
+    print(f"{'clips':>5} {'sequential MB/s':>16} {'pooled MB/s':>12}")
+    with tempfile.TemporaryDirectory(prefix="ezclip-bench-") as directory:
+        for count in args.counts:
+            paths = make_clips(directory, count, args.clip_mb)
+            total = count * args.clip_mb * MB
+            sequential = measure(
+                lambda: [storage.save_video(p, key_prefix="bench/seq") for p in paths], total
+            )
+            pooled = measure(lambda: upload_pooled(paths), total)
+            print(f"{count:>5} {sequential:>16.1f} {pooled:>12.1f}")
+            for path in paths:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,5 +14,11 @@ celery_app: Celery = Celery(
 celery_app.conf.update(
     task_routes={
         "app.clipping.tasks.*": {"queue": "clipping"},
-    }
+    },
+    # Each worker also consumes its own queue, so clip tasks can be routed to the
+    # worker that downloaded the source video.
+    worker_direct=True,
+    # Clip tasks can take minutes; don't let one worker reserve a backlog of them
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
 )
@@ -0,0 +1,34 @@
+import typing
+from unittest.mock import MagicMock
+import pytest
+from app.clipping.use_cases.clip_video import ClipVideoFromHighlightsUseCase
+
+
+@pytest.fixture
+def mock_services_fixture():
+    video_understanding_service = MagicMock()
+    video_clipper_service = MagicMock()
+    storage_service = MagicMock()
+    highlight_repository = MagicMock()
+    clip_url_repository = MagicMock()
+    return (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    )
+
+
+@pytest.fixture(name="make_use_case")
+def make_use_case_fixture(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+) -> typing.Callable[..., ClipVideoFromHighlightsUseCase]:
+    """
+    Build a use case around the mock services, with any other options given.
+    """
+
+    def make_use_case(**kwargs) -> ClipVideoFromHighlightsUseCase:
+        return ClipVideoFromHighlightsUseCase(*mock_services_fixture, **kwargs)
+
+    return make_use_case
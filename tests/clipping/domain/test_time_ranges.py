@@ -0,0 +1,143 @@
+import pytest
+from app.clipping.domain.time_ranges import (
+    TimeRange,
+    format_timestamp,
+    normalize_highlights,
+    offset_highlights,
+    plan_analysis_windows,
+    select_top_highlights,
+    parse_timestamp,
+    plan_sections,
+    rebase_highlights,
+)
+from app.clipping.domain.video_understanding import Highlight
+from tests.clipping.helpers import make_highlights
+
+
+def test_plan_sections_pads_and_merges_nearby_highlights():
+    highlights = make_highlights(
+        ("00:00:10", "00:00:30"), ("00:00:40", "00:01:00"), ("01:00:00", "01:00:20")
+    )
+
+    sections = plan_sections(highlights, padding=2, merge_gap=15)
+
+    assert sections == [
+        TimeRange(start=8, end=62),
+        TimeRange(start=3598, end=3622),
+    ]
+
+
+def test_rebase_highlights_keeps_only_contained_highlights():
+    highlights = make_highlights(("00:00:10", "00:00:30"), ("01:00:00", "01:00:20.5"))
+
+    rebased = rebase_highlights(highlights, TimeRange(start=3598, end=3622))
+
+    assert [h.id for h in rebased.highlights] == ["h1"]
+    assert rebased.highlights[0].start_time == "00:00:02"
+    assert rebased.highlights[0].end_time == "00:00:22.500"
+
+
+def test_timestamps_round_trip():
+    assert parse_timestamp("01:02:03") == 3723
+    assert parse_timestamp("02:03") == 123
+    assert parse_timestamp(format_timestamp(3723.25)) == 3723.25
+
+
+def test_parse_timestamp_reads_hours_minutes_and_fractions():
+    # MoviePyVideoClipper used to read "01:02:03" as 62 minutes
+    assert parse_timestamp("01:02:03") == 3600 + 2 * 60 + 3
+    assert parse_timestamp("00:01:05.250") == 65.25
+    assert parse_timestamp("45") == 45
+
+
+def test_parse_timestamp_rejects_malformed_values():
+    for value in ["", "1:2:3:4", "aa:bb", "01::02"]:
+        with pytest.raises(ValueError):
+            parse_timestamp(value)
+
+
+def test_analysis_windows_overlap_and_cover_the_whole_video():
+    windows = plan_analysis_windows(10800, window=3600, overlap=60)
+
+    assert windows[0] == TimeRange(start=0, end=3600)
+    assert all(b.start == a.end - 60 for a, b in zip(windows, windows[1:]))
+    assert windows[-1].end == 10800
+    assert plan_analysis_windows(600, window=3600, overlap=60) == [TimeRange(start=0, end=600)]
+    # A remainder no longer than the overlap stretches the last window instead
+    assert plan_analysis_windows(3650, window=3600, overlap=60) == [TimeRange(start=0, end=3650)]
+
+
+def test_window_highlights_are_moved_to_absolute_time():
+    highlights = make_highlights(("00:00:10", "00:00:30"), ("00:59:50", "01:00:30"))
+
+    shifted = offset_highlights(highlights, TimeRange(start=3540, end=7140))
+
+    # The second runs past the window end and is clamped to it
+    assert [(h.start_time, h.end_time) for h in shifted.highlights] == [
+        ("00:59:10", "00:59:30"),
+        ("01:58:50", "01:59:00"),
+    ]
+
+
+def test_top_highlights_drop_window_duplicates_and_keep_the_best_scored():
+    found = [
+        Highlight(id="a", start_time="00:10:00", end_time="00:10:20", description=None, score=70),
+        # Same moment seen by the neighbouring window, scored higher
+        Highlight(id="b", start_time="00:10:02", end_time="00:10:21", description=None, score=90),
+        Highlight(id="c", start_time="00:01:00", end_time="00:01:20", description=None, score=80),
+        Highlight(id="d", start_time="00:30:00", end_time="00:30:20", description=None, score=10),
+        Highlight(id="e", start_time="00:40:00", end_time="00:40:20", description=None),
+    ]
+
+    assert [h.id for h in select_top_highlights(found, top_k=3).highlights] == ["c", "b", "d"]
+    assert [h.id for h in select_top_highlights(found).highlights] == ["c", "b", "d", "e"]
+
+
+def test_normalize_clamps_to_duration_and_drops_invalid_ranges():
+    highlights = make_highlights(
+        ("00:00:10", "00:00:20"),
+        ("00:01:50", "00:02:30"),  # runs past the end
+        ("00:02:05", "00:02:15"),  # starts after the end
+        ("00:00:40", "00:00:30"),  # ends before it starts
+    )
+
+    normalized = normalize_highlights(highlights, duration=120)
+
+    assert [(h.id, h.start_time, h.end_time) for h in normalized.highlights] == [
+        ("h0", "00:00:10", "00:00:20"),
+        ("h1", "00:01:50", "00:02:00"),
+    ]
+
+
+def test_normalize_folds_duplicates_and_nested_ranges_into_one_cut():
+    highlights = make_highlights(
+        ("00:00:30", "00:00:50"),
+        ("00:00:10", "00:00:20"),
+        ("00:00:31", "00:00:51"),  # near-duplicate of h0
+        ("00:00:35", "00:00:40"),  # nested in h0
+        ("00:00:45", "00:01:10"),  # overlaps h0, but is mostly its own
+    )
+    highlights.highlights[2].score = 90
+    untimed = Highlight(id="untimed", start_time=None, end_time=None, description=None)
+    highlights.highlights.append(untimed)
+
+    normalized = normalize_highlights(highlights)
+
+    assert [(h.id, h.start_time, h.end_time) for h in normalized.highlights] == [
+        ("h1", "00:00:10", "00:00:20"),
+        # The better scored duplicate names the merged range
+        ("h2", "00:00:30", "00:00:51"),
+        ("h4", "00:00:45", "00:01:10"),
+        ("untimed", None, None),
+    ]
+    assert normalized.folded == {"h0": "h2", "h3": "h2"}
+
+
+def test_normalize_keeps_folds_from_an_earlier_pass_pointing_at_kept_ids():
+    highlights = make_highlights(("00:00:10", "00:00:20"), ("00:00:10", "00:00:21"))
+    highlights.folded = {"older": "h0"}
+
+    normalized = normalize_highlights(highlights)
+
+    assert [h.id for h in normalized.highlights] == ["h1"]
+    assert normalized.folded == {"h0": "h1", "older": "h1"}
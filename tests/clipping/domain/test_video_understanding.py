@@ -0,0 +1,56 @@
+import pytest
+from pydantic import ValidationError
+from app.clipping.domain.video_understanding import (
+    Highlight,
+    HighlightsResponse,
+    TimeRange,
+    is_youtube_url,
+    source_video_id,
+)
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://youtu.be/dQw4w9WgXcQ", True),
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", True),
+        ("https://www.youtube.com/shorts/dQw4w9WgXcQ", True),
+        # Mentions YouTube but isn't a video
+        ("/videos/youtube.com-talk.mp4", False),
+        ("https://www.youtube.com/channel/UC38IQsAvIsxxjztdMZQtwHA", False),
+        ("https://cdn.example.com/talk.mp4", False),
+    ],
+)
+def test_is_youtube_url_matches_only_single_videos(url, expected):
+    assert is_youtube_url(url) is expected
+
+
+def test_source_video_id_is_the_youtube_id_or_a_hash_of_the_source(monkeypatch, tmp_path):
+    assert source_video_id("https://youtu.be/dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    local = source_video_id("/videos/talk.mp4")
+    assert local == source_video_id(" /videos/../videos/talk.mp4 ")
+    assert local != source_video_id("/videos/other.mp4")
+    assert local != source_video_id("https://cdn.example.com/talk.mp4")
+    assert len(local) == 16 and "/" not in local
+    # Relative paths are resolved, so they match the same file given absolutely
+    monkeypatch.chdir(tmp_path)
+    assert source_video_id("talk.mp4") == source_video_id(str(tmp_path / "talk.mp4"))
+
+
+def test_highlight_times_are_parsed_once_and_formatted_on_output():
+    highlight = Highlight(id="a", start_time="01:05", end_time="00:01:10.25", description=None)
+
+    assert highlight.time_range == TimeRange(start=65.0, end=70.25)
+    shifted = highlight.model_copy(update={"time_range": TimeRange(start=3.5, end=9.0)})
+    payload = HighlightsResponse(highlights=[shifted]).model_dump()
+    assert payload["highlights"][0]["start_time"] == "00:00:03.500"
+    assert "time_range" not in payload["highlights"][0]
+    assert HighlightsResponse.model_validate(payload).highlights == [shifted]
+
+
+def test_highlight_without_both_times_is_untimed_and_bad_times_are_rejected():
+    untimed = Highlight(id="a", start_time="00:10", end_time=None, description=None)
+
+    assert untimed.time_range is None and untimed.end_time is None
+    with pytest.raises(ValidationError):
+        Highlight(id="b", start_time="00:50", end_time="bogus", description=None)
@@ -0,0 +1,29 @@
+from unittest.mock import MagicMock
+from app.clipping.domain.video_understanding import Highlight, HighlightsResponse
+
+
+def make_highlight(highlight_id: str, start: str, end: str) -> Highlight:
+    return Highlight(id=highlight_id, start_time=start, end_time=end, description=None)
+
+
+def make_highlights(*ranges: tuple[str, str]) -> HighlightsResponse:
+    return HighlightsResponse(
+        highlights=[make_highlight(f"h{i}", start, end) for i, (start, end) in enumerate(ranges)]
+    )
+
+
+def spaced_highlights(count: int) -> HighlightsResponse:
+    """
+    `count` five second highlights, h0, h1, ..., starting ten seconds apart.
+    """
+    return make_highlights(
+        *((f"00:00:{i * 10:02d}", f"00:00:{i * 10 + 5:02d}") for i in range(count))
+    )
+
+
+def make_redis() -> MagicMock:
+    store: dict[str, str] = {}
+    redis_client = MagicMock()
+    redis_client.get.side_effect = store.get
+    redis_client.set.side_effect = lambda key, value, ex=None: store.__setitem__(key, value)
+    return redis_client
@@ -0,0 +1,271 @@
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import time
+from typing import Callable, Iterator, Optional
+from unittest.mock import AsyncMock, MagicMock
+import pytest
+from google import genai
+from google.genai import types
+from app.clipping.infrastructure.async_gemini_video_understanding import (
+    AsyncGeminiVideoUnderstandingService,
+    SyncVideoUnderstandingAdapter,
+    BackgroundEventLoop,
+)
+from app.clipping.infrastructure.gemini_file_uploader import GeminiFileRef
+from app.clipping.infrastructure.gemini_rate_limiter import GeminiRateLimiter
+
+HIGHLIGHTS = {
+    "highlights": [
+        {
+            "start_time": "00:05",
+            "end_time": "00:20",
+            "description": "Intro",
+            "time_format": "MM:SS",
+        }
+    ]
+}
+
+
+def generate_content_body(payload: dict, total_tokens: int = 1200) -> dict:
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": json.dumps(payload)}]}}],
+        "usageMetadata": {"totalTokenCount": total_tokens},
+    }
+
+
+class FakeGemini:
+    """
+    Local stand-in for the Gemini REST API. Replies with the queued
+    (status, body) pairs in order, then with `default`.
+    """
+
+    def __init__(self):
+        self.replies: list[tuple[int, dict]] = []
+        self.default = (200, generate_content_body(HIGHLIGHTS))
+        self.respond: Optional[Callable[[dict], dict]] = None
+        # (delay, text) pairs sent as server-sent events by streamGenerateContent
+        self.stream_chunks: list[tuple[float, str]] = []
+        self.paths: list[str] = []
+        self.requests: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    def handle(self, handler: BaseHTTPRequestHandler) -> None:
+        request = json.loads(handler.rfile.read(int(handler.headers["Content-Length"])))
+        with self.lock:
+            self.paths.append(handler.path)
+            self.requests.append(request)
+            status, body = self.replies.pop(0) if self.replies else self.default
+            if self.respond is not None:
+                status, body = 200, self.respond(request)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if ":streamGenerateContent" in handler.path:
+                self.stream(handler)
+                return
+            threading.Event().wait(self.delay)
+            data = json.dumps(body).encode()
+            handler.send_response(status)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(data)))
+            handler.end_headers()
+            handler.wfile.write(data)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def stream(self, handler: BaseHTTPRequestHandler) -> None:
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.end_headers()
+        for delay, text in self.stream_chunks:
+            threading.Event().wait(delay)
+            chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+            handler.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+            handler.wfile.flush()
+
+
+@pytest.fixture(name="fake_gemini")
+def fake_gemini_fixture() -> Iterator[tuple[FakeGemini, genai.Client]]:
+    fake = FakeGemini()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # pylint: disable=invalid-name
+            fake.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    client = genai.Client(
+        api_key="test-key",
+        http_options=types.HttpOptions(base_url=f"http://127.0.0.1:{server.server_port}"),
+    )
+    yield fake, client
+    server.shutdown()
+    server.server_close()
+
+
+def make_service(client: genai.Client, **kwargs) -> AsyncGeminiVideoUnderstandingService:
+    options = {
+        "rate_limiter": GeminiRateLimiter(requests_per_minute=1000, tokens_per_minute=10**7),
+        "backoff_base": 0.01,
+        "backoff_max": 0.05,
+        "estimated_tokens": 1000,
+    }
+    options.update(kwargs)
+    return AsyncGeminiVideoUnderstandingService(client, **options)
+
+
+def test_highlights_are_parsed_from_the_response(fake_gemini):
+    fake, client = fake_gemini
+
+    result = asyncio.run(make_service(client).analyze_video_highlights("https://youtu.be/x"))
+
+    assert [(h.start_time, h.end_time) for h in result.highlights] == [("00:00:05", "00:00:20")]
+    assert fake.paths[0].endswith("models/gemini-2.5-flash:generateContent")
+
+
+def test_throttling_and_server_errors_are_retried(fake_gemini):
+    fake, client = fake_gemini
+    error = {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}}
+    fake.replies = [(429, error), (503, {"error": {"code": 503, "message": "busy"}})]
+
+    result = asyncio.run(make_service(client).analyze_video_highlights("https://youtu.be/x"))
+
+    assert len(result.highlights) == 1
+    assert len(fake.paths) == 3
+
+
+def test_client_errors_fail_without_retrying(fake_gemini):
+    fake, client = fake_gemini
+    fake.replies = [(400, {"error": {"code": 400, "message": "bad video", "status": "INVALID"}})]
+
+    with pytest.raises(RuntimeError, match="bad video"):
+        asyncio.run(make_service(client).analyze_video_highlights("https://youtu.be/x"))
+    assert len(fake.paths) == 1
+
+
+def test_sync_adapter_caps_concurrency_across_threads(fake_gemini):
+    fake, client = fake_gemini
+    fake.delay = 0.1
+    adapter = SyncVideoUnderstandingAdapter(
+        make_service(client, max_concurrency=2), BackgroundEventLoop()
+    )
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(adapter.analyze_video_highlights("https://youtu.be/x"))
+        )
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 6
+    assert fake.max_in_flight == 2
+    assert adapter.model_name == "models/gemini-2.5-flash"
+
+
+def test_requests_wait_for_the_rate_limiter(fake_gemini):
+    _, client = fake_gemini
+    waits = [0.05, 0.0]
+    limiter = GeminiRateLimiter(requests_per_minute=1000, tokens_per_minute=10**7)
+    limiter.try_acquire = lambda tokens: waits.pop(0)  # type: ignore[method-assign]
+
+    asyncio.run(make_service(client, rate_limiter=limiter).analyze_video_highlights("u"))
+
+    assert waits == []
+
+
+def test_long_videos_are_analyzed_as_parallel_windows(fake_gemini):
+    fake, client = fake_gemini
+    fake.delay = 0.3
+
+    def start_offset(request: dict) -> str:
+        metadata = request["contents"][0]["parts"][0]["videoMetadata"]
+        return metadata.get("startOffset") or metadata["start_offset"]
+
+    def respond(request: dict) -> dict:
+        offset = start_offset(request)
+        # Every window finds a moment 10s in; the first two also see the same
+        # moment in their overlap, at 59:45 of the video
+        found = [{"start_time": "00:10", "end_time": "00:30", "time_format": "MM:SS",
+                  "description": offset, "score": 50}]
+        if offset == "0s":
+            found.append({"start_time": "59:45", "end_time": "59:58", "time_format": "MM:SS",
+                          "description": "overlap", "score": 90})
+        if offset == "3540s":
+            found.append({"start_time": "00:45", "end_time": "00:57", "time_format": "MM:SS",
+                          "description": "overlap again", "score": 60})
+        return generate_content_body({"highlights": found})
+
+    fake.respond = respond
+    service = make_service(
+        client,
+        duration_lookup=lambda url: 3 * 3600,
+        chunk_threshold=2400,
+        chunk_window=3600,
+        chunk_overlap=60,
+        chunk_top_k=3,
+    )
+
+    started = time.perf_counter()
+    result = asyncio.run(service.analyze_video_highlights("https://youtu.be/x"))
+    elapsed = time.perf_counter() - started
+
+    offsets = sorted(start_offset(r) for r in fake.requests)
+    assert offsets == ["0s", "10620s", "3540s", "7080s"]
+    # Windows ran concurrently: about one request's latency, not four
+    assert elapsed < 3 * fake.delay
+    # The overlap moment once, with its best score, then the earliest 50-point
+    # ones, in time order
+    assert [(h.start_time, h.description) for h in result.highlights] == [
+        ("00:00:10", "0s"),
+        ("00:59:10", "3540s"),
+        ("00:59:45", "overlap"),
+    ]
+
+
+def test_streamed_highlights_arrive_before_the_response_ends(fake_gemini):
+    fake, client = fake_gemini
+    text = json.dumps(
+        {"highlights": [dict(HIGHLIGHTS["highlights"][0], description=f"h{i}") for i in range(3)]}
+    )
+    first_end = text.index("}") + 1
+    fake.stream_chunks = [(0, text[:first_end]), (0.5, text[first_end:])]
+    adapter = SyncVideoUnderstandingAdapter(make_service(client), BackgroundEventLoop())
+
+    started = time.perf_counter()
+    arrivals = []
+    for highlight in adapter.iter_highlights("https://youtu.be/x"):
+        arrivals.append((highlight.description, time.perf_counter() - started))
+
+    assert [description for description, _ in arrivals] == ["h0", "h1", "h2"]
+    assert arrivals[0][1] < 0.4 < arrivals[1][1]
+    assert ":streamGenerateContent" in fake.paths[0]
+
+
+def test_uploaded_sources_are_referenced_by_file_uri(fake_gemini):
+    fake, client = fake_gemini
+    file_uri = "https://generativelanguage.googleapis.com/v1beta/files/abc"
+    uploader = MagicMock()
+    uploader.resolve = AsyncMock(return_value=GeminiFileRef(uri=file_uri, mime_type="video/mp4"))
+
+    asyncio.run(
+        make_service(client, file_uploader=uploader).analyze_video_highlights("/data/talk.mp4")
+    )
+
+    uploader.resolve.assert_awaited_once_with("/data/talk.mp4")
+    file_data = fake.requests[0]["contents"][0]["parts"][0]["fileData"]
+    assert file_data["fileUri"] == file_uri
+    assert file_data["mimeType"] == "video/mp4"
@@ -0,0 +1,117 @@
+import subprocess
+import threading
+import numpy as np
+import pytest
+from app.clipping.domain.video_understanding import Highlight, HighlightsResponse
+from app.clipping.infrastructure.audio_boundaries import (
+    AudioPauseSnapper,
+    find_pauses,
+    snap_to_pauses,
+)
+from app.clipping.infrastructure.ffmpeg_scheduler import FFmpegSlotScheduler
+from tests.clipping.helpers import make_highlight
+
+
+def make_snapper(tmp_path, **kwargs) -> AudioPauseSnapper:
+    scheduler = FFmpegSlotScheduler(cpu_budget=1, slot_dir=str(tmp_path / "slots"))
+    return AudioPauseSnapper(scheduler=scheduler, **kwargs)
+
+
+@pytest.fixture(name="speech_video", scope="module")
+def speech_video_fixture(tmp_path_factory) -> str:
+    """
+    12s video whose audio is a tone for 2s after every 1s of silence, so the
+    pauses are centred on 0.5s, 3.5s, 6.5s and 9.5s.
+    """
+    path = str(tmp_path_factory.mktemp("audio") / "speech.mp4")
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "aevalsrc='0.5*sin(2*PI*440*t)*gt(mod(t,3),1)':s=44100:d=12",
+            "-f", "lavfi", "-i", "color=c=black:s=160x120:d=12",
+            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def test_pauses_are_runs_of_quiet_frames_long_enough():
+    loud, quiet = -10.0, -60.0
+    # 0.1s dip between words, then a 0.4s pause, at 20ms frames
+    energies = np.array([loud] * 10 + [quiet] * 5 + [loud] * 10 + [quiet] * 20 + [loud] * 10)
+
+    pauses = find_pauses(energies, 0.02, min_pause=0.15)
+
+    np.testing.assert_allclose(pauses, [0.7])
+    assert len(find_pauses(np.full(100, -30.0), 0.02, 0.15)) == 0
+
+
+def test_times_snap_to_the_nearest_pause_within_tolerance():
+    snapped = snap_to_pauses(np.array([0.2, 3.0, 5.4, 20.0]), np.array([1.0, 5.0]), 1.0)
+
+    np.testing.assert_allclose(snapped, [1.0, 3.0, 5.0, 20.0])
+
+
+def test_highlight_edges_move_to_pauses_in_the_audio(speech_video, tmp_path):
+    snapper = make_snapper(tmp_path, tolerance=1.0)
+    highlights = HighlightsResponse(
+        highlights=[
+            make_highlight("a", "00:00:04", "00:00:07"),
+            make_highlight("far", "00:00:01.900", "00:00:11"),
+            Highlight(id="untimed", start_time=None, end_time=None, description=None),
+        ]
+    )
+
+    refined = snapper.refine(speech_video, highlights)
+
+    assert [(h.id, h.start_time, h.end_time) for h in refined.highlights] == [
+        ("a", "00:00:03.500", "00:00:06.500"),
+        # No pause within a second of either edge
+        ("far", "00:00:01.900", "00:00:11"),
+        ("untimed", None, None),
+    ]
+
+
+def test_sources_without_audio_keep_their_edges(tmp_path):
+    path = str(tmp_path / "silent.mp4")
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "color=c=black:s=160x120:d=2",
+            "-c:v", "libx264", "-preset", "ultrafast", path,
+        ],
+        check=True,
+    )
+    highlights = HighlightsResponse(highlights=[make_highlight("a", "00:00:00", "00:00:01")])
+
+    assert make_snapper(tmp_path).refine(path, highlights) == highlights
+
+
+def test_each_source_is_decoded_once_without_blocking_other_sources(tmp_path):
+    snapper = make_snapper(tmp_path)
+    slow, fast = tmp_path / "slow.mp4", tmp_path / "fast.mp4"
+    slow.write_bytes(b"slow")
+    fast.write_bytes(b"fast")
+    decoding, release = threading.Event(), threading.Event()
+    decoded: list[str] = []
+
+    def frame_energies(source_path):
+        decoded.append(source_path)
+        if source_path == str(slow):
+            decoding.set()
+            assert release.wait(timeout=5)
+        return np.full(10, -30.0)
+
+    snapper._frame_energies = frame_energies
+    waiters = [threading.Thread(target=snapper.pauses, args=(str(slow),)) for _ in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    assert decoding.wait(timeout=5)
+
+    # Answered while the slow source is still decoding
+    assert len(snapper.pauses(str(fast))) == 0
+    release.set()
+    for waiter in waiters:
+        waiter.join()
+    assert sorted(decoded) == sorted([str(slow), str(fast)])
@@ -0,0 +1,93 @@
+from unittest.mock import MagicMock
+from app.clipping.infrastructure.cached_video_understanding import (
+    CachedVideoUnderstandingService,
+)
+from tests.clipping.helpers import make_highlights, make_redis
+
+VIDEO_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+
+HIGHLIGHTS = make_highlights(("00:00:05", "00:00:20"))
+
+
+def test_repeated_analysis_is_served_from_local_tier():
+    inner = MagicMock(model_name="model", prompt_version="1")
+    inner.analyze_video_highlights.return_value = HIGHLIGHTS
+    service = CachedVideoUnderstandingService(inner)
+
+    first = service.analyze_video_highlights(VIDEO_URL, "Funny moments")
+    second = service.analyze_video_highlights(
+        "https://youtu.be/dQw4w9WgXcQ", " Funny moments\n"
+    )
+
+    inner.analyze_video_highlights.assert_called_once_with(VIDEO_URL, "Funny moments")
+    assert first == second
+    assert service.stats()["local_hits"] == 1
+    assert service.stats()["misses"] == 1
+    # Case can change what the model is asked
+    service.analyze_video_highlights(VIDEO_URL, "FUNNY moments")
+    assert inner.analyze_video_highlights.call_count == 2
+
+
+def test_redis_tier_is_shared_between_instances():
+    redis_client = make_redis()
+    inner = MagicMock(model_name="model", prompt_version="1")
+    inner.analyze_video_highlights.return_value = HIGHLIGHTS
+
+    CachedVideoUnderstandingService(inner, redis_client=redis_client).analyze_video_highlights(
+        VIDEO_URL
+    )
+    other = CachedVideoUnderstandingService(inner, redis_client=redis_client)
+    result = other.analyze_video_highlights(VIDEO_URL)
+
+    assert inner.analyze_video_highlights.call_count == 1
+    assert result == HIGHLIGHTS
+    assert other.stats()["redis_hits"] == 1
+
+
+def test_key_changes_with_prompt_version_and_lru_evicts():
+    inner = MagicMock(model_name="model", prompt_version="1")
+    inner.analyze_video_highlights.return_value = HIGHLIGHTS
+    service = CachedVideoUnderstandingService(inner, max_entries=1)
+
+    assert service.cache_key(VIDEO_URL, "a") != CachedVideoUnderstandingService(
+        inner, prompt_version="2"
+    ).cache_key(VIDEO_URL, "a")
+
+    service.analyze_video_highlights(VIDEO_URL, "a")
+    service.analyze_video_highlights(VIDEO_URL, "b")
+    service.analyze_video_highlights(VIDEO_URL, "a")
+
+    assert inner.analyze_video_highlights.call_count == 3
+    assert service.stats()["local_entries"] == 1
+
+
+def test_streamed_highlights_are_cached_once_the_stream_completes():
+    inner = MagicMock(model_name="model", prompt_version="1")
+    inner.iter_highlights.return_value = iter(HIGHLIGHTS.highlights)
+    service = CachedVideoUnderstandingService(inner)
+
+    stream = service.iter_highlights(VIDEO_URL)
+    assert next(stream).id == "h0"
+    # Not cached until the stream has been read to the end
+    assert service.stats()["local_entries"] == 0
+    assert list(stream) == []
+
+    assert service.analyze_video_highlights(VIDEO_URL) == HIGHLIGHTS
+    assert list(service.iter_highlights(VIDEO_URL)) == HIGHLIGHTS.highlights
+    inner.analyze_video_highlights.assert_not_called()
+    assert service.stats()["local_hits"] == 2
+
+
+def test_local_sources_are_keyed_by_resolved_path_and_file_version(tmp_path, monkeypatch):
+    inner = MagicMock(model_name="model", prompt_version="1")
+    service = CachedVideoUnderstandingService(inner)
+    source = tmp_path / "talk.mp4"
+    source.write_bytes(b"first")
+    monkeypatch.chdir(tmp_path)
+
+    key = service.cache_key(str(source), "a")
+
+    assert service.cache_key("talk.mp4", "a") == key
+    source.write_bytes(b"replaced")
+    assert service.cache_key(str(source), "a") != key
@@ -0,0 +1,27 @@
+from pathlib import Path
+from app.clipping.infrastructure.captions import format_transcript, parse_webvtt
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_uploaded_subtitles_are_parsed_without_markup():
+    cues = parse_webvtt((FIXTURES / "talk.en.vtt").read_text())
+
+    assert [(cue.start, cue.end) for cue in cues] == [
+        (1.0, 4.5),
+        (4.5, 9.25),
+        (62.0, 67.8),
+        (67.8, 72.0),
+    ]
+    assert cues[1].text == "Today I'm going to show you why most diets fail & what works."
+    assert cues[2].text == "Here's the one habit that changed everything."
+
+
+def test_rolling_auto_captions_keep_each_line_once():
+    cues = parse_webvtt((FIXTURES / "talk.auto.en.vtt").read_text())
+
+    assert format_transcript(cues) == (
+        "[00:00:00] so today we're talking about\n"
+        "[00:00:02] sleep and why it matters\n"
+        "[00:00:04] [Music]"
+    )
@@ -0,0 +1,52 @@
+from unittest.mock import MagicMock
+from redis.exceptions import ConnectionError as RedisConnectionError
+from app.clipping.infrastructure.checkpoint_store import (
+    FileCheckpointStore,
+    RedisCheckpointStore,
+)
+from app.clipping.infrastructure.file_hashing import file_checksum
+from app.clipping.domain.video_understanding import JobCheckpoint
+
+
+def make_checkpoint() -> JobCheckpoint:
+    return JobCheckpoint(
+        job_id="job-1",
+        video_url="https://youtu.be/dQw4w9WgXcQ",
+        urls={"h0": "bucket/h0.mp4"},
+    )
+
+
+def test_file_store_round_trips_checkpoints(tmp_path):
+    store = FileCheckpointStore(str(tmp_path))
+
+    assert store.load("job-1") is None
+    store.save(make_checkpoint())
+
+    assert store.load("job-1") == make_checkpoint()
+    assert [p.suffix for p in tmp_path.iterdir()] == [".json"]
+
+
+def test_redis_store_expires_checkpoints_and_survives_outages():
+    saved: dict[str, str] = {}
+    redis_client = MagicMock()
+    redis_client.get.side_effect = saved.get
+    redis_client.set.side_effect = lambda key, value, ex=None: saved.__setitem__(key, value)
+    store = RedisCheckpointStore(redis_client, ttl_seconds=60)
+
+    store.save(make_checkpoint())
+
+    assert store.load("job-1") == make_checkpoint()
+    assert redis_client.set.call_args.kwargs["ex"] == 60
+    redis_client.get.side_effect = RedisConnectionError("down")
+    assert store.load("job-1") is None
+
+
+def test_checksum_changes_when_file_is_truncated(tmp_path):
+    path = tmp_path / "source.mp4"
+    path.write_bytes(b"x" * 3 * 1024 * 1024)
+    before = file_checksum(str(path))
+
+    with open(path, "r+b") as f:
+        f.truncate(2 * 1024 * 1024)
+
+    assert file_checksum(str(path)) != before
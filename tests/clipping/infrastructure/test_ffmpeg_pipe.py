@@ -0,0 +1,58 @@
+import shutil
+import subprocess
+import pytest
+from app.clipping.domain.video_understanding import Highlight, HighlightsResponse
+from app.clipping.infrastructure.ffmpeg_pipe import FFmpegPipeReader, iter_ffmpeg_clip_streams
+from app.clipping.infrastructure.ffmpeg_scheduler import FFmpegSlotScheduler
+
+
+def spawn(script: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        ["sh", "-c", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+
+
+def test_reader_returns_output_of_successful_process():
+    reader = FFmpegPipeReader(spawn("printf 'fragment'"))
+
+    assert reader.read() == b"fragment"
+    reader.close()
+
+
+def test_reader_raises_with_stderr_when_process_fails():
+    reader = FFmpegPipeReader(spawn("printf 'partial'; echo 'Invalid data' >&2; exit 1"))
+
+    with pytest.raises(RuntimeError, match="code 1: Invalid data"):
+        reader.read()
+    reader.close()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_clip_streams_render_each_timed_highlight_as_fragmented_mp4(tmp_path):
+    source = str(tmp_path / "talk.mp4")
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25:duration=4",
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", "25", source,
+        ],
+        check=True,
+    )
+    highlights = HighlightsResponse(
+        highlights=[
+            Highlight(id="a", start_time="00:00:01", end_time="00:00:03", description=None),
+            Highlight(id="untimed", start_time=None, end_time=None, description=None),
+        ]
+    )
+    scheduler = FFmpegSlotScheduler(
+        cpu_budget=1, threads_per_slot=1, slot_dir=str(tmp_path / "slots")
+    )
+
+    streams = list(iter_ffmpeg_clip_streams(source, highlights, scheduler, {"c": "copy"}))
+
+    assert [(s.highlight_id, s.filename) for s in streams] == [("a", "talk_clip_a.mp4")]
+    with streams[0].open_stream() as stream:
+        data = stream.read()
+    # Fragmented: an empty moov up front, then movie fragments
+    assert data[4:8] == b"ftyp"
+    assert b"moof" in data
@@ -0,0 +1,125 @@
+import os
+import time
+from unittest.mock import MagicMock
+import pytest
+from app.clipping.domain.video_understanding import Highlight, HighlightsResponse
+from app.clipping.infrastructure import ffmpeg_reencode_video_clipper
+from app.clipping.infrastructure.ffmpeg_reencode_video_clipper import (
+    ENCODE_PROFILES,
+    FFmpegReencodeVideoClipper,
+)
+from app.clipping.infrastructure.ffmpeg_scheduler import FFmpegSlotScheduler
+
+HIGHLIGHTS = HighlightsResponse(
+    highlights=[
+        Highlight(id="a", start_time="00:01:00", end_time="00:01:30", description=None),
+        Highlight(id="untimed", start_time=None, end_time=None, description=None),
+        Highlight(id="b", start_time="00:00:05", end_time="00:00:12.5", description=None),
+    ]
+)
+
+
+@pytest.fixture(name="renders")
+def renders_fixture(monkeypatch):
+    """
+    Replace ffmpeg with a fake recording the input and output arguments of
+    every render. Clip "a" renders slowest, so it finishes last.
+    """
+    renders = []
+
+    def make_input(path, **input_args):
+        stream = MagicMock()
+
+        def output(out_path, **output_args):
+            render = MagicMock()
+
+            def run(**run_args):
+                time.sleep(0.05 if out_path.endswith("_clip_a.mp4") else 0)
+                renders.append(
+                    {"path": path, "input": input_args, "out_path": out_path, **output_args}
+                )
+
+            render.run.side_effect = run
+            return render
+
+        stream.output.side_effect = output
+        return stream
+
+    fake_ffmpeg = MagicMock()
+    fake_ffmpeg.input.side_effect = make_input
+    monkeypatch.setattr(ffmpeg_reencode_video_clipper, "ffmpeg", fake_ffmpeg)
+    return renders
+
+
+def make_clipper(tmp_path, **kwargs) -> FFmpegReencodeVideoClipper:
+    scheduler = FFmpegSlotScheduler(
+        cpu_budget=4, threads_per_slot=2, slot_dir=str(tmp_path / "slots")
+    )
+    return FFmpegReencodeVideoClipper(scheduler=scheduler, **kwargs)
+
+
+@pytest.mark.parametrize("profile", sorted(ENCODE_PROFILES))
+def test_each_timed_highlight_is_encoded_with_the_profile_settings(tmp_path, renders, profile):
+    clipper = make_clipper(tmp_path, profile=profile)
+
+    clips = list(clipper.iter_clips("/sources/talk.mp4", HIGHLIGHTS, str(tmp_path)))
+
+    settings = ENCODE_PROFILES[profile]
+    by_path = {render["out_path"]: render for render in renders}
+    assert sorted(by_path) == [
+        os.path.join(str(tmp_path), "talk_clip_a.mp4"),
+        os.path.join(str(tmp_path), "talk_clip_b.mp4"),
+    ]
+    render = by_path[os.path.join(str(tmp_path), "talk_clip_b.mp4")]
+    assert render["path"] == "/sources/talk.mp4"
+    # Input seeking, so the encode starts on the exact frame
+    assert render["input"] == {"ss": 5.0, "to": 12.5}
+    assert render["vcodec"] == "libx264" and render["acodec"] == "aac"
+    assert render["preset"] == settings["preset"]
+    assert render["crf"] == settings["crf"]
+    assert render["audio_bitrate"] == settings["audio_bitrate"]
+    assert render["pix_fmt"] == "yuv420p" and render["movflags"] == "faststart"
+    # Threads come from the scheduler's slot
+    assert render["threads"] == 2
+    assert sorted(clip.highlight_id for clip in clips) == ["a", "b"]
+
+
+def test_clip_video_returns_paths_in_highlight_order(tmp_path, renders):
+    clipper = make_clipper(tmp_path)
+
+    paths = clipper.clip_video("/sources/talk.mp4", HIGHLIGHTS, str(tmp_path))
+
+    # "a" finishes last but comes first; the untimed highlight has no clip
+    assert [render["out_path"] for render in renders][-1].endswith("_clip_a.mp4")
+    assert paths == [
+        os.path.join(str(tmp_path), "talk_clip_a.mp4"),
+        os.path.join(str(tmp_path), "talk_clip_b.mp4"),
+    ]
+
+
+def test_clip_streams_are_encoded_with_the_profile_settings(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        ffmpeg_reencode_video_clipper,
+        "iter_ffmpeg_clip_streams",
+        lambda *args: calls.append(args) or iter([]),
+    )
+    clipper = make_clipper(tmp_path, profile="size")
+
+    list(clipper.iter_clip_streams("/sources/talk.mp4", HIGHLIGHTS))
+
+    (video_url, highlights, scheduler, codec_args), = calls
+    assert (video_url, highlights, scheduler) == ("/sources/talk.mp4", HIGHLIGHTS, clipper.scheduler)
+    assert codec_args == {
+        "vcodec": "libx264",
+        "acodec": "aac",
+        "preset": "slow",
+        "crf": 28,
+        "audio_bitrate": "96k",
+        "pix_fmt": "yuv420p",
+    }
+
+
+def test_unknown_profile_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unknown encode profile 'fastest'"):
+        make_clipper(tmp_path, profile="fastest")
@@ -0,0 +1,36 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.clipping.infrastructure.ffmpeg_scheduler import FFmpegSlotScheduler
+
+
+def test_slots_are_bounded_by_cpu_budget(tmp_path):
+    # Two schedulers sharing a slot dir behave like two worker processes on one node
+    schedulers = [
+        FFmpegSlotScheduler(cpu_budget=4, threads_per_slot=2, slot_dir=str(tmp_path), poll_interval=0.01)
+        for _ in range(2)
+    ]
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def encode(n: int) -> int:
+        nonlocal running, peak
+        with schedulers[n % 2].slot() as threads:
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return threads
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        threads = list(executor.map(encode, range(8)))
+
+    assert schedulers[0].slots == 2
+    assert peak == 2
+    assert threads == [2] * 8
+    stats = schedulers[0].stats()
+    assert stats["runs"] == 4
+    assert stats["wait_seconds"] > 0
@@ -0,0 +1,213 @@
+import re
+import shutil
+import functools
+import contextlib
+import subprocess
+import pytest
+from app.clipping.domain.video_understanding import Highlight, HighlightsResponse
+from app.clipping.infrastructure.ffmpeg_scheduler import FFmpegSlotScheduler
+from app.clipping.infrastructure.ffmpeg_video_clipper import ClipJob, FFmpegVideoClipper
+from app.clipping.infrastructure import keyframe_index
+from app.clipping.infrastructure.keyframe_index import KeyframeIndex
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+@pytest.fixture(name="source_video", scope="module")
+def source_video_fixture(tmp_path_factory) -> str:
+    """
+    10s 4:4:4 H.264 video with a keyframe every second and 48 kHz stereo audio.
+    """
+    path = str(tmp_path_factory.mktemp("source") / "talk.mp4")
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=size=320x240:rate=25:duration=10",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=10:sample_rate=48000",
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", "25", "-pix_fmt", "yuv444p",
+            "-c:a", "aac", "-ac", "2", path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def source_index() -> KeyframeIndex:
+    return KeyframeIndex(
+        size=0,
+        mtime=0,
+        video_codec="h264",
+        profile="High 4:4:4 Predictive",
+        pix_fmt="yuv444p",
+        keyframes=[float(t) for t in range(10)],
+    )
+
+
+def media_info(path: str) -> tuple[float, list[str]]:
+    """
+    Duration and stream descriptions of `path`, read from ffmpeg's banner since
+    ffprobe may not be installed.
+    """
+    banner = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True
+    ).stderr
+    h, m, s = re.search(r"Duration: (\d+):(\d+):([\d.]+)", banner).groups()
+    streams = re.findall(r"Stream #\S+: (.*)", banner)
+    return int(h) * 3600 + int(m) * 60 + float(s), streams
+
+
+def make_clipper(tmp_path, **kwargs) -> FFmpegVideoClipper:
+    scheduler = FFmpegSlotScheduler(cpu_budget=1, slot_dir=str(tmp_path / "slots"))
+    return FFmpegVideoClipper(scheduler=scheduler, **kwargs)
+
+
+def make_job(index: int, start: float, end: float) -> ClipJob:
+    return ClipJob(
+        index=index,
+        highlight_id=f"h{index}",
+        start=start,
+        end=end,
+        out_path=f"/tmp/clip{index}.mp4",
+    )
+
+
+def test_nearby_highlights_share_one_ffmpeg_run():
+    clipper = FFmpegVideoClipper(max_gap_seconds=60, max_outputs=16)
+    jobs = [make_job(i, i * 30, i * 30 + 20) for i in range(12)]
+
+    clusters = clipper.plan_clusters(jobs)
+
+    assert len(clusters) == 1
+    assert [job.index for job in clusters[0]] == list(range(12))
+
+
+def test_distant_highlights_and_output_cap_split_clusters():
+    clipper = FFmpegVideoClipper(max_gap_seconds=60, max_outputs=2)
+    jobs = [make_job(0, 3600, 3620), make_job(1, 10, 30), make_job(2, 40, 50), make_job(3, 45, 55)]
+
+    clusters = clipper.plan_clusters(jobs)
+
+    assert [[job.index for job in cluster] for cluster in clusters] == [[1, 2], [3], [0]]
+
+
+@requires_ffmpeg
+def test_single_pass_cuts_every_clip_from_the_preceding_keyframe(source_video, tmp_path):
+    clipper = make_clipper(tmp_path)
+    jobs = [
+        make_job(0, 1.5, 3.0),
+        make_job(1, 4.0, 6.5),
+        make_job(2, 2.2, 8.0),
+    ]
+    for job in jobs:
+        job.out_path = str(tmp_path / f"clip{job.index}.mp4")
+
+    clipper._process_single_pass(source_video, jobs, source_index(), threads=1)
+
+    # Each clip starts on the keyframe at or before its start and ends at its end
+    durations = [media_info(job.out_path)[0] for job in jobs]
+    assert durations == pytest.approx([2.0, 2.5, 6.0], abs=0.1)
+
+
+def test_copy_mode_probes_only_for_shared_runs_and_cuts_alone_without_an_index(tmp_path):
+    loads = []
+
+    def keyframe_loader(video_path, probe=True):
+        loads.append(probe)
+        return None
+
+    clipper = make_clipper(tmp_path, keyframe_loader=keyframe_loader, max_gap_seconds=60)
+    runs = []
+    clipper._process_cluster = lambda video_url, cluster, index: runs.append(len(cluster))
+    near = HighlightsResponse(
+        highlights=[
+            Highlight(id="a", start_time="00:00:01", end_time="00:00:03", description=None),
+            Highlight(id="b", start_time="00:00:04", end_time="00:00:06", description=None),
+        ]
+    )
+    far = HighlightsResponse(
+        highlights=[
+            Highlight(id="a", start_time="00:00:01", end_time="00:00:03", description=None),
+            Highlight(id="b", start_time="00:10:00", end_time="00:10:05", description=None),
+        ]
+    )
+
+    clips = list(clipper.iter_clips("/sources/talk.mp4", near, str(tmp_path)))
+    list(clipper.iter_clips("/sources/talk.mp4", far, str(tmp_path)))
+
+    # The probe failed, so the nearby pair was cut alone too
+    assert loads == [True, False]
+    assert runs == [1, 1, 1, 1]
+    assert sorted(clip.highlight_id for clip in clips) == ["a", "b"]
+
+
+@requires_ffmpeg
+def test_copy_mode_cuts_nearby_highlights_in_one_run_without_a_cached_index(
+    source_video, tmp_path, monkeypatch
+):
+    # ffprobe may not be installed; report the fixture's one keyframe per second
+    monkeypatch.setattr(
+        keyframe_index.ffmpeg,
+        "probe",
+        lambda path, **kwargs: {
+            "packets": [{"pts_time": str(t), "flags": "K_"} for t in range(10)],
+            "streams": [{"codec_name": "h264"}],
+        },
+    )
+    clipper = make_clipper(
+        tmp_path,
+        keyframe_loader=functools.partial(
+            keyframe_index.load_keyframe_index,
+            cache_dir=str(tmp_path / "keyframes"),
+            single_flight=lambda key: contextlib.nullcontext(),
+        ),
+    )
+    ffmpeg_runs = []
+    popen = subprocess.Popen
+
+    def recording_popen(args, *a, **kw):
+        ffmpeg_runs.append(args)
+        return popen(args, *a, **kw)
+
+    highlights = HighlightsResponse(
+        highlights=[
+            Highlight(id="a", start_time="00:00:01.5", end_time="00:00:03", description=None),
+            Highlight(id="b", start_time="00:00:04", end_time="00:00:06.5", description=None),
+        ]
+    )
+
+    monkeypatch.setattr(subprocess, "Popen", recording_popen)
+    clips = {
+        clip.highlight_id: clip.path
+        for clip in clipper.iter_clips(source_video, highlights, str(tmp_path))
+    }
+    monkeypatch.undo()
+
+    assert len(ffmpeg_runs) == 1
+    assert media_info(clips["a"])[0] == pytest.approx(2.0, abs=0.1)
+    assert media_info(clips["b"])[0] == pytest.approx(2.5, abs=0.1)
+
+
+@requires_ffmpeg
+def test_smart_cut_is_frame_accurate_and_matches_the_source_streams(source_video, tmp_path):
+    clipper = make_clipper(tmp_path, mode="smart")
+
+    def no_fallback(video_url, job, threads):
+        raise AssertionError("smart cut fell back to a full re-encode")
+
+    clipper._reencode_clip = no_fallback
+    job = make_job(0, 1.5, 6.5)
+    job.out_path = str(tmp_path / "clip.mp4")
+
+    clipper._smart_cut(source_video, job, source_index(), threads=1)
+
+    duration, streams = media_info(job.out_path)
+    assert duration == pytest.approx(5.0, abs=0.1)
+    video, audio = streams
+    assert "h264 (High 4:4:4 Predictive)" in video and "yuv444p" in video
+    assert "aac" in audio and "48000 Hz, stereo" in audio
+    decode = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", job.out_path, "-f", "null", "-"],
+        capture_output=True,
+        text=True,
+    )
+    assert decode.returncode == 0 and decode.stderr == ""
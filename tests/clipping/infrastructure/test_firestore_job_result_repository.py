@@ -0,0 +1,116 @@
+import threading
+import pytest
+from app.clipping.infrastructure.firestore_job_result_repository import (
+    MAX_JOBS_PER_BATCH,
+    BufferedFirestoreJobResultRepository,
+    FirestoreJobResultRepository,
+)
+from tests.clipping.helpers import make_highlights
+
+
+class FakeBatch:
+    def __init__(self, db: "FakeFirestore"):
+        self.db = db
+        self.writes: list[tuple[str, dict]] = []
+
+    def set(self, doc_ref: str, data: dict) -> None:
+        self.writes.append((doc_ref, data))
+
+    def commit(self) -> None:
+        with self.db.lock:
+            if self.db.fail_commits:
+                raise RuntimeError("commit failed")
+            self.db.commits.append(len(self.writes))
+            self.db.documents.update(self.writes)
+
+
+class FakeCollection:
+    def __init__(self, name: str):
+        self.name = name
+
+    def document(self, doc_id: str) -> str:
+        return f"{self.name}/{doc_id}"
+
+
+class FakeFirestore:
+    """
+    In-memory stand-in for the parts of the Firestore client the repositories use.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.documents: dict[str, dict] = {}
+        self.commits: list[int] = []
+        self.fail_commits = False
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(name)
+
+    def batch(self) -> FakeBatch:
+        return FakeBatch(self)
+
+
+HIGHLIGHTS = make_highlights(("00:01", "00:05"))
+
+
+def test_job_result_is_committed_in_one_batch():
+    db = FakeFirestore()
+
+    FirestoreJobResultRepository(db).save_job_result(
+        "vid", HIGHLIGHTS, {"h0": "bucket/h0.mp4"}
+    )
+
+    assert db.commits == [2]
+    assert db.documents == {
+        "video_highlights/vid": {"highlights": HIGHLIGHTS.model_dump()},
+        "video_clip_urls/vid": {"highlight_to_url": {"h0": "bucket/h0.mp4"}},
+    }
+
+
+def test_bulk_mode_coalesces_concurrent_jobs_into_few_commits():
+    db = FakeFirestore()
+    repository = BufferedFirestoreJobResultRepository(db, flush_interval=0.2)
+    try:
+        threads = [
+            threading.Thread(
+                target=repository.save_job_result,
+                args=(f"vid{n}", HIGHLIGHTS, {"h0": f"bucket/{n}.mp4"}),
+            )
+            for n in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        repository.close()
+
+    assert len(db.documents) == 40
+    assert sum(db.commits) == 40
+    assert len(db.commits) < 20
+
+
+def test_bulk_mode_splits_batches_at_the_write_limit():
+    db = FakeFirestore()
+    repository = BufferedFirestoreJobResultRepository(
+        db, flush_interval=60, wait_for_commit=False
+    )
+    for n in range(MAX_JOBS_PER_BATCH + 10):
+        repository.save_job_result(f"vid{n}", HIGHLIGHTS, {})
+    repository.close()
+
+    assert max(db.commits) <= 2 * MAX_JOBS_PER_BATCH
+    assert sum(db.commits) == 2 * (MAX_JOBS_PER_BATCH + 10)
+
+
+def test_bulk_mode_raises_commit_errors_to_waiting_jobs():
+    db = FakeFirestore()
+    db.fail_commits = True
+    repository = BufferedFirestoreJobResultRepository(db, flush_interval=0.01)
+    try:
+        with pytest.raises(RuntimeError, match="commit failed"):
+            repository.save_job_result("vid", HIGHLIGHTS, {})
+    finally:
+        repository.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        repository.save_job_result("vid", HIGHLIGHTS, {})
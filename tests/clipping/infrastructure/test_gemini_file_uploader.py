@@ -0,0 +1,142 @@
+import re
+import asyncio
+import datetime
+import subprocess
+from unittest.mock import MagicMock
+import pytest
+from google.genai import types
+from app.clipping.infrastructure.ffmpeg_scheduler import FFmpegSlotScheduler
+from app.clipping.infrastructure.gemini_file_uploader import GeminiFileUploader
+from tests.clipping.helpers import make_redis
+
+
+class FakeFiles:
+    """
+    Stand-in for `client.aio.files`: records uploaded proxies and reports each
+    file as processing for `processing_polls` polls.
+    """
+
+    def __init__(self, expires_in: float = 48 * 3600, processing_polls: int = 0):
+        self.uploads: list[str] = []
+        self.proxy_info: list[str] = []
+        self.expires_in = expires_in
+        self.processing_polls = processing_polls
+        self.polls = 0
+
+    async def upload(self, *, file, config=None):
+        self.uploads.append(file)
+        self.proxy_info.append(describe_video(file))
+        name = f"files/{len(self.uploads)}"
+        return self._file(name, types.FileState.PROCESSING if self.processing_polls else None)
+
+    async def get(self, *, name):
+        self.polls += 1
+        state = types.FileState.ACTIVE
+        if self.polls < self.processing_polls:
+            state = types.FileState.PROCESSING
+        return self._file(name, state)
+
+    def _file(self, name, state):
+        return types.File(
+            name=name,
+            uri=f"https://generativelanguage.googleapis.com/v1beta/{name}",
+            mime_type="video/mp4",
+            state=state,
+            expiration_time=datetime.datetime.now(datetime.timezone.utc)
+            + datetime.timedelta(seconds=self.expires_in),
+        )
+
+
+def describe_video(path: str) -> str:
+    # ffmpeg prints the stream layout to stderr when given no output
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-i", path], capture_output=True, text=True, check=False
+    )
+    return result.stderr
+
+
+def make_uploader(files: FakeFiles, tmp_path, **kwargs) -> GeminiFileUploader:
+    client = MagicMock()
+    client.aio.files = files
+    scheduler = FFmpegSlotScheduler(
+        cpu_budget=2, threads_per_slot=1, slot_dir=str(tmp_path / "slots")
+    )
+    options = {"expiry_margin": 3600, "poll_interval": 0.01, "scheduler": scheduler}
+    options.update(kwargs)
+    return GeminiFileUploader(client, **options)
+
+
+@pytest.fixture(name="source_video", scope="module")
+def source_video_fixture(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp("source") / "talk.mp4")
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", "testsrc=size=1280x720:rate=25:duration=3",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=3",
+            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", path,
+        ],
+        check=True,
+    )
+    return path
+
+
+def test_local_source_is_uploaded_once_as_a_small_proxy(source_video, tmp_path):
+    files = FakeFiles()
+    uploader = make_uploader(files, tmp_path, proxy_fps=1, proxy_height=360)
+
+    first = asyncio.run(uploader.resolve(source_video))
+    second = asyncio.run(uploader.resolve(f"file://{source_video}"))
+
+    assert first == second
+    assert first.uri.endswith("files/1") and first.mime_type == "video/mp4"
+    assert len(files.uploads) == 1
+    assert re.search(r"640x360.* 1 fps", files.proxy_info[0])
+    assert "mono" in files.proxy_info[0]
+
+
+def test_uploads_are_shared_across_workers_through_redis(source_video, tmp_path):
+    files = FakeFiles()
+    redis_client = make_redis()
+
+    workers = [make_uploader(files, tmp_path, redis_client=redis_client) for _ in range(2)]
+
+    first = asyncio.run(workers[0].resolve(source_video))
+    second = asyncio.run(workers[1].resolve(source_video))
+
+    assert first == second
+    assert len(files.uploads) == 1
+    # Expires from Redis before Gemini deletes the file
+    assert 0 < redis_client.set.call_args.kwargs["ex"] <= 47 * 3600
+
+
+def test_handles_close_to_expiry_are_uploaded_again(source_video, tmp_path):
+    files = FakeFiles(expires_in=1800)
+    uploader = make_uploader(files, tmp_path)
+
+    asyncio.run(uploader.resolve(source_video))
+    asyncio.run(uploader.resolve(source_video))
+
+    assert len(files.uploads) == 2
+
+
+def test_processing_files_are_polled_until_active(source_video, tmp_path):
+    files = FakeFiles(processing_polls=3)
+
+    ref = asyncio.run(make_uploader(files, tmp_path).resolve(source_video))
+
+    assert ref.name == "files/1"
+    assert files.polls == 3
+
+
+def test_youtube_urls_pass_through_and_remote_sources_are_downloaded(source_video, tmp_path):
+    files = FakeFiles()
+    download_source = MagicMock(return_value=MagicMock(path=source_video))
+    uploader = make_uploader(files, tmp_path, download_source=download_source)
+
+    youtube = asyncio.run(uploader.resolve("https://youtu.be/dQw4w9WgXcQ"))
+    remote = asyncio.run(uploader.resolve("https://cdn.example.com/talk.mp4"))
+
+    assert youtube.uri == "https://youtu.be/dQw4w9WgXcQ" and youtube.mime_type is None
+    download_source.assert_called_once_with("https://cdn.example.com/talk.mp4")
+    assert remote.name == "files/1"
@@ -0,0 +1,86 @@
+from unittest.mock import MagicMock
+from redis.exceptions import ConnectionError as RedisConnectionError
+from app.clipping.infrastructure.gemini_rate_limiter import (
+    ADJUST_TOKENS_SCRIPT,
+    TAKE_TOKENS_SCRIPT,
+    GeminiRateLimiter,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_local_buckets_admit_requests_within_both_quotas():
+    clock = FakeClock()
+    limiter = GeminiRateLimiter(requests_per_minute=2, tokens_per_minute=600, clock=clock)
+
+    assert limiter.try_acquire(100) == 0
+    assert limiter.try_acquire(100) == 0
+    # Out of requests: one refills every 30 seconds
+    assert limiter.try_acquire(100) == 30
+    clock.now = 30
+    assert limiter.try_acquire(500) == 0
+    # Out of tokens now: 100 left and 10 refill per second
+    clock.now = 60
+    assert limiter.try_acquire(600) == 20
+
+
+def test_usage_adjustments_settle_estimates():
+    clock = FakeClock()
+    limiter = GeminiRateLimiter(requests_per_minute=100, tokens_per_minute=600, clock=clock)
+
+    assert limiter.try_acquire(300) == 0
+    # The request actually used 500 tokens
+    limiter.adjust(200)
+
+    assert limiter.try_acquire(200) == 10
+
+
+def test_oversized_requests_wait_for_a_full_bucket_instead_of_forever():
+    clock = FakeClock()
+    limiter = GeminiRateLimiter(requests_per_minute=100, tokens_per_minute=600, clock=clock)
+
+    assert limiter.try_acquire(10_000) == 0
+    assert limiter.try_acquire(10_000) == 60
+
+
+def test_redis_buckets_are_shared_and_fall_back_to_local_limits():
+    redis_client = MagicMock()
+    script = redis_client.register_script.return_value
+    script.return_value = b"1.5"
+    limiter = GeminiRateLimiter(redis_client, requests_per_minute=60, tokens_per_minute=6000)
+
+    assert limiter.try_acquire(100) == 1.5
+    assert script.call_args.kwargs["keys"] == [
+        "ezclip:ratelimit:gemini:requests",
+        "ezclip:ratelimit:gemini:tokens",
+    ]
+    assert script.call_args.kwargs["args"] == [60, 1.0, 1, 6000, 100.0, 100]
+
+    script.side_effect = RedisConnectionError("down")
+    assert limiter.try_acquire(100) == 0
+
+
+def test_redis_adjustments_refill_and_keep_the_bucket_expiring():
+    redis_client = MagicMock()
+    scripts = {}
+    redis_client.register_script.side_effect = lambda source: scripts.setdefault(
+        source, MagicMock(return_value=b"0")
+    )
+    limiter = GeminiRateLimiter(redis_client, requests_per_minute=60, tokens_per_minute=6000)
+
+    limiter.adjust(200)
+    limiter.adjust(-50)
+
+    adjust = scripts[ADJUST_TOKENS_SCRIPT]
+    assert TAKE_TOKENS_SCRIPT not in scripts
+    assert [c.kwargs for c in adjust.call_args_list] == [
+        {"keys": ["ezclip:ratelimit:gemini:tokens"], "args": [6000, 100.0, -200]},
+        {"keys": ["ezclip:ratelimit:gemini:tokens"], "args": [6000, 100.0, 50]},
+    ]
+    redis_client.hincrbyfloat.assert_not_called()
@@ -0,0 +1,108 @@
+import os
+import time
+import shutil
+import threading
+from collections import namedtuple
+import pytest
+from app.clipping.infrastructure.job_workspace import (
+    InsufficientDiskSpaceError,
+    LocalJobWorkspaceProvider,
+)
+
+DiskUsage = namedtuple("DiskUsage", "total used free")
+
+
+@pytest.fixture(name="disk")
+def disk_fixture(monkeypatch):
+    """
+    Free space reported for every path, settable by the test.
+    """
+    disk = {"free": 10 * 1024}
+    monkeypatch.setattr(shutil, "disk_usage", lambda path: DiskUsage(0, 0, disk["free"]))
+    return disk
+
+
+def make_provider(tmp_path, **kwargs) -> LocalJobWorkspaceProvider:
+    options = {"min_free_bytes": 1024, "admission_timeout": 5, "poll_interval": 0.01}
+    options.update(kwargs)
+    return LocalJobWorkspaceProvider(root=str(tmp_path / "jobs"), **options)
+
+
+def test_workspace_is_removed_when_the_job_ends(tmp_path, disk):
+    provider = make_provider(tmp_path)
+
+    with provider.workspace("vid/job-1") as done:
+        pass
+    with pytest.raises(RuntimeError):
+        with provider.workspace("vid/job-2") as failed:
+            raise RuntimeError("upload failed")
+
+    assert os.path.basename(done) == "vid_job-1"
+    assert not os.path.exists(done) and not os.path.exists(failed)
+
+
+def test_failed_job_keeps_its_workspace_only_for_a_retry(tmp_path, disk):
+    provider = make_provider(tmp_path)
+
+    def retryable(error):
+        return isinstance(error, ConnectionError)
+
+    with pytest.raises(ConnectionError):
+        with provider.workspace("vid/job-1", keep_on_failure=retryable) as first:
+            with open(os.path.join(first, "clip.mp4"), "wb") as f:
+                f.write(b"clip")
+            raise ConnectionError("upload failed")
+    with pytest.raises(ValueError):
+        with provider.workspace("vid/job-1", keep_on_failure=retryable) as retry:
+            assert retry == first
+            assert os.path.exists(os.path.join(retry, "clip.mp4"))
+            raise ValueError("bad highlights")
+
+    assert os.listdir(provider.root) == []
+
+
+def test_job_waits_until_running_jobs_leave_room(tmp_path, disk):
+    provider = make_provider(tmp_path)
+    disk["free"] = 1536  # room for one job
+    admitted = threading.Event()
+
+    def second_job():
+        with provider.workspace("job-2"):
+            admitted.set()
+
+    with provider.workspace("job-1"):
+        waiter = threading.Thread(target=second_job)
+        waiter.start()
+        assert not admitted.wait(timeout=0.2)
+    assert admitted.wait(timeout=2)
+    waiter.join()
+
+
+def test_job_gives_up_when_disk_stays_full(tmp_path, disk):
+    provider = make_provider(tmp_path, admission_timeout=0.05)
+    disk["free"] = 512
+
+    with pytest.raises(InsufficientDiskSpaceError):
+        with provider.workspace("job-1"):
+            pass
+
+    # A job that never started holds no room
+    disk["free"] = 1024
+    with provider.workspace("job-2"):
+        pass
+
+
+def test_stale_workspaces_are_swept(tmp_path, disk):
+    provider = make_provider(tmp_path, stale_seconds=3600)
+    stale = os.path.join(provider.root, "dead-job")
+    fresh = os.path.join(provider.root, "running-job")
+    os.makedirs(stale)
+    os.makedirs(fresh)
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+
+    with provider.workspace("job-1"):
+        pass
+
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh)
@@ -0,0 +1,29 @@
+import json
+from app.clipping.infrastructure.json_stream import JsonArrayItemParser
+
+DOCUMENT = {
+    "highlights": [
+        {"start_time": "00:05", "description": 'A "quoted" {brace} and [bracket]\\\\'},
+        {"start_time": "01:10", "description": "nested", "tags": [{"a": 1}, [2]]},
+    ]
+}
+
+
+def test_items_are_returned_as_soon_as_they_close():
+    parser = JsonArrayItemParser()
+    text = "```json\n" + json.dumps(DOCUMENT) + "\n```"
+    first_close = text.index("}, {") + 1
+
+    assert parser.feed(text[: first_close - 1]) == []
+    assert parser.feed(text[first_close - 1 : first_close]) == [DOCUMENT["highlights"][0]]
+    assert parser.feed(text[first_close:]) == [DOCUMENT["highlights"][1]]
+
+
+def test_items_survive_arbitrary_chunking():
+    parser = JsonArrayItemParser()
+    text = json.dumps(DOCUMENT, indent=2)
+
+    items = [item for char in text for item in parser.feed(char)]
+
+    assert items == DOCUMENT["highlights"]
+    assert parser.feed("") == []
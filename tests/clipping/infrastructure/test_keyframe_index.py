@@ -0,0 +1,61 @@
+import os
+from contextlib import contextmanager
+from unittest.mock import patch
+from app.clipping.infrastructure import keyframe_index
+from app.clipping.infrastructure.keyframe_index import KeyframeIndex, load_keyframe_index
+
+
+def test_keyframe_lookup():
+    index = KeyframeIndex(size=0, mtime=0, keyframes=[0.0, 2.0, 4.0, 6.0])
+
+    assert index.at_or_before(3.9) == 2.0
+    assert index.at_or_before(4.0) == 4.0
+    assert index.at_or_after(4.1) == 6.0
+    assert index.at_or_after(6.5) is None
+
+
+def test_index_is_probed_once_and_cached_outside_the_source_directory(tmp_path):
+    source = tmp_path / "videos" / "video.mp4"
+    source.parent.mkdir()
+    source.write_bytes(b"video")
+    cache_dir = str(tmp_path / "keyframes")
+    locked: list[str] = []
+
+    @contextmanager
+    def single_flight(key):
+        locked.append(key)
+        yield
+
+    probe_result = {
+        "packets": [
+            {"pts_time": "4.000000", "flags": "K__"},
+            {"pts_time": "0.000000", "flags": "K__"},
+            {"pts_time": "0.040000", "flags": "___"},
+            {"pts_time": "N/A", "flags": "K__"},
+        ],
+        "streams": [{"codec_name": "h264", "profile": "High", "pix_fmt": "yuv420p"}],
+    }
+
+    with patch.object(keyframe_index.ffmpeg, "probe", return_value=probe_result) as probe:
+        first = load_keyframe_index(str(source), cache_dir=cache_dir, single_flight=single_flight)
+        second = load_keyframe_index(str(source), cache_dir=cache_dir, single_flight=single_flight)
+
+    probe.assert_called_once()
+    assert len(locked) == 1
+    assert first == second
+    assert first is not None
+    assert first.keyframes == [0.0, 4.0]
+    assert (first.video_codec, first.profile, first.pix_fmt) == ("h264", "High", "yuv420p")
+    assert os.listdir(source.parent) == ["video.mp4"]
+    assert os.path.exists(keyframe_index.keyframe_index_path(str(source), cache_dir))
+
+
+def test_index_is_not_probed_when_only_a_cached_one_is_wanted(tmp_path):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"video")
+
+    with patch.object(keyframe_index.ffmpeg, "probe") as probe:
+        index = load_keyframe_index(str(source), probe=False, cache_dir=str(tmp_path / "keyframes"))
+
+    assert index is None
+    probe.assert_not_called()
@@ -0,0 +1,204 @@
+import io
+import time
+import threading
+import hashlib
+from unittest.mock import MagicMock
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+from app.clipping.infrastructure.r2_storage import MB, R2StorageService
+
+
+def make_service(**kwargs) -> R2StorageService:
+    kwargs.setdefault("content_addressed", False)
+    service = R2StorageService(
+        bucket="clips", endpoint_url="http://localhost:9000", **kwargs
+    )
+    service.client = MagicMock()
+    return service
+
+
+def test_save_video_namespaces_key_and_uses_transfer_config():
+    service = make_service(part_concurrency=8, multipart_chunk_mb=32)
+
+    url = service.save_video("/tmp/abc_clip0.mp4", key_prefix="vid/job-1")
+
+    assert url == "clips/vid/job-1/abc_clip0.mp4"
+    args, kwargs = service.client.upload_file.call_args
+    assert args == ("/tmp/abc_clip0.mp4", "clips", "vid/job-1/abc_clip0.mp4")
+    assert kwargs["Config"].max_concurrency == 8
+    assert kwargs["Config"].multipart_chunksize == 32 * 1024 * 1024
+
+
+def test_connection_pool_fits_every_part_of_every_concurrent_upload():
+    service = R2StorageService(
+        bucket="clips",
+        endpoint_url="http://localhost:9000",
+        upload_concurrency=3,
+        part_concurrency=5,
+    )
+
+    assert service.client.meta.config.max_pool_connections == 15
+
+
+class ChunkedStream(io.RawIOBase):
+    """Pipe-like stream: short reads, optionally failing at the end."""
+
+    def __init__(self, size: int, read_size: int, fail: bool = False):
+        super().__init__()
+        self.remaining = size
+        self.read_size = read_size
+        self.fail = fail
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        n = min(self.remaining, self.read_size, size if size >= 0 else self.read_size)
+        if n == 0 and self.fail:
+            raise RuntimeError("ffmpeg exited with code 1")
+        self.remaining -= n
+        return b"x" * n
+
+
+def test_small_stream_is_sent_with_a_single_put():
+    service = make_service(multipart_chunk_mb=5)
+
+    url = service.save_stream(ChunkedStream(1000, 300), "clip0.mp4", key_prefix="vid/job-1")
+
+    assert url == "clips/vid/job-1/clip0.mp4"
+    service.client.put_object.assert_called_once()
+    assert len(service.client.put_object.call_args.kwargs["Body"]) == 1000
+    service.client.create_multipart_upload.assert_not_called()
+
+
+def test_large_stream_is_uploaded_in_bounded_parallel_parts():
+    service = make_service(multipart_chunk_mb=5, part_concurrency=2)
+    service.client.create_multipart_upload.return_value = {"UploadId": "u1"}
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def upload_part(**kwargs):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return {"ETag": f"etag{kwargs['PartNumber']}"}
+
+    service.client.upload_part.side_effect = upload_part
+    size = 5 * MB * 5 + 123
+
+    service.save_stream(ChunkedStream(size, 64 * 1024), "clip0.mp4")
+
+    parts = service.client.complete_multipart_upload.call_args.kwargs["MultipartUpload"]["Parts"]
+    assert [p["PartNumber"] for p in parts] == [1, 2, 3, 4, 5, 6]
+    assert [p["ETag"] for p in parts] == [f"etag{i}" for i in range(1, 7)]
+    sizes = sorted(len(c.kwargs["Body"]) for c in service.client.upload_part.call_args_list)
+    assert sizes == [123] + [5 * MB] * 5
+    assert peak == 2
+    service.client.abort_multipart_upload.assert_not_called()
+
+
+def test_failed_producer_aborts_the_multipart_upload():
+    service = make_service(multipart_chunk_mb=5)
+    service.client.create_multipart_upload.return_value = {"UploadId": "u1"}
+    service.client.upload_part.return_value = {"ETag": "etag"}
+
+    with pytest.raises(RuntimeError, match="ffmpeg exited"):
+        service.save_stream(ChunkedStream(12 * MB, MB, fail=True), "clip0.mp4")
+
+    service.client.abort_multipart_upload.assert_called_once_with(
+        Bucket="clips", Key="clip0.mp4", UploadId="u1"
+    )
+    service.client.complete_multipart_upload.assert_not_called()
+
+
+def not_found(**kwargs):
+    raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+
+def test_identical_clip_is_uploaded_once(tmp_path):
+    service = make_service(content_addressed=True)
+    service.client.head_object.side_effect = not_found
+    clip = tmp_path / "abc_clip0.mp4"
+    clip.write_bytes(b"clip bytes")
+    digest = hashlib.sha256(b"clip bytes").hexdigest()
+
+    first = service.save_video(str(clip), key_prefix="vid/job-1")
+    second = service.save_video(str(clip), key_prefix="vid/job-2")
+
+    # Each job still finds its clip under its own prefix
+    assert first == "clips/vid/job-1/abc_clip0.mp4"
+    assert second == "clips/vid/job-2/abc_clip0.mp4"
+    service.client.upload_file.assert_called_once()
+    assert service.client.upload_file.call_args.args[2] == f"content/{digest}.mp4"
+    copies = [call.kwargs for call in service.client.copy_object.call_args_list]
+    assert [(c["CopySource"]["Key"], c["Key"]) for c in copies] == [
+        (f"content/{digest}.mp4", "vid/job-1/abc_clip0.mp4"),
+        (f"content/{digest}.mp4", "vid/job-2/abc_clip0.mp4"),
+    ]
+
+
+def test_clip_stored_by_an_earlier_run_is_found_with_head(tmp_path):
+    service = make_service(content_addressed=True)
+    clip = tmp_path / "abc_clip0.mp4"
+    clip.write_bytes(b"clip bytes")
+
+    url = service.save_video(str(clip))
+
+    assert url.startswith("clips/content/")
+    service.client.head_object.assert_called_once()
+    service.client.upload_file.assert_not_called()
+
+
+def test_unreachable_endpoint_on_head_falls_back_to_uploading(tmp_path):
+    service = make_service(content_addressed=True)
+    service.client.head_object.side_effect = EndpointConnectionError(
+        endpoint_url="http://localhost:9000"
+    )
+    clip = tmp_path / "abc_clip0.mp4"
+    clip.write_bytes(b"clip bytes")
+
+    url = service.save_video(str(clip))
+
+    assert url.startswith("clips/content/")
+    service.client.upload_file.assert_called_once()
+
+
+def test_streamed_duplicate_aborts_its_staged_upload():
+    service = make_service(content_addressed=True, multipart_chunk_mb=5)
+    service.client.create_multipart_upload.return_value = {"UploadId": "u1"}
+    service.client.upload_part.return_value = {"ETag": "etag"}
+    digest = hashlib.sha256(b"x" * 6 * MB).hexdigest()
+
+    url = service.save_stream(ChunkedStream(6 * MB, MB), "clip0.mp4")
+
+    assert url == f"clips/content/{digest}.mp4"
+    staging_key = service.client.create_multipart_upload.call_args.kwargs["Key"]
+    assert staging_key.startswith("staging/")
+    service.client.abort_multipart_upload.assert_called_once_with(
+        Bucket="clips", Key=staging_key, UploadId="u1"
+    )
+    service.client.complete_multipart_upload.assert_not_called()
+    service.client.copy_object.assert_not_called()
+
+
+def test_streamed_new_clip_is_copied_to_its_content_key():
+    service = make_service(content_addressed=True, multipart_chunk_mb=5)
+    service.client.head_object.side_effect = not_found
+    service.client.create_multipart_upload.return_value = {"UploadId": "u1"}
+    service.client.upload_part.return_value = {"ETag": "etag"}
+    digest = hashlib.sha256(b"x" * 6 * MB).hexdigest()
+
+    url = service.save_stream(ChunkedStream(6 * MB, MB), "clip0.mp4")
+
+    assert url == f"clips/content/{digest}.mp4"
+    staging_key = service.client.create_multipart_upload.call_args.kwargs["Key"]
+    service.client.complete_multipart_upload.assert_called_once()
+    copy = service.client.copy_object.call_args.kwargs
+    assert copy["Key"] == f"content/{digest}.mp4"
+    assert copy["CopySource"] == {"Bucket": "clips", "Key": staging_key}
+    service.client.delete_object.assert_called_once_with(Bucket="clips", Key=staging_key)
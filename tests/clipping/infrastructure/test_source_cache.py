@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.clipping.infrastructure.source_cache import SourceVideoCache
+
+
+def write_file(directory: str, name: str, size: int) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    return path
+
+
+def test_concurrent_requests_share_a_single_download(tmp_path):
+    cache = SourceVideoCache(root=str(tmp_path), max_bytes=10_000)
+    calls = []
+    lock = threading.Lock()
+
+    def download(directory: str) -> str:
+        with lock:
+            calls.append(directory)
+        time.sleep(0.05)
+        return write_file(directory, "abc.mp4", 100)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        paths = list(
+            executor.map(lambda _: cache.get_or_download("youtube:abc", download), range(8))
+        )
+
+    assert len(calls) == 1
+    assert len(set(paths)) == 1
+    assert os.path.getsize(paths[0]) == 100
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SourceVideoCache(root=str(tmp_path), max_bytes=250, min_idle_seconds=0)
+    first = cache.get_or_download("a", lambda d: write_file(d, "a.mp4", 100))
+    os.utime(os.path.dirname(first), (0, 0))
+    second = cache.get_or_download("b", lambda d: write_file(d, "b.mp4", 100))
+    third = cache.get_or_download("c", lambda d: write_file(d, "c.mp4", 100))
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+    assert os.path.exists(third)
+
+
+def test_failed_download_leaves_no_entry(tmp_path):
+    cache = SourceVideoCache(root=str(tmp_path))
+
+    def failing_download(directory: str) -> str:
+        write_file(directory, "partial.mp4", 10)
+        raise RuntimeError("network error")
+
+    try:
+        cache.get_or_download("x", failing_download)
+    except RuntimeError:
+        pass
+
+    assert [name for name in os.listdir(tmp_path) if not name.startswith(".")] == []
+
+
+def test_leased_entries_are_kept_until_released(tmp_path):
+    cache = SourceVideoCache(root=str(tmp_path), max_bytes=150, min_idle_seconds=0)
+    leased = cache.get_or_download("a", lambda d: write_file(d, "a.mp4", 100), lease="vid/job-1")
+    # Another job reading the same source holds its own lease
+    assert cache.get_or_download("a", lambda d: "", lease="vid/job-2") == leased
+    os.utime(os.path.dirname(leased), (0, 0))
+
+    cache.get_or_download("b", lambda d: write_file(d, "b.mp4", 100))
+    assert os.path.exists(leased)
+
+    cache.release(leased, "vid/job-1")
+    cache.evict()
+    assert os.path.exists(leased)
+
+    cache.release(leased, "vid/job-2")
+    cache.get_or_download("c", lambda d: write_file(d, "c.mp4", 100))
+    assert not os.path.exists(leased)
+
+
+def test_expired_leases_no_longer_protect_an_entry(tmp_path):
+    cache = SourceVideoCache(
+        root=str(tmp_path), max_bytes=150, min_idle_seconds=0, lease_seconds=3600
+    )
+    leased = cache.get_or_download("a", lambda d: write_file(d, "a.mp4", 100), lease="job-1")
+    entry_dir = os.path.dirname(leased)
+    for name in os.listdir(os.path.join(entry_dir, ".leases")):
+        os.utime(os.path.join(entry_dir, ".leases", name), (0, 0))
+    os.utime(entry_dir, (0, 0))
+
+    cache.get_or_download("b", lambda d: write_file(d, "b.mp4", 100))
+
+    assert not os.path.exists(leased)
+    # Files outside the cache hold no leases
+    cache.release("/videos/talk.mp4", "job-1")
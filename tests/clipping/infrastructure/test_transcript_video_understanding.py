@@ -0,0 +1,102 @@
+import json
+import asyncio
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+import pytest
+from google import genai
+from google.genai import types
+from app.clipping.infrastructure.async_gemini_video_understanding import (
+    AsyncGeminiVideoUnderstandingService,
+)
+from app.clipping.infrastructure.captions import parse_webvtt
+from app.clipping.infrastructure.gemini_rate_limiter import GeminiRateLimiter
+from app.clipping.infrastructure.transcript_video_understanding import (
+    TranscriptVideoUnderstandingService,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+VIDEO_URL = "https://youtu.be/dQw4w9WgXcQ"
+ANSWER = {
+    "highlights": [
+        {
+            "start_time": "01:02",
+            "end_time": "01:12",
+            "description": "The habit",
+            "time_format": "MM:SS",
+            "score": 80,
+        }
+    ]
+}
+
+
+@pytest.fixture(name="fake_model")
+def fake_model_fixture() -> Iterator[tuple[list[dict], genai.Client]]:
+    """
+    Local Gemini endpoint answering every generateContent request with ANSWER.
+    """
+    requests: list[dict] = []
+    body = json.dumps(
+        {"candidates": [{"content": {"role": "model", "parts": [{"text": json.dumps(ANSWER)}]}}]}
+    ).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # pylint: disable=invalid-name
+            requests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    client = genai.Client(
+        api_key="test-key",
+        http_options=types.HttpOptions(base_url=f"http://127.0.0.1:{server.server_port}"),
+    )
+    yield requests, client
+    server.shutdown()
+    server.server_close()
+
+
+def make_service(client: genai.Client, caption_lookup) -> TranscriptVideoUnderstandingService:
+    video_service = AsyncGeminiVideoUnderstandingService(
+        client,
+        rate_limiter=GeminiRateLimiter(requests_per_minute=1000, tokens_per_minute=10**7),
+        backoff_base=0.01,
+    )
+    return TranscriptVideoUnderstandingService(video_service, caption_lookup)
+
+
+def test_captioned_videos_are_analyzed_from_text_only(fake_model):
+    requests, client = fake_model
+    cues = parse_webvtt((FIXTURES / "talk.en.vtt").read_text())
+    service = make_service(client, lambda url: cues)
+
+    result = asyncio.run(service.analyze_video_highlights(VIDEO_URL, "habits"))
+
+    assert [(h.start_time, h.end_time) for h in result.highlights] == [("00:01:02", "00:01:12")]
+    parts = requests[0]["contents"][0]["parts"]
+    assert all(set(part) == {"text"} for part in parts)
+    assert "[00:01:02] Here's the one habit that changed everything." in parts[0]["text"]
+    assert "User specific requirements: habits" in parts[1]["text"]
+
+
+def test_videos_without_captions_fall_back_to_video_analysis(fake_model):
+    requests, client = fake_model
+    service = make_service(client, lambda url: None)
+
+    async def collect():
+        return [h async for h in service.iter_highlights(VIDEO_URL)]
+
+    highlights = asyncio.run(collect())
+
+    assert [h.description for h in highlights] == ["The habit"]
+    assert len(requests) == 1
+    assert requests[0]["contents"][0]["parts"][0]["fileData"]["fileUri"] == VIDEO_URL
@@ -0,0 +1,93 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from app.clipping.infrastructure import youtube_downloader
+from app.clipping.infrastructure.source_cache import SourceVideoCache
+
+
+def test_download_runs_once_and_returns_structured_result(tmp_path):
+    def extract_info(url, download):
+        filepath = os.path.join(download_dir_holder[0], "dQw4w9WgXcQ.mp4")
+        with open(filepath, "wb") as f:
+            f.write(b"video")
+        return {
+            "id": "dQw4w9WgXcQ",
+            "duration": 212,
+            "requested_downloads": [
+                {"filepath": filepath, "ext": "mp4", "vcodec": "avc1", "acodec": "mp4a"}
+            ],
+        }
+
+    download_dir_holder: list[str] = []
+    ydl = MagicMock()
+    ydl.__enter__.return_value = ydl
+    ydl.extract_info.side_effect = extract_info
+
+    def make_ydl(opts):
+        download_dir_holder.append(os.path.dirname(opts["outtmpl"]))
+        assert opts["concurrent_fragment_downloads"] == youtube_downloader.YTDL_CONCURRENT_FRAGMENTS
+        return ydl
+
+    cache = SourceVideoCache(root=str(tmp_path))
+    with patch.object(youtube_downloader, "YoutubeDL", side_effect=make_ydl), patch.object(
+        youtube_downloader, "source_cache", cache
+    ):
+        first = youtube_downloader.download_youtube_video("https://youtu.be/dQw4w9WgXcQ")
+        second = youtube_downloader.download_youtube_video(
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        )
+
+    ydl.extract_info.assert_called_once()
+    ydl.download.assert_not_called()
+    assert first == second
+    assert first.path.startswith(str(tmp_path))
+    assert os.path.exists(first.path)
+    assert first.duration == 212
+    assert (first.container, first.video_codec, first.audio_codec) == ("mp4", "avc1", "mp4a")
+
+
+def test_video_duration_is_read_without_downloading():
+    ydl = MagicMock()
+    ydl.__enter__.return_value = ydl
+    ydl.extract_info.return_value = {"id": "dQw4w9WgXcQ", "duration": 10800}
+
+    with patch.object(youtube_downloader, "YoutubeDL", return_value=ydl):
+        duration = youtube_downloader.fetch_video_duration("https://youtu.be/dQw4w9WgXcQ")
+        ydl.extract_info.side_effect = RuntimeError("private video")
+        missing = youtube_downloader.fetch_video_duration("https://youtu.be/dQw4w9WgXcQ")
+
+    assert duration == 10800
+    assert ydl.extract_info.call_args.kwargs == {"download": False}
+    assert missing is None
+
+
+def test_original_language_auto_captions_are_fetched_without_downloading():
+    captions = (Path(__file__).parent / "fixtures" / "talk.auto.en.vtt").read_bytes()
+    ydl = MagicMock()
+    ydl.__enter__.return_value = ydl
+    ydl.extract_info.return_value = {
+        "id": "dQw4w9WgXcQ",
+        "language": "en",
+        "subtitles": {"live_chat": [{"ext": "json", "url": "https://chat"}]},
+        "automatic_captions": {
+            "de": [{"ext": "vtt", "url": "https://captions/de"}],
+            "en-orig": [
+                {"ext": "json3", "url": "https://captions/en.json3"},
+                {"ext": "vtt", "url": "https://captions/en.vtt"},
+            ],
+        },
+    }
+    ydl.urlopen.return_value.read.return_value = captions
+
+    with patch.object(youtube_downloader, "YoutubeDL", return_value=ydl):
+        cues = youtube_downloader.fetch_captions("https://youtu.be/dQw4w9WgXcQ")
+        ydl.extract_info.return_value = {"id": "dQw4w9WgXcQ", "automatic_captions": {}}
+        missing = youtube_downloader.fetch_captions("https://youtu.be/dQw4w9WgXcQ")
+
+    ydl.urlopen.assert_called_once_with("https://captions/en.vtt")
+    assert [cue.text for cue in cues] == [
+        "so today we're talking about",
+        "sleep and why it matters",
+        "[Music]",
+    ]
+    assert missing is None
@@ -0,0 +1,26 @@
+import sys
+import json
+import subprocess
+from app.clipping import dependencies
+from app.clipping.infrastructure.r2_storage import R2StorageService
+
+HEAVY_MODULES = ["boto3", "google.genai", "firebase_admin", "yt_dlp", "moviepy"]
+
+
+def test_importing_entry_points_loads_no_heavy_sdks():
+    probe = (
+        "import sys, json, app.main.app, app.clipping.tasks\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", probe], check=True, capture_output=True, text=True
+    ).stdout
+
+    assert json.loads(output) == []
+
+
+def test_providers_build_each_adapter_once():
+    storage = dependencies.get_storage_service()
+
+    assert isinstance(storage, R2StorageService)
+    assert dependencies.get_storage_service() is storage
@@ -0,0 +1,216 @@
+from typing import Optional
+from unittest.mock import MagicMock
+import pytest
+from celery import chord as celery_chord
+from celery.utils import worker_direct
+from celery_worker import celery_app
+from app.clipping import tasks
+from app.clipping.use_cases.clip_video import ClipVideoFromHighlightsUseCase
+from app.clipping.domain.video_understanding import (
+    DownloadResult,
+    GeneratedClip,
+    Highlight,
+    HighlightsResponse,
+    TimeRange,
+    source_video_id,
+)
+from tests.clipping.helpers import spaced_highlights
+
+VIDEO_URL = "https://youtu.be/dQw4w9WgXcQ"
+
+
+@pytest.fixture(name="eager", autouse=True)
+def eager_fixture():
+    """
+    Run the workflow in process. Exceptions aren't propagated, so autoretry
+    re-runs a failed task the way a worker would.
+    """
+    previous = {
+        key: celery_app.conf[key]
+        for key in ("task_always_eager", "task_eager_propagates", "result_backend")
+    }
+    celery_app.conf.update(
+        task_always_eager=True, task_eager_propagates=False, result_backend="cache+memory://"
+    )
+    yield
+    celery_app.conf.update(previous)
+
+
+class Workflow:
+    """
+    A worker use case with fake services, recording every download and clip.
+    """
+
+    def __init__(self, download_failures: int = 0):
+        self.downloads = 0
+        self.download_failures = download_failures
+        self.clipped: list[tuple[str, Optional[str]]] = []
+        self.refined: list[list[str]] = []
+        self.leases: list[str] = []
+        self.released: list[tuple[str, str]] = []
+        understanding = MagicMock()
+        understanding.analyze_video_highlights.return_value = spaced_highlights(2)
+        clipper = MagicMock()
+        clipper.streams_clips = False
+        clipper.iter_clips.side_effect = self.iter_clips
+        refiner = MagicMock()
+        refiner.refine.side_effect = self.refine
+        storage = MagicMock()
+        storage.save_video.side_effect = lambda path, key_prefix=None: f"bucket/{path}"
+        self.highlight_repository = MagicMock()
+        self.clip_url_repository = MagicMock()
+        self.use_case = ClipVideoFromHighlightsUseCase(
+            understanding,
+            clipper,
+            storage,
+            self.highlight_repository,
+            self.clip_url_repository,
+            download_video=self.download,
+            boundary_refiner=refiner,
+            release_source=lambda path, lease: self.released.append((path, lease)),
+        )
+
+    def download(self, url, cancel_event=None, lease=None):
+        self.downloads += 1
+        self.leases.append(lease)
+        if self.downloads <= self.download_failures:
+            raise ConnectionError("connection reset")
+        return DownloadResult(path="/sources/dQw4w9WgXcQ.mp4", duration=60.0)
+
+    def refine(self, source_path, highlights):
+        """
+        Push every end a second later.
+        """
+        self.refined.append([h.id for h in highlights.highlights])
+        return HighlightsResponse(
+            highlights=[
+                h.model_copy(
+                    update={
+                        "time_range": TimeRange(start=h.time_range.start, end=h.time_range.end + 1)
+                    }
+                )
+                for h in highlights.highlights
+            ]
+        )
+
+    def iter_clips(self, path, highlights, out_dir=None):
+        for h in highlights.highlights:
+            self.clipped.append((h.id, h.end_time))
+            yield GeneratedClip(highlight_id=h.id, path=f"{h.id}.mp4")
+
+
+def run_workflow(monkeypatch, workflow: Workflow):
+    monkeypatch.setattr(tasks, "get_worker_use_case", lambda: workflow.use_case)
+    return tasks.process_clip_video_task.apply(args=(VIDEO_URL,))
+
+
+def test_workflow_fans_out_one_clip_task_per_highlight_and_persists(monkeypatch):
+    workflow = Workflow()
+    chords = []
+
+    def recording_chord(header, body):
+        chords.append((list(header), body))
+        return celery_chord(header, body)
+
+    monkeypatch.setattr(tasks, "chord", recording_chord)
+
+    result = run_workflow(monkeypatch, workflow)
+
+    assert result.successful(), result.traceback
+    assert result.get()["clips"] == ["bucket/h0.mp4", "bucket/h1.mp4"]
+    (header, body), = chords
+    assert [sig.task for sig in header] == [tasks.clip_highlight_task.name] * 2
+    assert [sig.args[1]["id"] for sig in header] == ["h0", "h1"]
+    # Refined once for all highlights, before the fan-out
+    assert workflow.refined == [["h0", "h1"]]
+    assert [sig.args[1]["end_time"] for sig in header] == ["00:00:06", "00:00:16"]
+    assert body.task == tasks.persist_clips_task.name
+    # Released even if a clip task or persist fails
+    release, = body.options["link_error"]
+    assert release.task == tasks.release_source_task.name
+    assert list(release.args) == ["/sources/dQw4w9WgXcQ.mp4", f"dQw4w9WgXcQ/{result.id}"]
+    assert sorted(workflow.clipped) == [("h0", "00:00:06"), ("h1", "00:00:16")]
+    workflow.clip_url_repository.save_clip_urls.assert_called_once_with(
+        "dQw4w9WgXcQ", {"h0": "bucket/h0.mp4", "h1": "bucket/h1.mp4"}
+    )
+    # The source is leased for the job until its clips are saved
+    key_prefix = f"dQw4w9WgXcQ/{result.id}"
+    assert workflow.leases == [key_prefix]
+    assert workflow.released == [("/sources/dQw4w9WgXcQ.mp4", key_prefix)]
+
+
+def test_clip_tasks_are_routed_to_the_worker_holding_the_source(monkeypatch):
+    monkeypatch.setattr(tasks, "SHARED_SOURCE_VOLUME", False)
+    monkeypatch.setattr(tasks, "worker_nodename", "celery@node-1")
+    headers = []
+    monkeypatch.setattr(
+        tasks,
+        "chord",
+        lambda header, body: headers.append(list(header)) or celery_chord(header, body),
+    )
+
+    run_workflow(monkeypatch, Workflow())
+
+    queue = worker_direct("celery@node-1")
+    for sig in headers[0]:
+        assert sig.options["routing_key"] == queue.routing_key
+        assert sig.options["exchange"] == queue.exchange.name
+
+
+def test_clip_routing_uses_the_clipping_queue_with_a_shared_volume(monkeypatch):
+    monkeypatch.setattr(tasks, "SHARED_SOURCE_VOLUME", True)
+
+    assert tasks.clip_routing("celery@node-1") == {}
+    monkeypatch.setattr(tasks, "SHARED_SOURCE_VOLUME", False)
+    assert tasks.clip_routing(None) == {}
+
+
+def test_persist_merges_clip_results_in_highlight_order(monkeypatch):
+    workflow = Workflow()
+    monkeypatch.setattr(tasks, "get_worker_use_case", lambda: workflow.use_case)
+    highlights = workflow.use_case.analyze(VIDEO_URL)
+    highlights.folded = {"h2": "h1"}
+    clip_results = [
+        # Results arrive in chord completion order; untimed highlights yield None
+        ["h1", "bucket/h1.mp4"],
+        None,
+        ["h0", "bucket/h0.mp4"],
+    ]
+
+    result = tasks.persist_clips_task.apply(
+        args=(clip_results, VIDEO_URL, highlights.model_dump(), "/sources/a.mp4", "vid/job-1")
+    ).get()
+
+    assert result["clips"] == ["bucket/h0.mp4", "bucket/h1.mp4"]
+    saved = workflow.highlight_repository.save_highlights.call_args.args[1]
+    assert saved == highlights
+    workflow.clip_url_repository.save_clip_urls.assert_called_once_with(
+        "dQw4w9WgXcQ", {"h0": "bucket/h0.mp4", "h1": "bucket/h1.mp4", "h2": "bucket/h1.mp4"}
+    )
+
+
+def test_failed_stage_is_retried_alone(monkeypatch):
+    workflow = Workflow(download_failures=1)
+
+    result = run_workflow(monkeypatch, workflow)
+
+    assert result.successful(), result.traceback
+    assert workflow.downloads == 2
+    workflow.use_case.video_understanding_service.analyze_video_highlights.assert_called_once()
+    assert sorted(h for h, _ in workflow.clipped) == ["h0", "h1"]
+
+
+def test_local_source_runs_through_the_workflow(monkeypatch):
+    workflow = Workflow()
+    monkeypatch.setattr(tasks, "get_worker_use_case", lambda: workflow.use_case)
+
+    result = tasks.process_clip_video_task.apply(args=("/videos/talk.mp4",))
+
+    assert result.successful(), result.traceback
+    video_id = source_video_id("/videos/talk.mp4")
+    assert result.get()["video_id"] == video_id
+    # Used in place, never downloaded
+    assert workflow.downloads == 0
+    workflow.clip_url_repository.save_clip_urls.assert_called_once_with(
+        video_id, {"h0": "bucket/h0.mp4", "h1": "bucket/h1.mp4"}
+    )
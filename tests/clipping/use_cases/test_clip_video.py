@@ -1,38 +1,38 @@
 from unittest.mock import MagicMock
+import io
+import os
+import threading
+from contextlib import contextmanager
 import typing
 import pytest
 from app.clipping.use_cases.clip_video import ClipVideoFromHighlightsUseCase
 from app.clipping.domain.video_understanding import (
     ClipResult,
+    ClipStream,
+    DownloadResult,
+    GeneratedClip,
     HighlightsResponse,
     Highlight,
+    source_video_id,
 )
-
-
-@pytest.fixture
-def mock_services_fixture():
-    video_understanding_service = MagicMock()
-    video_clipper_service = MagicMock()
-    storage_service = MagicMock()
-    highlight_repository = MagicMock()
-    return (
-        video_understanding_service,
-        video_clipper_service,
-        storage_service,
-        highlight_repository,
-    )
+from app.clipping.domain.time_ranges import SourceSection, TimeRange
+from app.clipping.infrastructure.job_workspace import LocalJobWorkspaceProvider
+from tests.clipping.helpers import make_highlight, spaced_highlights
 
 
 def test_clip_video_from_highlights_use_case(
-    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock],
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
 ):
     (
         video_understanding_service,
         video_clipper_service,
         storage_service,
         highlight_repository,
+        clip_url_repository,
     ) = mock_services_fixture
-    video_url = "test.mp4"
+    video_url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    local_video_path = "/tmp/dQw4w9WgXcQ.mp4"
     prompt = "Find highlights"
     highlights = HighlightsResponse(
         highlights=[
@@ -45,27 +45,573 @@ def test_clip_video_from_highlights_use_case(
     clip_urls = ["https://storage/test_clip0.mp4"]
 
     video_understanding_service.analyze_video_highlights.return_value = highlights
-    video_clipper_service.clip_video.return_value = clip_paths
-    storage_service.save_video.side_effect = lambda path: clip_urls[
+    video_clipper_service.iter_clips.return_value = [
+        GeneratedClip(highlight_id="asda", path=clip_paths[0])
+    ]
+    storage_service.save_video.side_effect = lambda path, key_prefix=None: clip_urls[
         clip_paths.index(path)
     ]
 
-    use_case = ClipVideoFromHighlightsUseCase(
-        video_understanding_service,
-        video_clipper_service,
-        storage_service,
-        highlight_repository,
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(path=local_video_path),
     )
 
-    result = use_case.execute(video_url, prompt)
+    result = use_case.execute(video_url, prompt, job_id="job-1")
 
     video_understanding_service.analyze_video_highlights.assert_called_once_with(
         video_url, prompt
     )
-    video_clipper_service.clip_video.assert_called_once_with(video_url, highlights)
-    storage_service.save_video.assert_called_once_with(clip_paths[0])
-    highlight_repository.save_highlights.assert_called_once_with(video_url, highlights)
+    video_clipper_service.iter_clips.assert_called_once_with(
+        local_video_path, highlights, out_dir=None
+    )
+    storage_service.save_video.assert_called_once_with(clip_paths[0], "dQw4w9WgXcQ/job-1")
+    highlight_repository.save_highlights.assert_called_once_with("dQw4w9WgXcQ", highlights)
+    clip_url_repository.save_clip_urls.assert_called_once_with(
+        "dQw4w9WgXcQ", {"asda": clip_urls[0]}
+    )
 
     assert isinstance(result, ClipResult)
     assert result.clips == clip_urls
     assert result.highlights == highlights.model_dump()
+
+
+@pytest.mark.parametrize(
+    "video_url", ["/videos/talk.mp4", "https://cdn.example.com/talks/keynote.mp4"]
+)
+def test_non_youtube_sources_are_clipped_in_place(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+    video_url: str,
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    highlights = HighlightsResponse(
+        highlights=[make_highlight("a", "00:00", "00:10")]
+    )
+    video_understanding_service.analyze_video_highlights.return_value = highlights
+    video_clipper_service.iter_clips.return_value = [
+        GeneratedClip(highlight_id="a", path="/tmp/talk_clip_a.mp4")
+    ]
+    storage_service.save_video.return_value = "bucket/talk_clip_a.mp4"
+    download = MagicMock()
+    use_case = make_use_case(
+        download_video=download,
+    )
+
+    result = use_case.execute(video_url, job_id="job-1")
+
+    video_id = source_video_id(video_url)
+    download.assert_not_called()
+    video_clipper_service.iter_clips.assert_called_once_with(video_url, highlights, out_dir=None)
+    storage_service.save_video.assert_called_once_with(
+        "/tmp/talk_clip_a.mp4", f"{video_id}/job-1"
+    )
+    highlight_repository.save_highlights.assert_called_once_with(video_id, highlights)
+    assert result.video_id == video_id
+
+
+def test_analysis_and_download_run_concurrently(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    download_started = threading.Event()
+    highlights = HighlightsResponse(
+        highlights=[make_highlight("a", "00:00", "00:10")]
+    )
+
+    def analyze(video_url, prompt):
+        # Only returns if the download was started before analysis finished
+        assert download_started.wait(timeout=5)
+        return highlights
+
+    def download(url, cancel_event=None):
+        download_started.set()
+        return DownloadResult(path="/tmp/source.mp4")
+
+    video_understanding_service.analyze_video_highlights.side_effect = analyze
+    video_clipper_service.iter_clips.return_value = [
+        GeneratedClip(highlight_id="a", path="/tmp/source_clip0.mp4")
+    ]
+    storage_service.save_video.return_value = "bucket/source_clip0.mp4"
+
+    use_case = make_use_case(
+        download_video=download,
+    )
+    result = use_case.execute("https://youtu.be/dQw4w9WgXcQ")
+
+    video_clipper_service.iter_clips.assert_called_once_with(
+        "/tmp/source.mp4", highlights, out_dir=None
+    )
+    assert result.clips == ["bucket/source_clip0.mp4"]
+
+
+def test_download_is_cancelled_when_no_highlights_are_found(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    cancelled = threading.Event()
+
+    def download(url, cancel_event=None):
+        assert cancel_event is not None
+        if cancel_event.wait(timeout=5):
+            cancelled.set()
+            raise RuntimeError("cancelled")
+        return DownloadResult(path="/tmp/source.mp4")
+
+    video_understanding_service.analyze_video_highlights.return_value = HighlightsResponse(
+        highlights=[]
+    )
+    use_case = make_use_case(
+        download_video=download,
+    )
+
+    with pytest.raises(RuntimeError, match="No highlights"):
+        use_case.execute("https://youtu.be/dQw4w9WgXcQ")
+
+    assert cancelled.wait(timeout=5)
+    video_clipper_service.iter_clips.assert_not_called()
+
+
+def test_section_download_clips_rebased_highlights_in_order(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    highlights = HighlightsResponse(
+        highlights=[
+            make_highlight("late", "01:00:00", "01:00:20"),
+            make_highlight("early", "00:00:10", "00:00:30"),
+        ]
+    )
+    video_understanding_service.analyze_video_highlights.return_value = highlights
+    download_video = MagicMock()
+    requested_sections = []
+
+    def download_sections(url, sections, download_dir=None):
+        requested_sections.extend(sections)
+        return [
+            SourceSection(path=f"/tmp/section{i}.mp4", time_range=section)
+            for i, section in enumerate(sections)
+        ]
+
+    video_clipper_service.iter_clips.side_effect = lambda path, hs, out_dir=None: [
+        GeneratedClip(highlight_id=h.id, path=f"{path}:{h.id}@{h.start_time}")
+        for h in hs.highlights
+    ]
+    storage_service.save_video.side_effect = lambda path, key_prefix=None: f"url:{path}"
+
+    use_case = make_use_case(
+        download_video=download_video,
+        download_sections=download_sections,
+        section_download=True,
+        section_padding_seconds=2,
+    )
+    result = use_case.execute("https://youtu.be/dQw4w9WgXcQ")
+
+    download_video.assert_not_called()
+    assert requested_sections == [TimeRange(start=8, end=32), TimeRange(start=3598, end=3622)]
+    assert result.clips == [
+        "url:/tmp/section1.mp4:late@00:00:02",
+        "url:/tmp/section0.mp4:early@00:00:02",
+    ]
+
+
+def test_clips_are_mapped_to_highlights_regardless_of_completion_order(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    highlights = spaced_highlights(3)
+    video_understanding_service.analyze_video_highlights.return_value = highlights
+    # The clipper finishes the last highlight first
+    video_clipper_service.iter_clips.return_value = [
+        GeneratedClip(highlight_id=f"h{i}", path=f"/tmp/clip{i}.mp4") for i in (2, 0, 1)
+    ]
+    storage_service.save_video.side_effect = (
+        lambda path, key_prefix=None: f"bucket/{path.rsplit('/', 1)[-1]}"
+    )
+
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(path="/tmp/source.mp4"),
+    )
+    result = use_case.execute("https://youtu.be/dQw4w9WgXcQ")
+
+    assert result.clips == ["bucket/clip0.mp4", "bucket/clip1.mp4", "bucket/clip2.mp4"]
+    clip_url_repository.save_clip_urls.assert_called_once_with(
+        "dQw4w9WgXcQ",
+        {"h0": "bucket/clip0.mp4", "h1": "bucket/clip1.mp4", "h2": "bucket/clip2.mp4"},
+    )
+
+
+def test_stream_uploads_pipe_clips_into_storage(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    highlights = spaced_highlights(2)
+    video_understanding_service.analyze_video_highlights.return_value = highlights
+    closed = []
+
+    def stream_for(i: int):
+        @contextmanager
+        def open_stream():
+            yield io.BytesIO(f"clip{i}".encode())
+            closed.append(i)
+
+        return ClipStream(highlight_id=f"h{i}", filename=f"clip{i}.mp4", open_stream=open_stream)
+
+    video_clipper_service.streams_clips = True
+    video_clipper_service.iter_clip_streams.return_value = [stream_for(i) for i in range(2)]
+    storage_service.save_stream.side_effect = (
+        lambda stream, filename, key_prefix=None: f"bucket/{key_prefix}/{stream.read().decode()}"
+    )
+
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(path="/tmp/source.mp4"),
+        stream_uploads=True,
+    )
+    result = use_case.execute("https://youtu.be/dQw4w9WgXcQ", job_id="job-1")
+
+    assert result.clips == ["bucket/dQw4w9WgXcQ/job-1/clip0", "bucket/dQw4w9WgXcQ/job-1/clip1"]
+    video_clipper_service.iter_clip_streams.assert_called_once_with("/tmp/source.mp4", highlights)
+    video_clipper_service.iter_clips.assert_not_called()
+    storage_service.save_video.assert_not_called()
+    assert sorted(closed) == [0, 1]
+
+
+def test_stages_can_run_separately(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    highlights = spaced_highlights(2)
+    video_understanding_service.analyze_video_highlights.return_value = highlights
+    video_clipper_service.iter_clips.side_effect = lambda path, hs, out_dir=None: [
+        GeneratedClip(highlight_id=h.id, path=f"/tmp/{h.id}.mp4") for h in hs.highlights
+    ]
+    storage_service.save_video.side_effect = lambda path, key_prefix=None: f"{key_prefix}/{path}"
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(path="/tmp/source.mp4"),
+    )
+    video_url = "https://youtu.be/dQw4w9WgXcQ"
+
+    analyzed = use_case.analyze(video_url)
+    source = use_case.download(video_url)
+    key_prefix = use_case.key_prefix(video_url, "job-1")
+    # Clip tasks may finish in any order
+    urls = {
+        h.id: use_case.clip_highlight(source.path, h, key_prefix)
+        for h in reversed(analyzed.highlights)
+    }
+    result = use_case.persist(video_url, analyzed, urls)
+
+    assert key_prefix == "dQw4w9WgXcQ/job-1"
+    assert result.clips == ["dQw4w9WgXcQ/job-1//tmp/h0.mp4", "dQw4w9WgXcQ/job-1//tmp/h1.mp4"]
+    assert video_clipper_service.iter_clips.call_count == 2
+    highlight_repository.save_highlights.assert_called_once_with("dQw4w9WgXcQ", highlights)
+
+
+def test_persist_saves_job_result_in_one_unit_of_work(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    job_result_repository = MagicMock()
+    highlights = spaced_highlights(2)
+    use_case = make_use_case(
+        job_result_repository=job_result_repository,
+    )
+
+    result = use_case.persist(
+        "https://youtu.be/dQw4w9WgXcQ", highlights, {"h1": "bucket/h1.mp4", "h0": "bucket/h0.mp4"}
+    )
+
+    assert result.clips == ["bucket/h0.mp4", "bucket/h1.mp4"]
+    job_result_repository.save_job_result.assert_called_once_with(
+        "dQw4w9WgXcQ", highlights, {"h0": "bucket/h0.mp4", "h1": "bucket/h1.mp4"}
+    )
+    highlight_repository.save_highlights.assert_not_called()
+    clip_url_repository.save_clip_urls.assert_not_called()
+
+
+def test_streamed_highlights_are_clipped_while_analysis_continues(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    first_uploaded = threading.Event()
+    highlights = spaced_highlights(2).highlights
+
+    def iter_highlights(video_url, prompt=None):
+        yield highlights[0]
+        # The second highlight is only "generated" once the first clip is uploaded
+        assert first_uploaded.wait(timeout=5)
+        yield highlights[1]
+
+    def save_video(path, key_prefix=None):
+        first_uploaded.set()
+        return f"bucket/{path}"
+
+    video_understanding_service.iter_highlights.side_effect = iter_highlights
+    video_clipper_service.streams_clips = False
+    video_clipper_service.iter_clips.side_effect = lambda path, hs, out_dir=None: [
+        GeneratedClip(highlight_id=h.id, path=f"/tmp/{h.id}.mp4") for h in hs.highlights
+    ]
+    storage_service.save_video.side_effect = save_video
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(path="/tmp/source.mp4"),
+        stream_highlights=True,
+    )
+
+    result = use_case.execute("https://youtu.be/dQw4w9WgXcQ")
+
+    assert result.clips == ["bucket//tmp/h0.mp4", "bucket//tmp/h1.mp4"]
+    video_understanding_service.analyze_video_highlights.assert_not_called()
+    highlight_repository.save_highlights.assert_called_once_with(
+        "dQw4w9WgXcQ", HighlightsResponse(highlights=highlights)
+    )
+    assert video_clipper_service.iter_clips.call_count == 2
+
+
+def test_streaming_folds_later_duplicates_and_cuts_later_containers(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    video_understanding_service.iter_highlights.return_value = iter(
+        [
+            make_highlight("a", "00:00:10", "00:00:30"),
+            make_highlight("dup", "00:00:11", "00:00:31"),
+            make_highlight("nested", "00:00:15", "00:00:20"),
+            make_highlight("wide", "00:00:05", "00:00:50"),
+        ]
+    )
+    video_clipper_service.streams_clips = False
+    video_clipper_service.iter_clips.side_effect = lambda path, hs, out_dir=None: [
+        GeneratedClip(highlight_id=h.id, path=f"/tmp/{h.id}.mp4") for h in hs.highlights
+    ]
+    storage_service.save_video.side_effect = lambda path, key_prefix=None: f"bucket/{path}"
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(
+            path="/tmp/source.mp4", duration=60.0
+        ),
+        stream_highlights=True,
+    )
+
+    result = use_case.execute("https://youtu.be/dQw4w9WgXcQ")
+
+    # A clip already being cut can't be widened, so the container gets its own
+    assert result.clips == ["bucket//tmp/a.mp4", "bucket//tmp/wide.mp4"]
+    clip_url_repository.save_clip_urls.assert_called_once_with(
+        "dQw4w9WgXcQ",
+        {
+            "a": "bucket//tmp/a.mp4",
+            "wide": "bucket//tmp/wide.mp4",
+            "dup": "bucket//tmp/a.mp4",
+            "nested": "bucket//tmp/a.mp4",
+        },
+    )
+
+
+def test_highlights_are_refined_before_clipping_and_saved_as_cut(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    highlight = make_highlight("h0", "00:00:04", "00:00:07")
+    snapped = highlight.model_copy(update={"time_range": TimeRange(start=3.5, end=6.5)})
+    video_understanding_service.analyze_video_highlights.return_value = HighlightsResponse(
+        highlights=[highlight]
+    )
+    refiner = MagicMock()
+    refiner.refine.return_value = HighlightsResponse(highlights=[snapped])
+    video_clipper_service.streams_clips = False
+    video_clipper_service.iter_clips.return_value = [
+        GeneratedClip(highlight_id="h0", path="/tmp/h0.mp4")
+    ]
+    storage_service.save_video.return_value = "https://storage/h0.mp4"
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(path="/tmp/source.mp4"),
+        boundary_refiner=refiner,
+    )
+
+    use_case.execute("https://youtu.be/dQw4w9WgXcQ")
+
+    refiner.refine.assert_called_once_with(
+        "/tmp/source.mp4", HighlightsResponse(highlights=[highlight])
+    )
+    video_clipper_service.iter_clips.assert_called_once_with(
+        "/tmp/source.mp4", HighlightsResponse(highlights=[snapped]), out_dir=None
+    )
+    highlight_repository.save_highlights.assert_called_once_with(
+        "dQw4w9WgXcQ", HighlightsResponse(highlights=[snapped])
+    )
+
+
+def test_duplicate_and_out_of_range_highlights_are_cut_once(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    video_understanding_service.analyze_video_highlights.return_value = HighlightsResponse(
+        highlights=[
+            make_highlight("a", "00:00:10", "00:00:30"),
+            make_highlight("dup", "00:00:11", "00:00:30"),
+            make_highlight("nested", "00:00:15", "00:00:20"),
+            make_highlight("tail", "00:00:50", "00:01:30"),
+            make_highlight("past", "00:02:00", "00:02:10"),
+        ]
+    )
+    video_clipper_service.streams_clips = False
+    video_clipper_service.iter_clips.side_effect = lambda path, hs, out_dir=None: [
+        GeneratedClip(highlight_id=h.id, path=f"/tmp/{h.id}.mp4") for h in hs.highlights
+    ]
+    storage_service.save_video.side_effect = lambda path, key_prefix=None: f"bucket/{path}"
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(
+            path="/tmp/source.mp4", duration=60.0
+        ),
+    )
+
+    result = use_case.execute("https://youtu.be/dQw4w9WgXcQ")
+
+    cut = video_clipper_service.iter_clips.call_args.args[1].highlights
+    assert [(h.id, h.start_time, h.end_time) for h in cut] == [
+        ("a", "00:00:10", "00:00:30"),
+        ("tail", "00:00:50", "00:01:00"),
+    ]
+    assert result.clips == ["bucket//tmp/a.mp4", "bucket//tmp/tail.mp4"]
+    assert storage_service.save_video.call_count == 2
+    # Folded highlights are still found under their own IDs
+    clip_url_repository.save_clip_urls.assert_called_once_with(
+        "dQw4w9WgXcQ",
+        {
+            "a": "bucket//tmp/a.mp4",
+            "tail": "bucket//tmp/tail.mp4",
+            "dup": "bucket//tmp/a.mp4",
+            "nested": "bucket//tmp/a.mp4",
+        },
+    )
+
+
+def test_clips_are_cut_into_a_job_workspace_removed_afterwards(
+    mock_services_fixture: typing.Tuple[MagicMock, MagicMock, MagicMock, MagicMock, MagicMock],
+    make_use_case: typing.Callable[..., ClipVideoFromHighlightsUseCase],
+    tmp_path,
+):
+    (
+        video_understanding_service,
+        video_clipper_service,
+        storage_service,
+        highlight_repository,
+        clip_url_repository,
+    ) = mock_services_fixture
+    video_understanding_service.analyze_video_highlights.return_value = HighlightsResponse(
+        highlights=[
+            make_highlight("h0", "00:00:00", "00:00:05")
+        ]
+    )
+
+    def iter_clips(path, highlights, out_dir=None):
+        for h in highlights.highlights:
+            clip_path = os.path.join(out_dir, f"{h.id}.mp4")
+            with open(clip_path, "wb") as f:
+                f.write(b"clip")
+            yield GeneratedClip(highlight_id=h.id, path=clip_path)
+
+    uploaded = []
+    video_clipper_service.streams_clips = False
+    video_clipper_service.iter_clips.side_effect = iter_clips
+    storage_service.save_video.side_effect = lambda path, key_prefix=None: (
+        uploaded.append(path) or "bucket/h0.mp4"
+    )
+    workspaces = LocalJobWorkspaceProvider(root=str(tmp_path / "jobs"), min_free_bytes=0)
+    use_case = make_use_case(
+        download_video=lambda url, cancel_event=None: DownloadResult(path="/tmp/source.mp4"),
+        workspace_provider=workspaces,
+    )
+
+    result = use_case.execute("https://youtu.be/dQw4w9WgXcQ", job_id="job-1")
+
+    assert result.clips == ["bucket/h0.mp4"]
+    assert os.path.dirname(os.path.dirname(uploaded[0])) == workspaces.root
+    assert os.listdir(workspaces.root) == []
+
+    # Without a checkpoint store no retry could find a failed job's clips
+    storage_service.save_video.side_effect = RuntimeError("upload failed")
+    with pytest.raises(RuntimeError):
+        use_case.execute("https://youtu.be/dQw4w9WgXcQ", job_id="job-2")
+    assert os.listdir(workspaces.root) == []
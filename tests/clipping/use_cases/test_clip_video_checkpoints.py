@@ -0,0 +1,185 @@
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+from unittest.mock import MagicMock
+import pytest
+from app.clipping.use_cases.clip_video import ClipVideoFromHighlightsUseCase, NoHighlightsError
+from app.clipping.infrastructure.checkpoint_store import FileCheckpointStore
+from app.clipping.infrastructure.job_workspace import LocalJobWorkspaceProvider
+from app.clipping.domain.video_understanding import DownloadResult, GeneratedClip
+from tests.clipping.helpers import spaced_highlights
+
+VIDEO_URL = "https://youtu.be/dQw4w9WgXcQ"
+STAGES = ["analyze", "download", "clip:h1", "upload:h1", "save_highlights", "save_clip_urls"]
+
+
+class FlakyPipeline:
+    """Fake services that count every call and fail `fail_stage` once."""
+
+    def __init__(
+        self, tmp_path, fail_stage: Optional[str], error: type[Exception] = RuntimeError
+    ):
+        self.tmp_path = tmp_path
+        self.fail_stage = fail_stage
+        self.error = error
+        self.calls: Counter[str] = Counter()
+
+    def step(self, stage: str) -> None:
+        self.calls[stage] += 1
+        if stage == self.fail_stage:
+            self.fail_stage = None
+            raise self.error(f"{stage} failed")
+
+    def analyze(self, video_url, prompt):
+        self.step("analyze")
+        return spaced_highlights(2)
+
+    def download(self, video_url, cancel_event=None):
+        self.step("download")
+        path = self.tmp_path / "source.mp4"
+        path.write_bytes(b"source video")
+        return DownloadResult(path=str(path))
+
+    def iter_clips(self, video_path, highlights, out_dir=None):
+        for h in highlights.highlights:
+            self.step(f"clip:{h.id}")
+            path = Path(out_dir or self.tmp_path) / f"{h.id}.mp4"
+            path.write_bytes(h.id.encode())
+            yield GeneratedClip(highlight_id=h.id, path=str(path))
+
+    def save_video(self, path, key_prefix=None):
+        self.step(f"upload:{path.rsplit('/', 1)[-1][:-4]}")
+        return f"bucket/{key_prefix}/{path.rsplit('/', 1)[-1]}"
+
+    def use_case(self, store, workspace_provider=None) -> ClipVideoFromHighlightsUseCase:
+        video_understanding_service = MagicMock()
+        video_understanding_service.analyze_video_highlights.side_effect = self.analyze
+        video_clipper_service = MagicMock()
+        video_clipper_service.iter_clips.side_effect = self.iter_clips
+        storage_service = MagicMock()
+        storage_service.save_video.side_effect = self.save_video
+        highlight_repository = MagicMock()
+        highlight_repository.save_highlights.side_effect = (
+            lambda *args: self.step("save_highlights")
+        )
+        clip_url_repository = MagicMock()
+        clip_url_repository.save_clip_urls.side_effect = lambda *args: self.step("save_clip_urls")
+        return ClipVideoFromHighlightsUseCase(
+            video_understanding_service,
+            video_clipper_service,
+            storage_service,
+            highlight_repository,
+            clip_url_repository,
+            download_video=self.download,
+            checkpoint_store=store,
+            workspace_provider=workspace_provider,
+        )
+
+
+@pytest.mark.parametrize("fail_stage", STAGES)
+def test_retry_resumes_after_failed_stage(tmp_path, fail_stage):
+    pipeline = FlakyPipeline(tmp_path, fail_stage)
+    store = FileCheckpointStore(str(tmp_path / "checkpoints"))
+
+    with pytest.raises(RuntimeError, match=f"{fail_stage} failed"):
+        pipeline.use_case(store).execute(VIDEO_URL, "prompt", job_id="job-1")
+    # A fresh use case, as on another worker after a restart
+    result = pipeline.use_case(store).execute(VIDEO_URL, "prompt", job_id="job-1")
+
+    expected = Counter(
+        {
+            "analyze": 1,
+            "download": 1,
+            "clip:h0": 1,
+            "clip:h1": 1,
+            "upload:h0": 1,
+            "upload:h1": 1,
+            "save_highlights": 1,
+            "save_clip_urls": 1,
+        }
+    )
+    # Only the stage that failed is attempted again
+    expected[fail_stage] += 1
+    if fail_stage == "save_clip_urls":
+        # Both writes form one idempotent persist stage
+        expected["save_highlights"] += 1
+    if fail_stage == "analyze":
+        # The download runs alongside analysis and is aborted when it fails
+        assert pipeline.calls["download"] in (1, 2)
+        expected["download"] = pipeline.calls["download"]
+    assert pipeline.calls == expected
+    assert result.clips == ["bucket/dQw4w9WgXcQ/job-1/h0.mp4", "bucket/dQw4w9WgXcQ/job-1/h1.mp4"]
+
+
+def test_clips_cut_in_a_failed_workspace_are_uploaded_by_the_retry(tmp_path):
+    pipeline = FlakyPipeline(tmp_path, "upload:h1")
+    store = FileCheckpointStore(str(tmp_path / "checkpoints"))
+    workspaces = LocalJobWorkspaceProvider(root=str(tmp_path / "jobs"), min_free_bytes=0)
+
+    with pytest.raises(RuntimeError):
+        pipeline.use_case(store, workspaces).execute(VIDEO_URL, "prompt", job_id="job-1")
+    result = pipeline.use_case(store, workspaces).execute(VIDEO_URL, "prompt", job_id="job-1")
+
+    assert pipeline.calls["clip:h1"] == 1
+    assert pipeline.calls["upload:h1"] == 2
+    assert result.clips == ["bucket/dQw4w9WgXcQ/job-1/h0.mp4", "bucket/dQw4w9WgXcQ/job-1/h1.mp4"]
+    # Removed once the job succeeded
+    assert os.listdir(workspaces.root) == []
+
+
+@pytest.mark.parametrize(
+    "options, error",
+    [
+        # Nobody can retry a job without an ID
+        ({}, RuntimeError),
+        ({"job_id": "job-1", "last_attempt": True}, RuntimeError),
+        # A retry would fail the same way
+        ({"job_id": "job-1"}, NoHighlightsError),
+    ],
+)
+def test_failed_job_that_wont_be_retried_leaves_nothing_on_disk(tmp_path, options, error):
+    pipeline = FlakyPipeline(tmp_path, "upload:h1", error)
+    store = FileCheckpointStore(str(tmp_path / "checkpoints"))
+    workspaces = LocalJobWorkspaceProvider(root=str(tmp_path / "jobs"), min_free_bytes=0)
+
+    with pytest.raises(RuntimeError):
+        pipeline.use_case(store, workspaces).execute(VIDEO_URL, "prompt", **options)
+
+    assert os.listdir(workspaces.root) == []
+
+
+def test_completed_job_returns_saved_result_without_any_work(tmp_path):
+    pipeline = FlakyPipeline(tmp_path, None)
+    store = FileCheckpointStore(str(tmp_path / "checkpoints"))
+    first = pipeline.use_case(store).execute(VIDEO_URL, "prompt", job_id="job-1")
+    calls = Counter(pipeline.calls)
+
+    second = pipeline.use_case(store).execute(VIDEO_URL, "prompt", job_id="job-1")
+
+    assert second == first
+    assert pipeline.calls == calls
+
+
+def test_changed_source_is_downloaded_again(tmp_path):
+    pipeline = FlakyPipeline(tmp_path, "clip:h1")
+    store = FileCheckpointStore(str(tmp_path / "checkpoints"))
+    with pytest.raises(RuntimeError):
+        pipeline.use_case(store).execute(VIDEO_URL, "prompt", job_id="job-1")
+    (tmp_path / "source.mp4").write_bytes(b"truncated")
+
+    pipeline.use_case(store).execute(VIDEO_URL, "prompt", job_id="job-1")
+
+    assert pipeline.calls["download"] == 2
+    assert pipeline.calls["analyze"] == 1
+
+
+def test_checkpoint_for_another_request_is_ignored(tmp_path):
+    pipeline = FlakyPipeline(tmp_path, "save_clip_urls")
+    store = FileCheckpointStore(str(tmp_path / "checkpoints"))
+    with pytest.raises(RuntimeError):
+        pipeline.use_case(store).execute(VIDEO_URL, "prompt", job_id="job-1")
+
+    pipeline.use_case(store).execute(VIDEO_URL, "another prompt", job_id="job-1")
+
+    assert pipeline.calls["analyze"] == 2